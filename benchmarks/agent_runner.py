@@ -0,0 +1,190 @@
+"""
+Concurrent runner for agent calls, shared by the benchmark harnesses (text2sql and the root utilities.py).
+
+ConcurrentRunner maps a function, e.g. a closure around agent.run, over many inputs on a bounded thread pool,
+with a token-bucket rate limit, per-request timeouts and retries with jittered exponential backoff. It only
+needs a callable, so it can be exercised against a local fake agent.
+
+From a benchmark folder:
+    sys.path.append("..")
+    from agent_runner import ConcurrentRunner
+"""
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` calls per second on average, with bursts of up to `capacity` calls.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                # Tolerate float rounding: a wait of ~1e-17 s cannot advance the clock
+                if self._tokens >= 1 - 1e-9:
+                    self._tokens = max(0.0, self._tokens - 1)
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+def call_with_timeout(fn, item, timeout=None, on_abandon=None):
+    """
+    Call fn(item), raising TimeoutError if it does not return within timeout seconds.
+    The call runs in a daemon thread, and Python threads cannot be killed: a call that times out is
+    abandoned, not cancelled. It keeps running until it returns on its own, so a remote agent run still
+    consumes its API quota and credits, and a retry overlaps with it. Its result is ignored.
+    :param on_abandon: Optional function called with the abandoned thread when the call times out.
+    """
+    if timeout is None:
+        return fn(item)
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = fn(item)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        if on_abandon is not None:
+            on_abandon(thread)
+        raise TimeoutError(f"Request did not complete within {timeout} seconds")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+class ConcurrentRunner:
+    """
+    Runs a function over many inputs with bounded concurrency, an optional rate limit,
+    per-request timeouts and retries with jittered exponential backoff.
+    Results are returned in input order. Inputs that still fail after all retries yield None
+    and their last exception is kept in `errors`. Timed-out attempts keep running in the background (see
+    call_with_timeout); `abandoned_running()` tells how many are still in flight on top of max_workers.
+    """
+
+    def __init__(
+        self,
+        max_workers=4,
+        rate=None,
+        burst=None,
+        timeout=None,
+        max_retries=3,
+        backoff=1.0,
+        max_backoff=30.0,
+        sleep=time.sleep,
+        verbose=True,
+    ):
+        """
+        :param max_workers: Maximum number of requests in flight.
+        :param rate: Maximum number of requests started per second, or None for no limit.
+        :param burst: Number of requests that may start back to back before the rate applies.
+        :param timeout: Per-request timeout in seconds, or None to wait indefinitely.
+        :param max_retries: Number of retries after a failed attempt.
+        :param backoff: Base delay in seconds; retry n waits a random delay in [0, backoff * 2**n].
+        :param max_backoff: Upper bound of a retry delay.
+        :param sleep: Sleep function, replaceable in tests.
+        :param verbose: Whether to print retries and failures.
+        """
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst, sleep=sleep) if rate else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.verbose = verbose
+        self.errors = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._abandoned = []
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _abandon(self, thread):
+        self._count("abandoned")
+        with self._lock:
+            self._abandoned.append(thread)
+
+    def abandoned_running(self):
+        """Number of timed-out calls that have not returned yet."""
+        with self._lock:
+            self._abandoned = [thread for thread in self._abandoned if thread.is_alive()]
+            return len(self._abandoned)
+
+    def _run_one(self, index, fn, item):
+        for attempt in range(self.max_retries + 1):
+            if self.bucket is not None:
+                self.bucket.acquire()
+            self._count("attempts")
+            try:
+                return call_with_timeout(fn, item, self.timeout, self._abandon)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._count("failures")
+                    with self._lock:
+                        self.errors[index] = e
+                    if self.verbose:
+                        print(f"[!] Request {index} failed after {attempt + 1} attempts: {e}")
+                    return None
+
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+                self._count("retries")
+                if self.verbose:
+                    print(f"[!] Request {index} failed ({e}), retrying in {delay:.1f}s")
+                self.sleep(delay)
+
+    def map(self, fn, items, on_result=None):
+        """
+        Call fn on every item concurrently.
+        :param fn: Function called with one item, e.g. a closure around agent.run.
+        :param items: The inputs.
+        :param on_result: Optional function called as on_result(index, result) from the worker thread as soon
+            as an item succeeds, e.g. to save each response as it arrives. Its errors are printed, not raised.
+        :return: The results, in the order of items.
+        """
+        items = list(items)
+        self.errors = {}
+        self.stats = {"requests": len(items), "attempts": 0, "retries": 0, "failures": 0, "abandoned": 0}
+        start = time.perf_counter()
+
+        def run(index, item):
+            result = self._run_one(index, fn, item)
+            if result is not None and on_result is not None:
+                try:
+                    on_result(index, result)
+                except Exception as e:
+                    print(f"[!] Could not handle the result of request {index}: {e}")
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            futures = [executor.submit(run, i, item) for i, item in enumerate(items)]
+            results = [future.result() for future in futures]
+
+        self.stats["elapsed"] = time.perf_counter() - start
+        return results
@@ -1,12 +1,18 @@
 import os
 import json
 import ast
-from typing import List, Tuple, Optional, Union
+from typing import List, Union
 from sklearn.metrics import accuracy_score
 from sklearn.metrics import f1_score, classification_report, confusion_matrix
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
+import sys
+
+# Run instrumentation and trace logging are shared with the other benchmarks (benchmarks/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import RunRecorder
+from trace_log import TraceLog, read_traces, safe_dump_response_step
 
 
 import re
@@ -138,31 +144,3 @@ def save_predictions(data_val, file_name="predict_val.csv", column="New Column")
 
     # Save the updated DataFrame back to the CSV file
     df_output.to_csv(file_name, index=False)
-    
-    
-def safe_dump_response_step(response, result_path):
-    """Save all intermediate steps from an Agent response into one JSON file."""
-    try:
-        steps = response.data.intermediate_steps
-        serialized_steps = []
-
-        for i, step in enumerate(steps):
-            if hasattr(step, "model_dump"):
-                serialized_steps.append(step.model_dump())
-            elif hasattr(step, "__dict__"):
-                serialized_steps.append(step.__dict__)
-            else:
-                serialized_steps.append(str(step))  # fallback
-
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump(serialized_steps, f, indent=4, ensure_ascii=False)
-
-        print(f"[✓] Saved {len(serialized_steps)} intermediate steps to {result_path}")
-    
-    except Exception as e:
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump({"error": f"Failed to dump steps: {str(e)}"}, f, indent=2)
-        print(f"[!] Failed to save steps: {e}")
-        
-
-
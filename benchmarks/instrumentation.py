@@ -0,0 +1,290 @@
+"""
+Per-question instrumentation of agent runs, shared by the benchmark harnesses (gsm8k, fact_verification,
+text2sql).
+
+RunRecorder wraps agent.run / team_agent.run and records one row per run: wall time, queue time (from
+submission to start, for runs scheduled by a concurrent runner), platform run time, credits, iterations
+(LLM/tool API calls summed over the intermediate steps), intermediate steps and tool calls. Rows are kept
+as columns and saved as a columnar log: JSON {column: [values]}, or Parquet when the path ends with
+.parquet (requires pyarrow). summary() prints p50/p90/p99 latency and cost per configuration, next to the
+accuracy when scores are recorded.
+
+From a benchmark folder:
+    sys.path.append("..")
+    from instrumentation import RunRecorder
+
+    recorder = RunRecorder("results/runs.json")
+    response = recorder.run(agent, query, question_id=idx, configuration="single_agent")
+    recorder.record_score(idx, is_correct, configuration="single_agent")
+    recorder.summary()
+    recorder.save()
+"""
+import os
+import json
+import math
+import time
+import tempfile
+import threading
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet logs are optional
+    pyarrow = None
+
+COLUMNS = (
+    "question_id",
+    "configuration",
+    "status",
+    "started_at",
+    "wall_time",
+    "queue_time",
+    "platform_time",
+    "credits",
+    "iterations",
+    "steps",
+    "tool_calls",
+    "correct",
+    "error",
+)
+PERCENTILES = (50, 90, 99)
+FAILED_STATUSES = ("error", "failed")
+
+
+def _field(obj, *names):
+    """The first of names found as a key of a dict or an attribute of an object, else None."""
+    for name in names:
+        if isinstance(obj, dict):
+            if name in obj:
+                return obj[name]
+        elif hasattr(obj, name):
+            return getattr(obj, name)
+    return None
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def response_metrics(response):
+    """
+    Cost and effort of an agent or team agent response.
+    :param response: The response returned by run().
+    :return: Dict with credits, platform_time, iterations, steps and tool_calls.
+    """
+    data = _field(response, "data")
+    steps = _field(data, "intermediate_steps") or []
+    steps = steps if isinstance(steps, (list, tuple)) else [steps]
+
+    credits = _field(response, "used_credits")
+    if credits is None:
+        credits = sum(_number(_field(step, "usedCredits", "used_credits")) for step in steps)
+    platform_time = _field(response, "run_time")
+    if platform_time is None:
+        platform_time = sum(_number(_field(step, "runTime", "run_time")) for step in steps)
+
+    return {
+        "credits": _number(credits),
+        "platform_time": _number(platform_time),
+        "iterations": int(sum(_number(_field(step, "apiCalls", "api_calls")) for step in steps)),
+        "steps": len(steps),
+        "tool_calls": sum(len(_field(step, "tool_steps") or []) for step in steps),
+    }
+
+
+def percentile(values, q):
+    """The q-th percentile of values with linear interpolation (as numpy's default), or None if empty."""
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * q / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class InstrumentedAgent:
+    """An agent or team agent whose run() calls are recorded; every other attribute is forwarded."""
+
+    def __init__(self, agent, recorder, configuration):
+        object.__setattr__(self, "_agent", agent)
+        object.__setattr__(self, "_recorder", recorder)
+        object.__setattr__(self, "_configuration", configuration)
+
+    def run(self, *args, question_id=None, submitted_at=None, **kwargs):
+        return self._recorder.run(
+            self._agent, *args, question_id=question_id, configuration=self._configuration, submitted_at=submitted_at, **kwargs
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._agent, name)
+
+    def __setattr__(self, name, value):
+        # e.g. execute_query setting team_agent.use_mentalist
+        setattr(self._agent, name, value)
+
+
+class RunRecorder:
+    """
+    Thread-safe recorder of agent runs, one row per run, stored column by column.
+    """
+
+    def __init__(self, path=None, configuration="default", clock=time.perf_counter):
+        """
+        :param path: Default path of the log written by save() (.json, or .parquet with pyarrow).
+        :param configuration: Configuration recorded when run() is not given one.
+        :param clock: Monotonic clock, replaceable in tests.
+        """
+        self.path = path
+        self.configuration = configuration
+        self.clock = clock
+        self.columns = {column: [] for column in COLUMNS}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.columns["question_id"])
+
+    def instrument(self, agent, configuration=None):
+        """Wrap an agent so that each of its run() calls is recorded under configuration."""
+        return InstrumentedAgent(agent, self, configuration or self.configuration)
+
+    def append(self, **row):
+        """Append a row; missing columns are left empty (None)."""
+        with self._lock:
+            for column in COLUMNS:
+                self.columns[column].append(row.get(column))
+
+    def run(self, agent, *args, question_id=None, configuration=None, submitted_at=None, **kwargs):
+        """
+        Call agent.run(*args, **kwargs) and record the run. Exceptions are recorded and re-raised.
+        :param agent: An agent, a team agent or any object with a run method.
+        :param question_id: Identifier of the question, e.g. its index.
+        :param configuration: Name of the agent configuration; defaults to the recorder's.
+        :param submitted_at: Clock time at which the run was submitted, to measure its queue time.
+        :return: The response.
+        """
+        started = self.clock()
+        row = {
+            "question_id": question_id,
+            "configuration": configuration or self.configuration,
+            "started_at": time.time(),
+            "queue_time": max(0.0, started - submitted_at) if submitted_at is not None else 0.0,
+        }
+        try:
+            response = agent.run(*args, **kwargs)
+        except Exception as e:
+            self.append(status="error", wall_time=self.clock() - started, error=str(e), **row)
+            raise
+        row["wall_time"] = self.clock() - started
+        status = _field(response, "status")
+        status = str(getattr(status, "value", status)).lower() if status is not None else "done"
+        self.append(status=status, **row, **response_metrics(response))
+        return response
+
+    def record_score(self, question_id, correct, configuration=None):
+        """Attach the score of a question to its latest recorded run in configuration."""
+        configuration = configuration or self.configuration
+        with self._lock:
+            for i in range(len(self.columns["question_id"]) - 1, -1, -1):
+                if self.columns["question_id"][i] == question_id and self.columns["configuration"][i] == configuration:
+                    self.columns["correct"][i] = bool(correct)
+                    return
+        raise KeyError(f"No recorded run for question {question_id!r} in configuration {configuration!r}")
+
+    def rows(self, configuration=None):
+        """The recorded rows as dicts, optionally for one configuration."""
+        with self._lock:
+            rows = [dict(zip(COLUMNS, values)) for values in zip(*(self.columns[column] for column in COLUMNS))]
+        return [row for row in rows if configuration is None or row["configuration"] == configuration]
+
+    def summary(self, verbose=True):
+        """
+        Latency and cost percentiles per configuration, over the runs that did not fail.
+        :return: {configuration: {"runs", "errors", "accuracy", "wall_time": {p50, p90, p99, mean},
+            "credits": {p50, p90, p99, mean, total}, "iterations": {...}, "steps": {...}}}
+        """
+        by_configuration = {}
+        for row in self.rows():
+            by_configuration.setdefault(row["configuration"], []).append(row)
+
+        summaries = {}
+        for configuration, rows in by_configuration.items():
+            ok = [row for row in rows if row["status"] not in FAILED_STATUSES]
+            scored = [row["correct"] for row in rows if row["correct"] is not None]
+            summary = {
+                "runs": len(rows),
+                "errors": len(rows) - len(ok),
+                "accuracy": sum(scored) / len(scored) if scored else None,
+            }
+            for metric in ("wall_time", "queue_time", "credits", "iterations", "steps"):
+                values = [row[metric] for row in ok if row[metric] is not None]
+                stats = {f"p{q}": percentile(values, q) for q in PERCENTILES}
+                stats["mean"] = sum(values) / len(values) if values else None
+                if metric == "credits":
+                    stats["total"] = sum(values)
+                summary[metric] = stats
+            summaries[configuration] = summary
+
+            if verbose:
+                wall, queue, credits = summary["wall_time"], summary["queue_time"], summary["credits"]
+                accuracy = f", accuracy {summary['accuracy'] * 100:.2f}%" if summary["accuracy"] is not None else ""
+                if not ok:
+                    print(f"[!] {configuration}: {len(rows)} runs, all failed")
+                    continue
+                print(
+                    f"[+] {configuration}: {len(rows)} runs ({summary['errors']} errors){accuracy} | "
+                    f"wall p50/p90/p99 {wall['p50']:.2f}/{wall['p90']:.2f}/{wall['p99']:.2f}s "
+                    f"(queue p90 {queue['p90']:.2f}s) | "
+                    f"credits p50/p90/p99 {credits['p50']:.5f}/{credits['p90']:.5f}/{credits['p99']:.5f} "
+                    f"(total {credits['total']:.4f}) | mean {summary['iterations']['mean']:.1f} iterations, "
+                    f"{summary['steps']['mean']:.1f} steps"
+                )
+        return summaries
+
+    def save(self, path=None):
+        """
+        Write the columnar log atomically: JSON {column: [values]}, or Parquet for a .parquet path.
+        :param path: Destination; defaults to the recorder's path.
+        :return: The path written.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given for the run log")
+        with self._lock:
+            columns = {column: list(values) for column, values in self.columns.items()}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            if path.endswith(".parquet"):
+                os.close(fd)
+                if pyarrow is None:
+                    raise ImportError("Parquet run logs require the pyarrow package: pip install pyarrow")
+                pyarrow.parquet.write_table(pyarrow.table(columns), temporary)
+            else:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(columns, f, ensure_ascii=False, default=str)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        print(f"[✓] Saved {len(columns['question_id'])} runs to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Read a log written by save(), e.g. to compare runs; new runs are appended after the loaded ones."""
+        recorder = cls(path)
+        if path.endswith(".parquet"):
+            if pyarrow is None:
+                raise ImportError("Parquet run logs require the pyarrow package: pip install pyarrow")
+            columns = pyarrow.parquet.read_table(path).to_pydict()
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                columns = json.load(f)
+        size = max((len(values) for values in columns.values()), default=0)
+        recorder.columns = {column: list(columns.get(column) or [None] * size) for column in COLUMNS}
+        return recorder
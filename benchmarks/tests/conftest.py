@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The shared benchmark modules are imported by name (as the benchmark folders do)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,119 @@
+"""Tests for the concurrent agent runner, against a local fake agent."""
+
+import time
+import random
+import threading
+import pytest
+from agent_runner import ConcurrentRunner, TokenBucket, call_with_timeout
+
+
+class FakeClock:
+    """Clock whose sleep advances time instantly, so pacing is checked without waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += seconds
+
+
+class FakeAgent:
+    """Answers after a random delay and fails the first attempt of every third query."""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+
+    def run(self, query):
+        with self.lock:
+            self.calls[query] = self.calls.get(query, 0) + 1
+            attempt = self.calls[query]
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(random.uniform(0, 0.005))
+            if query % 3 == 0 and attempt == 1:
+                raise ConnectionError("rate limited")
+            return f"SELECT {query}"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_token_bucket_paces_calls():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=5, capacity=2, clock=clock, sleep=clock.sleep)
+    starts = []
+    for _ in range(12):
+        bucket.acquire()
+        starts.append(clock())
+    # A burst of 2, then one call every 1/rate seconds
+    assert starts[:2] == [0.0, 0.0]
+    assert starts[-1] == pytest.approx(2.0)
+    assert all(b - a == pytest.approx(0.2) for a, b in zip(starts[2:], starts[3:]))
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_runner_returns_results_in_input_order_with_retries():
+    agent = FakeAgent()
+    runner = ConcurrentRunner(max_workers=4, max_retries=2, sleep=lambda seconds: None, verbose=False)
+    results = runner.map(agent.run, range(30))
+    assert results == [f"SELECT {i}" for i in range(30)]
+    assert runner.stats["retries"] == 10 and runner.stats["failures"] == 0
+    assert agent.max_in_flight <= 4
+
+
+def test_failures_yield_none_and_keep_the_error():
+    runner = ConcurrentRunner(max_workers=2, max_retries=1, sleep=lambda seconds: None, verbose=False)
+
+    def run(query):
+        if query == 2:
+            raise ValueError("bad query")
+        return query
+
+    assert runner.map(run, range(4)) == [0, 1, None, 3]
+    assert isinstance(runner.errors[2], ValueError)
+    assert runner.stats["attempts"] == 5 and runner.stats["failures"] == 1
+
+
+def test_timed_out_calls_are_counted_as_abandoned():
+    release = threading.Event()
+
+    def run(query):
+        if query == 0:
+            release.wait(5)
+        return query
+
+    runner = ConcurrentRunner(max_workers=2, timeout=0.05, max_retries=0, verbose=False)
+    assert runner.map(run, range(3)) == [None, 1, 2]
+    assert isinstance(runner.errors[0], TimeoutError)
+    # The timed-out call is still running in its daemon thread until it returns on its own
+    assert runner.stats["abandoned"] == 1 and runner.abandoned_running() == 1
+    release.set()
+    deadline = time.monotonic() + 5
+    while runner.abandoned_running() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert runner.abandoned_running() == 0
+    assert call_with_timeout(lambda x: x * 2, 21, timeout=1) == 42
+
+
+def test_on_result_sees_each_success_as_it_arrives():
+    seen = {}
+    runner = ConcurrentRunner(max_workers=3, max_retries=0, verbose=False)
+
+    def on_result(index, result):
+        if index == 1:
+            raise OSError("disk full")
+        seen[index] = result
+
+    results = runner.map(lambda query: None if query == 2 else query * 10, range(4), on_result=on_result)
+    assert results == [0, 10, None, 30]
+    assert seen == {0: 0, 3: 30}
@@ -0,0 +1,108 @@
+"""Tests for the per-question run recorder."""
+
+import json
+import pytest
+import instrumentation
+from instrumentation import RunRecorder, percentile, response_metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class Response:
+    def __init__(self, steps, status="SUCCESS", used_credits=None):
+        self.status = status
+        self.used_credits = used_credits
+        self.data = {"intermediate_steps": steps}
+
+
+STEPS = [
+    {"apiCalls": 2, "usedCredits": 0.01, "runTime": 1.5, "tool_steps": [{"tool": "sql"}]},
+    {"api_calls": 1, "used_credits": 0.02, "run_time": 0.5, "tool_steps": []},
+]
+
+
+class FakeAgent:
+    def __init__(self, clock, durations):
+        self.clock = clock
+        self.durations = durations
+        self.use_mentalist = False
+
+    def run(self, query):
+        self.clock.now += self.durations[query]
+        if query == "fail":
+            raise ConnectionError("platform unavailable")
+        return Response(STEPS)
+
+
+def test_response_metrics_sum_the_steps():
+    assert response_metrics(Response(STEPS)) == {
+        "credits": pytest.approx(0.03), "platform_time": 2.0, "iterations": 3, "steps": 2, "tool_calls": 1
+    }
+    # Totals reported by the response take precedence over the steps
+    assert response_metrics(Response(STEPS, used_credits=0.5))["credits"] == 0.5
+    assert response_metrics({"data": {"intermediate_steps": None}})["steps"] == 0
+
+
+def test_percentiles_interpolate_like_numpy():
+    values = list(range(1, 11))
+    assert [percentile(values, q) for q in (0, 50, 90, 99, 100)] == pytest.approx([1, 5.5, 9.1, 9.91, 10])
+    assert percentile([], 50) is None
+
+
+def test_runs_are_recorded_with_wall_and_queue_time(tmp_path):
+    clock = FakeClock()
+    recorder = RunRecorder(str(tmp_path / "runs.json"), configuration="single", clock=clock)
+    agent = FakeAgent(clock, {"q0": 2.0, "q1": 4.0, "fail": 1.0})
+
+    recorder.run(agent, "q0", question_id=0)
+    team = recorder.instrument(agent, configuration="team")
+    team.use_mentalist = True
+    assert agent.use_mentalist
+    submitted_at = clock()
+    clock.now += 3.0
+    team.run("q1", question_id=1, submitted_at=submitted_at)
+    with pytest.raises(ConnectionError):
+        team.run("fail", question_id=2)
+
+    rows = recorder.rows()
+    assert [(row["configuration"], row["status"], row["wall_time"], row["queue_time"]) for row in rows] == [
+        ("single", "success", 2.0, 0.0),
+        ("team", "success", 4.0, 3.0),
+        ("team", "error", 1.0, 0.0),
+    ]
+    assert rows[2]["error"] == "platform unavailable" and rows[2]["credits"] is None
+    assert rows[1]["iterations"] == 3 and rows[1]["tool_calls"] == 1
+
+    recorder.record_score(1, True, configuration="team")
+    with pytest.raises(KeyError):
+        recorder.record_score(1, True, configuration="single")
+    summary = recorder.summary(verbose=False)
+    assert summary["team"]["runs"] == 2 and summary["team"]["errors"] == 1 and summary["team"]["accuracy"] == 1.0
+    assert summary["single"]["wall_time"]["p50"] == 2.0 and summary["single"]["credits"]["total"] == pytest.approx(0.03)
+
+
+def test_log_round_trips_as_columns(tmp_path):
+    clock = FakeClock()
+    recorder = RunRecorder(str(tmp_path / "results" / "runs.json"), clock=clock)
+    agent = FakeAgent(clock, {"q0": 2.0})
+    recorder.run(agent, "q0", question_id=0)
+    path = recorder.save()
+    with open(path) as f:
+        columns = json.load(f)
+    assert set(columns) == set(instrumentation.COLUMNS) and columns["wall_time"] == [2.0]
+
+    loaded = RunRecorder.load(path)
+    assert loaded.rows() == recorder.rows()
+    loaded.run(agent, "q0", question_id=1)
+    assert len(loaded) == 2
+    if instrumentation.pyarrow is None:
+        with pytest.raises(ImportError):
+            recorder.save(str(tmp_path / "runs.parquet"))
+    else:
+        assert RunRecorder.load(recorder.save(str(tmp_path / "runs.parquet"))).rows() == recorder.rows()
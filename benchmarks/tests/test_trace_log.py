@@ -0,0 +1,81 @@
+"""Tests for the compressed trace log."""
+
+import os
+import sys
+import subprocess
+import pytest
+from trace_log import TraceLog, read_traces, to_plain
+
+PROMPT = "Classify the claim below. " * 20
+
+
+def steps(i):
+    return [{"agent": "orchestrator", "input": f"USER: {PROMPT}", "output": f"answer {i}"}, {"agent": "tool", "output": "x" * 300}]
+
+
+def append(log, i):
+    log.append(steps(i), question_id=i, configuration="team_agent", prompt=PROMPT)
+
+
+def test_round_trip_and_reopen(tmp_path):
+    path = str(tmp_path / "traces.jsonl.gz")
+    with TraceLog(path) as log:
+        for i in range(3):
+            append(log, i)
+    with TraceLog(path) as log:
+        assert log.records == 3
+        append(log, 3)
+    records = list(read_traces(path))
+    assert [record["steps"] for record in records] == [steps(i) for i in range(4)]
+    assert all(record["prompt"] == PROMPT for record in records)
+    assert list(read_traces(path, question_id=2))[0]["steps"] == steps(2)
+
+
+def test_resume_after_interrupted_run(tmp_path):
+    path = str(tmp_path / "traces.jsonl.gz")
+    # Two records are flushed, then the process dies without closing the gzip member
+    script = (
+        "import os, sys; sys.path.insert(0, sys.argv[2]); import test_trace_log as t; from trace_log import TraceLog\n"
+        "log = TraceLog(sys.argv[1]); t.append(log, 0); t.append(log, 1); os._exit(0)\n"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(here))
+    subprocess.run([sys.executable, "-c", script, path, here], check=True, env=env)
+    assert [record["question_id"] for record in read_traces(path)] == [0, 1]
+
+    with TraceLog(path) as log:
+        assert log.records == 2
+        append(log, 2)
+    with TraceLog(path) as log:
+        append(log, 3)
+    assert [record["steps"] for record in read_traces(path)] == [steps(i) for i in range(4)]
+
+
+@pytest.mark.parametrize("damage", ["truncate", "garbage"])
+def test_damaged_tail_is_dropped(tmp_path, damage):
+    path = str(tmp_path / "traces.jsonl.gz")
+    with TraceLog(path) as log:
+        for i in range(5):
+            append(log, i)
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        if damage == "truncate":
+            f.truncate(size - 40)
+        else:
+            f.seek(0, os.SEEK_END)
+            f.write(b"\x1f\x8b\x08\x00garbage")
+
+    recovered = [record["question_id"] for record in read_traces(path)]
+    assert recovered == list(range(len(recovered)))
+    with TraceLog(path) as log:
+        append(log, 99)
+    assert [record["question_id"] for record in read_traces(path)] == recovered + [99]
+
+
+def test_to_plain():
+    class Opaque:
+        def __init__(self):
+            self.client = object()
+
+    assert to_plain({"a": (1, 2), 3: Opaque()})["a"] == [1, 2]
+    assert isinstance(to_plain({3: Opaque()})["3"], str)
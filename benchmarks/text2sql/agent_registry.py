@@ -0,0 +1,102 @@
+"""
+Registry of the platform objects of a run (SQL tools, agents, team agents).
+
+Every object is built once per key, e.g. (kind, db_id, llm_id, configuration), and reused by every later
+question with the same key instead of being created again on the platform. Objects are torn down in
+reverse creation order at the end of the run, so team agents are deleted before the agents they use.
+"""
+import threading
+from collections import Counter
+
+
+class AgentRegistry:
+    """
+    Thread-safe build-once cache of tools and agents.
+    Keys are tuples whose first element names the kind of object ("sql_tool", "agent", "team_agent"...);
+    the counters are kept per kind.
+    """
+
+    def __init__(self, verbose=True):
+        """
+        :param verbose: Whether to print teardown errors and the summary.
+        """
+        self.verbose = verbose
+        self.created = Counter()
+        self.reused = Counter()
+        self._objects = {}
+        self._order = []
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key, build):
+        """
+        Return the object registered under key, calling build() to create it on first use.
+        Concurrent callers asking for the same key wait for a single build.
+        :param key: Tuple identifying the object, starting with its kind.
+        :param build: Function creating the object.
+        :return: The object.
+        """
+        with self._lock:
+            if key in self._objects:
+                self.reused[key[0]] += 1
+                return self._objects[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._objects:
+                    self.reused[key[0]] += 1
+                    return self._objects[key]
+            obj = build()
+            with self._lock:
+                self._objects[key] = obj
+                self._order.append(key)
+                self.created[key[0]] += 1
+                self._key_locks.pop(key, None)
+        return obj
+
+    def __len__(self):
+        return len(self._objects)
+
+    def stats(self):
+        """Creations and reuses (platform-side creations avoided) in total and per kind."""
+        kinds = sorted(set(self.created) | set(self.reused))
+        return {
+            "created": sum(self.created.values()),
+            "reused": sum(self.reused.values()),
+            "by_kind": {kind: {"created": self.created[kind], "reused": self.reused[kind]} for kind in kinds},
+        }
+
+    def report(self):
+        """Print how many objects were built and how many creations were avoided."""
+        stats = self.stats()
+        details = ", ".join(f"{kind}: {c['created']} built, {c['reused']} reused" for kind, c in stats["by_kind"].items())
+        print(f"[✓] Built {stats['created']} tools and agents, {stats['reused']} creations avoided ({details})")
+        return stats
+
+    def teardown(self):
+        """
+        Delete every registered object that has a delete() method, newest first, and empty the registry.
+        Errors are reported and do not stop the teardown.
+        :return: The stats of the run.
+        """
+        stats = self.report() if self.verbose else self.stats()
+        with self._lock:
+            keys, self._order = self._order[::-1], []
+            objects, self._objects = self._objects, {}
+        for key in keys:
+            delete = getattr(objects[key], "delete", None)
+            if not callable(delete):
+                continue
+            try:
+                delete()
+            except Exception as e:
+                if self.verbose:
+                    print(f"[!] Could not delete {key}: {e}")
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.teardown()
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark of the train-set chunkers: the previous nltk sentence chunker against chunking.iter_chunks.
+
+Both chunk the "Question: ...; \\nSQL: ..." documents built by utilities.iter_train_records.
+
+Usage:
+    python bench_chunking.py [bird/train/train.json] [--chunk-size 1000] [--overlap 0] [--repeat 3]
+"""
+import time
+import argparse
+from json_stream import iter_json_array
+from chunking import iter_chunks
+
+
+def legacy_question_chunks(text, chunk_size=1000):
+    """The sentence chunker previously used by process_train_data (nltk.sent_tokenize + join)."""
+    import nltk
+
+    if not text.strip():
+        return []
+
+    chunks = []
+    current_chunk = []
+    current_length = 0
+    sentences = nltk.sent_tokenize(text)
+
+    for sentence in sentences:
+        sentence_length = len(sentence)
+
+        # Split long sentences into sub-chunks
+        if sentence_length > chunk_size:
+            sub_chunks = [sentence[i:i+chunk_size] for i in range(0, sentence_length, chunk_size)]
+            for sub in sub_chunks:
+                if current_length + len(sub) > chunk_size:
+                    if current_chunk:
+                        chunks.append(" ".join(current_chunk))
+                    current_chunk = [sub]
+                    current_length = len(sub)
+                else:
+                    current_chunk.append(sub)
+                    current_length += len(sub) + 1
+        else:
+            if current_length + len(sentence) + 1 > chunk_size:
+                if current_chunk:
+                    chunks.append(" ".join(current_chunk))
+                current_chunk = [sentence]
+                current_length = len(sentence)
+            else:
+                current_chunk.append(sentence)
+                current_length += len(sentence) + 1
+
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+
+    return chunks
+
+
+def load_documents(file_path):
+    documents = []
+    for entry in iter_json_array(file_path):
+        question = entry.get("question", "").strip()
+        sql_query = (entry.get("SQL", "") or entry.get("query", "")).strip()
+        documents.append(f"""Question: {question}; \nSQL: {sql_query}""")
+    return documents
+
+
+def measure(name, chunker, documents, repeat):
+    best = float("inf")
+    chunks = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = sum(len(chunker(document)) for document in documents)
+        best = min(best, time.perf_counter() - start)
+    size_mb = sum(map(len, documents)) / 2**20
+    print(f"{name:<22}{chunks:>10}{len(documents) / best:>14.0f}{size_mb / best:>10.1f}{best * 1000:>12.1f}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("train_file", nargs="?", default="bird/train/train.json")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = load_documents(args.train_file)
+    print(f"[✓] {len(documents)} documents from {args.train_file}")
+    print(f"{'chunker':<22}{'chunks':>10}{'docs/s':>14}{'MB/s':>10}{'time (ms)':>12}")
+
+    timings = {}
+    try:
+        timings["legacy"] = measure("legacy (nltk)", lambda d: legacy_question_chunks(d, args.chunk_size), documents, args.repeat)
+    except (ImportError, LookupError) as e:
+        print(f"[!] Skipping the legacy chunker, nltk or its punkt data is missing: {e}")
+    timings["char"] = measure("iter_chunks (char)", lambda d: list(iter_chunks(d, args.chunk_size, args.overlap)), documents, args.repeat)
+    token_budget = max(1, args.chunk_size // 5)
+    timings["token"] = measure(
+        f"iter_chunks ({token_budget} tok)",
+        lambda d: list(iter_chunks(d, token_budget, args.overlap // 5, unit="token")),
+        documents,
+        args.repeat,
+    )
+    if "legacy" in timings:
+        print(f"[✓] Speedup (char budget): {timings['legacy'] / timings['char']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
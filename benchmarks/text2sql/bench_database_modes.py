@@ -0,0 +1,93 @@
+"""
+Compare how fast repeated evaluation-style queries run against each database depending on how it is opened.
+
+Modes:
+- reconnect: sqlite3.connect per query, as the evaluators used to do
+- file / immutable / memory: one pooled connection per database (see sql_execution.ConnectionPool)
+
+Usage:
+    python bench_database_modes.py [databases_dir] [--repeat N]
+"""
+import os
+import time
+import sqlite3
+import argparse
+from urllib.request import pathname2url
+from sql_execution import ConnectionPool, DATABASE_MODES
+
+
+def find_databases(databases_dir):
+    """Find the .sqlite/.db files under databases_dir, smallest first."""
+    paths = []
+    for root, _, files in os.walk(databases_dir):
+        paths.extend(os.path.join(root, f) for f in files if f.endswith((".sqlite", ".db")))
+    return sorted(paths, key=os.path.getsize)
+
+
+def build_workload(db_path):
+    """A few typical evaluation queries per table: a count, a projection and a filtered aggregate."""
+    conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    queries = []
+    for table in tables:
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+        queries.append(f'SELECT COUNT(*) FROM "{table}"')
+        queries.append(f'SELECT * FROM "{table}" LIMIT 50')
+        if columns:
+            queries.append(f'SELECT "{columns[0]}", COUNT(*) FROM "{table}" GROUP BY 1 ORDER BY 2 DESC LIMIT 10')
+    conn.close()
+    return queries
+
+
+def run_reconnect(db_path, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            conn = sqlite3.connect(db_path)
+            conn.execute(query).fetchall()
+            conn.close()
+    return time.perf_counter() - start
+
+
+def run_pooled(db_path, queries, repeat, mode):
+    pool = ConnectionPool(mode=mode)
+    start = time.perf_counter()  # includes opening (and for "memory", copying) the database
+    for _ in range(repeat):
+        conn = pool.get(db_path)
+        for query in queries:
+            conn.execute(query).fetchall()
+    elapsed = time.perf_counter() - start
+    pool.close_all()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("databases_dir", nargs="?", default="dev_databases")
+    parser.add_argument("--repeat", type=int, default=20, help="How many times the workload is replayed per database")
+    args = parser.parse_args()
+
+    modes = ("reconnect",) + DATABASE_MODES
+    print(f"{'database':<28}{'size (MB)':>10}{'queries':>9}" + "".join(f"{mode + ' (ms)':>16}" for mode in modes) + f"{'best speedup':>14}")
+
+    for db_path in find_databases(args.databases_dir):
+        queries = build_workload(db_path)
+        if not queries:
+            continue
+
+        timings = {"reconnect": run_reconnect(db_path, queries, args.repeat)}
+        for mode in DATABASE_MODES:
+            timings[mode] = run_pooled(db_path, queries, args.repeat, mode)
+
+        best = min(DATABASE_MODES, key=timings.get)
+        size_mb = os.path.getsize(db_path) / 2**20
+        name = os.path.splitext(os.path.basename(db_path))[0]
+        print(
+            f"{name:<28}{size_mb:>10.2f}{len(queries) * args.repeat:>9}"
+            + "".join(f"{timings[mode] * 1000:>16.1f}" for mode in modes)
+            + f"{timings['reconnect'] / timings[best]:>8.1f}x {best}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark of result-set comparison on large results: fetchall + set (the previous execute_sql)
+against the streaming comparator of sql_execution.compare_sql, in each comparison mode.
+
+By default a synthetic database with a 300k-row table is generated in a temporary directory; the
+query pairs below cover a match (the full result has to be read), a different row count and a
+different first row. Pass a BIRD database and query pairs to measure on real data instead:
+    python bench_result_compare.py [--rows 300000]
+    python bench_result_compare.py --db path/to/db.sqlite --pair "SELECT ..." "SELECT ..." [--pair ...]
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+import sql_execution
+from result_compare import COMPARISON_MODES
+
+
+def build_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, account INTEGER, kind TEXT, amount REAL)")
+    conn.executemany(
+        "INSERT INTO events VALUES (?, ?, ?, ?)",
+        ((i, i % 5000, ("deposit", "withdrawal", "fee")[i % 3], round(i * 0.37 % 1000, 2)) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def default_pairs():
+    return [
+        ("match", "SELECT account, kind, amount FROM events", "SELECT account, kind, amount FROM events ORDER BY id DESC"),
+        ("row count differs", "SELECT account, kind, amount FROM events", "SELECT account, kind, amount FROM events WHERE id > 10"),
+        ("first row differs", "SELECT id, amount FROM events ORDER BY id", "SELECT id, amount + 1 FROM events ORDER BY id"),
+    ]
+
+
+def legacy(db_path, predicted_sql, ground_truth):
+    conn = sqlite3.connect(db_path)
+    try:
+        predicted = conn.execute(predicted_sql).fetchall()
+        gold = conn.execute(ground_truth).fetchall()
+        return set(predicted) == set(gold)
+    finally:
+        conn.close()
+
+
+def measure(fn):
+    """Time one run, then trace the peak Python memory of a second one (tracing slows it down)."""
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="Database to query; a synthetic one is generated by default")
+    parser.add_argument("--rows", type=int, default=300_000, help="Rows of the synthetic table")
+    parser.add_argument("--pair", nargs=2, action="append", metavar=("PREDICTED", "GROUND_TRUTH"), help="Query pair to compare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(tmp, "events.db")
+            build_database(db_path, args.rows)
+            print(f"[+] Synthetic database with {args.rows} rows: {db_path}")
+        pairs = [(f"pair {i}", p, g) for i, (p, g) in enumerate(args.pair)] if args.pair else default_pairs()
+
+        # No row cap, so both approaches read the same amount of data
+        sql_execution.configure(timeout=None, max_rows=None)
+        print(f"{'case':<20}{'method':<20}{'match':>7}{'time (ms)':>12}{'peak (MB)':>12}")
+        for name, predicted_sql, ground_truth in pairs:
+            runs = [("fetchall + set", lambda: legacy(db_path, predicted_sql, ground_truth))]
+            runs += [
+                (f"stream ({mode})", lambda mode=mode: sql_execution.compare_sql(predicted_sql, ground_truth, db_path, mode))
+                for mode in COMPARISON_MODES
+            ]
+            for method, fn in runs:
+                result, elapsed, peak = measure(fn)
+                print(f"{name:<20}{method:<20}{str(result):>7}{elapsed * 1000:>12.1f}{peak / 2**20:>12.1f}")
+        sql_execution.close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
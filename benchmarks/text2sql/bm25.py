@@ -0,0 +1,183 @@
+"""
+Offline BM25 retriever for few-shot examples.
+
+The index is an inverted file built from the train Records (utilities.iter_train_records). Each term maps to
+a contiguous run of postings stored as two flat uint32 arrays (document ids, term frequencies). The
+arrays, the document lengths and the document texts are written as raw little-endian files that are
+memory-mapped on load, so opening an index costs the size of its vocabulary and a query touches only the
+postings of its terms. On big-endian machines the arrays are byteswapped when written and read into memory,
+byteswapped, when loaded.
+
+Files in an index directory:
+    meta.json        parameters, document count, average length and vocabulary {term: [offset, df]}
+    doc_ids.u32      postings document ids, grouped by term
+    tfs.u32          postings term frequencies, aligned with doc_ids.u32
+    doc_lengths.u32  number of terms of every document
+    doc_offsets.u64  byte offsets of the documents in docs.bin (num_docs + 1 entries)
+    docs.bin         UTF-8 document texts, concatenated
+"""
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import heapq
+from array import array
+from collections import Counter, defaultdict
+from functools import lru_cache
+from checkpoint import atomic_write_json
+
+INDEX_VERSION = 1
+_TERM = re.compile(r"[a-z0-9_]+")
+# Index files are little-endian; native arrays are byteswapped on other machines
+_BYTESWAP = sys.byteorder != "little"
+
+
+def tokenize(text):
+    """Lowercased alphanumeric terms of text."""
+    return _TERM.findall(text.lower())
+
+
+def is_bm25_index(path):
+    """Whether path is a directory holding a BM25 index."""
+    return isinstance(path, str) and os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def _write_array(path, values):
+    if _BYTESWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, "wb") as f:
+        values.tofile(f)
+
+
+def _map_array(path, format):
+    """
+    Memory-map a raw little-endian array file as a read-only memoryview of the given struct format.
+    On big-endian machines the file is read into memory and byteswapped instead.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(array(format))
+        if _BYTESWAP:
+            values = array(format)
+            values.frombytes(f.read())
+            values.byteswap()
+            return memoryview(values)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast(format)
+
+
+def build_index(texts, output_dir, k1=1.5, b=0.75):
+    """
+    Build a BM25 index from an iterable of document texts and write it to output_dir.
+    :param texts: Iterable of texts, e.g. (record.value for record in iter_train_records(path)).
+    :param output_dir: Directory of the index; created if needed.
+    :param k1: BM25 term frequency saturation.
+    :param b: BM25 length normalization.
+    :return: The number of indexed documents.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    postings = defaultdict(list)
+    doc_lengths = array("I")
+    doc_offsets = array("Q", [0])
+
+    with open(os.path.join(output_dir, "docs.bin"), "wb") as docs:
+        for doc_id, text in enumerate(texts):
+            terms = tokenize(text)
+            for term, tf in Counter(terms).items():
+                postings[term].append((doc_id, tf))
+            doc_lengths.append(len(terms))
+            encoded = text.encode("utf-8")
+            docs.write(encoded)
+            doc_offsets.append(doc_offsets[-1] + len(encoded))
+
+    vocabulary = {}
+    doc_ids, tfs = array("I"), array("I")
+    for term in sorted(postings):
+        vocabulary[term] = [len(doc_ids), len(postings[term])]
+        for doc_id, tf in postings[term]:
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+
+    _write_array(os.path.join(output_dir, "doc_ids.u32"), doc_ids)
+    _write_array(os.path.join(output_dir, "tfs.u32"), tfs)
+    _write_array(os.path.join(output_dir, "doc_lengths.u32"), doc_lengths)
+    _write_array(os.path.join(output_dir, "doc_offsets.u64"), doc_offsets)
+
+    num_docs = len(doc_lengths)
+    meta = {
+        "version": INDEX_VERSION,
+        "k1": k1,
+        "b": b,
+        "num_docs": num_docs,
+        "avg_length": sum(doc_lengths) / num_docs if num_docs else 0.0,
+        "vocabulary": vocabulary,
+    }
+    # meta.json is written last: its presence marks a complete index
+    atomic_write_json(os.path.join(output_dir, "meta.json"), meta, separators=(",", ":"))
+    open_index.cache_clear()
+    print(f"[+] BM25 index of {num_docs} documents and {len(vocabulary)} terms saved to: {output_dir}")
+    return num_docs
+
+
+class BM25Index:
+    """A memory-mapped BM25 index; see build_index for the layout."""
+
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported BM25 index version in {index_dir}: {meta.get('version')}")
+        self.index_dir = index_dir
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.num_docs = meta["num_docs"]
+        self.avg_length = meta["avg_length"] or 1.0
+        self.vocabulary = meta["vocabulary"]
+        self.doc_ids = _map_array(os.path.join(index_dir, "doc_ids.u32"), "I")
+        self.tfs = _map_array(os.path.join(index_dir, "tfs.u32"), "I")
+        self.doc_lengths = _map_array(os.path.join(index_dir, "doc_lengths.u32"), "I")
+        self.doc_offsets = _map_array(os.path.join(index_dir, "doc_offsets.u64"), "Q")
+        self.docs = _map_array(os.path.join(index_dir, "docs.bin"), "B")
+
+    def __len__(self):
+        return self.num_docs
+
+    def document(self, doc_id):
+        """The text of a document."""
+        return bytes(self.docs[self.doc_offsets[doc_id]:self.doc_offsets[doc_id + 1]]).decode("utf-8")
+
+    def search(self, query, num_results=5):
+        """
+        Rank the documents against a query.
+        :param query: The query text.
+        :param num_results: Number of documents to return.
+        :return: List of (doc_id, score), best first.
+        """
+        scores = defaultdict(float)
+        lengths = self.doc_lengths
+        k1, b, avg_length = self.k1, self.b, self.avg_length
+        # Length normalization k1 * (1 - b + b * length / avg_length), computed only for the matched postings
+        one_minus_b = 1 - b
+        for term, query_tf in Counter(tokenize(query)).items():
+            entry = self.vocabulary.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            idf = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            weight = idf * (k1 + 1) * query_tf
+            for doc_id, tf in zip(self.doc_ids[offset:offset + df], self.tfs[offset:offset + df]):
+                scores[doc_id] += weight * tf / (tf + k1 * (one_minus_b + b * lengths[doc_id] / avg_length))
+        return heapq.nlargest(num_results, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def retrieve(self, query, num_results=5):
+        """The texts of the best num_results documents joined by blank lines, like utilities.retrieve_docs."""
+        return "\n\n".join(self.document(doc_id) for doc_id, _ in self.search(query, num_results))
+
+
+@lru_cache(maxsize=None)
+def open_index(index_dir):
+    """Open an index once per process."""
+    return BM25Index(index_dir)
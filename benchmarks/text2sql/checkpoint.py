@@ -0,0 +1,188 @@
+import os
+import json
+import tempfile
+import threading
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """
+    Write JSON to path atomically: the data goes to a temporary file in the same directory,
+    is flushed to disk and then renamed over path, so a crash leaves either the old or the new file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RunCheckpoint:
+    """
+    Log of the finished questions of benchmark runs, keyed by LLM id, configuration and question_id.
+    Every finished question appends one fsynced JSON line, so recording costs the same for the first and the
+    thousandth question and a crash loses at most the line being written. The log is compacted (one line per
+    question, torn last line dropped) with an atomic rewrite when it is opened and when it is closed.
+    Safe to record from several threads.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path of the log, e.g. experiments/checkpoint.jsonl. It is created on first write.
+            A manifest written by earlier versions ({"runs": ...}) is converted in place.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._file = None
+        self._lines = 0
+        if os.path.isfile(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            text = f.read()
+        try:
+            manifest = json.loads(text)
+        except json.JSONDecodeError:
+            manifest = None
+        if isinstance(manifest, dict) and "runs" in manifest:
+            # Manifest of earlier versions: one JSON document rewritten per question
+            self._runs = manifest["runs"]
+            self._compact()
+            return
+
+        clean = text.endswith("\n") or not text
+        for line in text.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn line of a crash mid-append
+                clean = False
+                continue
+            self._runs.setdefault(record["run"], {})[str(record["question_id"])] = record["response"]
+            self._lines += 1
+        if not clean or self._lines != self._count():
+            self._compact()
+
+    def _count(self):
+        return sum(len(run) for run in self._runs.values())
+
+    def _compact(self):
+        """Rewrite the log atomically with one line per question."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".jsonl")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for key, run in self._runs.items():
+                    for question_id, response in run.items():
+                        f.write(self._line(key, question_id, response))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._lines = self._count()
+
+    @staticmethod
+    def _line(key, question_id, response):
+        return json.dumps({"run": key, "question_id": question_id, "response": response}, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def _run_key(configuration, llm_id):
+        return f"{llm_id}/{configuration}"
+
+    def _run(self, configuration, llm_id):
+        return self._runs.get(self._run_key(configuration, llm_id), {})
+
+    def is_done(self, question_id, configuration, llm_id):
+        """Whether the question already has a result for this configuration and LLM."""
+        return str(question_id) in self._run(configuration, llm_id)
+
+    def pending(self, entries, configuration, llm_id):
+        """
+        Select the entries that still have to run.
+        :param entries: The selected questions (dicts with a "question_id").
+        :return: List of (index, entry) tuples for the unfinished questions, index being the position in entries.
+        """
+        run = self._run(configuration, llm_id)
+        return [(i, entry) for i, entry in enumerate(entries) if str(entry["question_id"]) not in run]
+
+    def record(self, question_id, configuration, llm_id, response):
+        """
+        Mark a question as finished and durably append its response to the log.
+        :param response: The response text (e.g. response.data.output).
+        """
+        key = self._run_key(configuration, llm_id)
+        line = self._line(key, str(question_id), response)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._runs.setdefault(key, {})[str(question_id)] = response
+            self._lines += 1
+
+    def close(self):
+        """Close the log, compacting it if questions were recorded more than once."""
+        with self._lock:
+            if self._lines != self._count():
+                self._compact()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def responses(self, entries, configuration, llm_id, default=None):
+        """
+        Merge the recorded responses back into the order of entries.
+        :return: One response per entry, default for questions that have not finished.
+        """
+        run = self._run(configuration, llm_id)
+        return [run.get(str(entry["question_id"]), default) for entry in entries]
+
+    def run(self, entries, fn, configuration, llm_id, runner=None):
+        """
+        Run fn on every unfinished entry, recording each response as soon as it is available.
+        :param entries: The selected questions.
+        :param fn: Function called as fn(index, entry) that returns the response text, or None on failure.
+        :param runner: Optional agent_runner.ConcurrentRunner to run the pending entries concurrently.
+        :return: The responses of all entries, in order, including those finished in earlier runs.
+        """
+        pending = self.pending(entries, configuration, llm_id)
+        print(f"[✓] {len(entries) - len(pending)} of {len(entries)} questions already done for {self._run_key(configuration, llm_id)}")
+
+        def run_one(item):
+            i, entry = item
+            response = fn(i, entry)
+            if response is not None:
+                self.record(entry["question_id"], configuration, llm_id, response)
+            return response
+
+        if runner is not None:
+            runner.map(run_one, pending)
+        else:
+            for item in pending:
+                run_one(item)
+
+        return self.responses(entries, configuration, llm_id)
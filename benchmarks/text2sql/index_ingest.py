@@ -0,0 +1,237 @@
+"""
+Concurrent, batched bulk ingestion of Records into an index.
+
+Records are packed into batches bounded by payload size and record count, and several batches are
+uploaded concurrently by a bounded worker pool while the input is consumed lazily, so a generator
+such as utilities.iter_train_records is never materialized. Failed batches are retried with jittered
+exponential backoff. Upserts are keyed by record id, so a retried batch overwrites rather than
+duplicates whatever part of it had already landed, and ids acknowledged by the index are skipped
+when the same records are ingested again.
+
+LocalIndex is an in-memory stand-in for an aiXplain index (upsert/count) with optional injected
+failures, to exercise the pipeline without network access:
+    python index_ingest.py [--records 20000] [--workers 4] [--failure-rate 0.1]
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+MAX_BATCH_BYTES = 1 << 20
+MAX_BATCH_RECORDS = 500
+
+
+def record_payload(record):
+    """The JSON-serializable form of a Record (Record.to_dict when available)."""
+    to_dict = getattr(record, "to_dict", None)
+    return to_dict() if callable(to_dict) else dict(vars(record))
+
+
+def record_size(record):
+    """Approximate upload size of a record in bytes."""
+    return len(json.dumps(record_payload(record), ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def content_id(*parts):
+    """Deterministic record id derived from the record content, so re-ingesting the same data is idempotent."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def pack_batches(records, max_batch_bytes=MAX_BATCH_BYTES, max_batch_records=MAX_BATCH_RECORDS, size=record_size):
+    """
+    Group records into batches of at most max_batch_records records and max_batch_bytes bytes.
+    A record larger than max_batch_bytes is sent in a batch of its own.
+    :param records: Iterable of records, consumed lazily.
+    :return: Generator of (batch, batch_bytes) tuples.
+    """
+    batch, batch_bytes = [], 0
+    for record in records:
+        record_bytes = size(record)
+        if batch and (len(batch) >= max_batch_records or batch_bytes + record_bytes > max_batch_bytes):
+            yield batch, batch_bytes
+            batch, batch_bytes = [], 0
+        batch.append(record)
+        batch_bytes += record_bytes
+    if batch:
+        yield batch, batch_bytes
+
+
+class BulkUpserter:
+    """
+    Uploads records to an index with bounded concurrency, size-aware batching and retries.
+    The index only needs an upsert(records) method; records need an id attribute.
+    """
+
+    def __init__(
+        self,
+        index,
+        max_batch_bytes=MAX_BATCH_BYTES,
+        max_batch_records=MAX_BATCH_RECORDS,
+        max_workers=4,
+        max_retries=3,
+        backoff=1.0,
+        max_backoff=30.0,
+        sleep=time.sleep,
+        verbose=True,
+    ):
+        """
+        :param index: The index, e.g. created with IndexFactory.create, or a LocalIndex.
+        :param max_batch_bytes: Maximum payload size of a batch.
+        :param max_batch_records: Maximum number of records in a batch.
+        :param max_workers: Number of batches in flight.
+        :param max_retries: Number of retries after a failed upload of a batch.
+        :param backoff: Base delay in seconds; retry n waits a random delay in [0, backoff * 2**n].
+        :param max_backoff: Upper bound of a retry delay.
+        :param sleep: Sleep function, replaceable in tests.
+        :param verbose: Whether to print retries, failures and the final summary.
+        """
+        self.index = index
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_records = max_batch_records
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.verbose = verbose
+        self.upserted_ids = set()
+        self.failed_ids = []
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def _upload(self, batch_idx, batch, batch_bytes):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.index.upsert(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self.failed_ids.extend(record.id for record in batch)
+                    self._count("failed_batches")
+                    if self.verbose:
+                        print(f"[!] Batch {batch_idx} ({len(batch)} records) failed after {attempt + 1} attempts: {e}")
+                    return
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+                self._count("retries")
+                if self.verbose:
+                    print(f"[!] Batch {batch_idx} failed ({e}), retrying in {delay:.1f}s")
+                self.sleep(delay)
+            else:
+                with self._lock:
+                    self.upserted_ids.update(record.id for record in batch)
+                self._count("records", len(batch))
+                self._count("bytes", batch_bytes)
+                self._count("batches")
+                return
+
+    def upsert(self, records):
+        """
+        Upload records, skipping those whose id was already acknowledged by this upserter.
+        :param records: Iterable of records, e.g. a generator; at most max_workers * 2 batches are held in memory.
+        :return: The stats dict: records, batches, bytes, retries, failed_batches, skipped, elapsed, records_per_sec.
+        """
+        self.failed_ids = []
+        self.stats = {"records": 0, "batches": 0, "bytes": 0, "retries": 0, "failed_batches": 0, "skipped": 0}
+        start = time.perf_counter()
+
+        def fresh(records):
+            for record in records:
+                if record.id in self.upserted_ids:
+                    self._count("skipped")
+                    continue
+                yield record
+
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            batches = pack_batches(fresh(records), self.max_batch_bytes, self.max_batch_records)
+            for batch_idx, (batch, batch_bytes) in enumerate(batches):
+                if len(pending) >= self.max_workers * 2:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(executor.submit(self._upload, batch_idx, batch, batch_bytes))
+            wait(pending)
+
+        elapsed = time.perf_counter() - start
+        self.stats["elapsed"] = elapsed
+        self.stats["records_per_sec"] = self.stats["records"] / elapsed if elapsed > 0 else 0.0
+        if self.verbose:
+            print(
+                f"[✓] Upserted {self.stats['records']} records in {self.stats['batches']} batches "
+                f"({self.stats['records_per_sec']:.0f} records/s, {self.stats['retries']} retries, "
+                f"{self.stats['failed_batches']} failed batches, {self.stats['skipped']} already upserted)"
+            )
+        return self.stats
+
+
+class LocalIndex:
+    """
+    In-memory index keyed by record id, with optional latency and injected failures.
+    A failing upsert may store part of its batch first, like a request that times out after landing.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.records = {}
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def upsert(self, records):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+            landed = self._random.randint(0, len(records)) if fail else len(records)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            for record in records[:landed]:
+                self.records[record.id] = record
+        if fail:
+            raise ConnectionError("injected upsert failure")
+
+    def count(self):
+        return len(self.records)
+
+
+class _DemoRecord:
+    def __init__(self, id, value, attributes=None):
+        self.id = id
+        self.value = value
+        self.attributes = attributes or {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per upsert call")
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    records = [
+        _DemoRecord(content_id("demo", i), f"Question: example {i}; \nSQL: SELECT {i}", {"Database Id": f"db{i % 70}"})
+        for i in range(args.records)
+    ]
+    for workers in sorted({1, args.workers}):
+        index = LocalIndex(latency=args.latency, failure_rate=args.failure_rate)
+        upserter = BulkUpserter(index, max_batch_bytes=64 * 1024, max_workers=workers, backoff=0.01, verbose=False)
+        stats = upserter.upsert(records)
+        print(
+            f"[✓] workers={workers}: {stats['records_per_sec']:.0f} records/s, {stats['batches']} batches, "
+            f"{stats['retries']} retries, {stats['failed_batches']} failed, index count {index.count()} of {args.records}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Incremental reading of large JSON array files such as the BIRD/Spider train sets.
+
+iter_json_array yields the elements of a top-level JSON array one at a time while reading the file in
+fixed-size blocks, so memory holds one block and the element being decoded instead of the whole
+document. batched groups any iterable into bounded lists for upserts.
+"""
+import re
+import json
+from itertools import islice
+
+READ_SIZE = 1 << 16
+_SEPARATORS = re.compile(r"[\s,]*")
+_WHITESPACE = re.compile(r"\s*")
+# Characters that can continue a number cut at the end of a block, e.g. "1." or "1.5e"
+_NUMBER_CONTINUATION = frozenset("0123456789.eE+-")
+
+
+def iter_json_array(file_path, read_size=READ_SIZE):
+    """
+    Yield the elements of the top-level JSON array stored in file_path.
+    :param file_path: Path to a JSON file whose root is an array.
+    :param read_size: Number of characters read per block.
+    :return: Generator of the decoded elements, in file order.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        buffer = ""
+        while not buffer:
+            chunk = f.read(read_size)
+            if not chunk:
+                break
+            buffer = chunk.lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{file_path} does not contain a JSON array")
+        pos = 1
+        eof = False
+
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            if pos < len(buffer):
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # An element is complete once a delimiter follows it: a number cut at the end of the
+                    # block decodes as its prefix ("1." or "1.5e" as 1 or 1.5) and may continue in the next one
+                    after = _WHITESPACE.match(buffer, end).end()
+                    if after < len(buffer) and buffer[after] in ",]":
+                        yield item
+                        pos = end
+                        continue
+                    if after == len(buffer) and eof:
+                        raise ValueError(f"{file_path} ends before the JSON array is closed")
+                    if after < len(buffer) and (eof or after > end or buffer[after] not in _NUMBER_CONTINUATION):
+                        raise ValueError(f"{file_path}: expecting ',' or ']' after an array element")
+            elif eof:
+                raise ValueError(f"{file_path} ends before the JSON array is closed")
+
+            # Need more data: keep the unparsed tail and at least double it, so elements larger
+            # than a block are decoded in amortized linear time
+            chunk = f.read(max(read_size, len(buffer) - pos))
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def batched(iterable, batch_size):
+    """
+    Group an iterable into lists of at most batch_size items, consuming it lazily.
+    :param iterable: Any iterable, e.g. a generator of Records.
+    :param batch_size: Maximum number of items per batch.
+    :return: Generator of lists.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
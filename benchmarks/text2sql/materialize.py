@@ -0,0 +1,121 @@
+"""
+Zero-copy materialization of a file under another path, e.g. a BIRD .sqlite database as the .db file
+the SQL tool expects.
+
+Strategies are tried in order until one works on the filesystem at hand:
+- hardlink: a second name for the same inode; no data is written (same filesystem only).
+- reflink: a copy-on-write clone (FICLONE on btrfs/XFS), else an in-kernel os.copy_file_range copy.
+- symlink: a link to the absolute source path.
+- copy: a regular copy (shutil.copyfile).
+
+The target is first created under a temporary name in its directory and then renamed over the target
+path, so concurrent callers never see a partial file and the last one simply replaces an equivalent
+result. An existing target is reused when its size and modification time match the source; copies get
+the modification time of the source for that purpose.
+
+A hardlinked or symlinked target shares its data with the source: open it read-only (the SQL tools use
+enable_commit=False and the evaluation connections mode=ro).
+"""
+import os
+import shutil
+import argparse
+import threading
+
+STRATEGIES = ("hardlink", "reflink", "symlink", "copy")
+# ioctl request cloning a whole file on Linux (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+
+
+def is_materialized(source, target):
+    """Whether target holds the current content of source, judged by size and modification time."""
+    try:
+        source_stat, target_stat = os.stat(source), os.stat(target)
+    except OSError:
+        return False
+    return (source_stat.st_size, source_stat.st_mtime_ns) == (target_stat.st_size, target_stat.st_mtime_ns)
+
+
+def _reflink(source, target):
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            import fcntl
+
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return
+        except (ImportError, OSError):
+            pass
+        if not hasattr(os, "copy_file_range"):
+            raise OSError("copy_file_range is not available on this platform")
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                raise OSError("copy_file_range copied no data")
+            remaining -= copied
+
+
+def _create(strategy, source, target):
+    """Create target from source with one strategy; raises OSError when the strategy is not supported."""
+    if strategy == "hardlink":
+        os.link(source, target)
+    elif strategy == "symlink":
+        os.symlink(os.path.abspath(source), target)
+    elif strategy in ("reflink", "copy"):
+        if strategy == "reflink":
+            _reflink(source, target)
+        else:
+            shutil.copyfile(source, target)
+        stat = os.stat(source)
+        os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    else:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+
+
+def materialize(source, target, strategies=STRATEGIES):
+    """
+    Make the content of source available at target with the cheapest strategy that works.
+    :param source: Path of the existing file.
+    :param target: Path to create; its directory must exist.
+    :param strategies: Strategies to try, in order (see STRATEGIES).
+    :return: The strategy used, or "existing" when target was already up to date.
+    """
+    if not os.path.isfile(source):
+        raise FileNotFoundError(f"File not found: {source}")
+    if is_materialized(source, target):
+        return "existing"
+
+    temporary = os.path.join(
+        os.path.dirname(os.path.abspath(target)),
+        f".{os.path.basename(target)}.{os.getpid()}.{threading.get_ident()}.tmp",
+    )
+    errors = []
+    for strategy in strategies:
+        try:
+            if os.path.lexists(temporary):
+                os.remove(temporary)
+            _create(strategy, source, temporary)
+            os.replace(temporary, target)
+        except OSError as e:
+            errors.append(f"{strategy}: {e}")
+            continue
+        finally:
+            if os.path.lexists(temporary):
+                os.remove(temporary)
+        if is_materialized(source, target):
+            return strategy
+        errors.append(f"{strategy}: size or modification time differs from the source")
+    raise OSError(f"Could not materialize {source} as {target} ({'; '.join(errors)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--strategy", action="append", choices=STRATEGIES, help="Strategy to try (repeatable)")
+    args = parser.parse_args()
+    strategy = materialize(args.source, args.target, tuple(args.strategy or STRATEGIES))
+    print(f"[✓] {args.target} ({strategy})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,584 @@
+"""
+EXPLAIN QUERY PLAN profiler and missing-index advisor for the text2sql databases.
+
+Every distinct query of one or more output directories (predictions and ground truth) is planned with
+EXPLAIN QUERY PLAN and timed on its database. Plans are reduced to scan patterns:
+- full scan: SCAN t, a pass over every row of t (or over a non-covering index of t);
+- automatic index: SEARCH t USING AUTOMATIC INDEX (a=?), an index SQLite builds on every execution because
+  the database has none;
+- temp b-tree: USE TEMP B-TREE FOR GROUP BY / ORDER BY / DISTINCT, a sort.
+The patterns are aggregated per db_id and ranked by the time of the queries showing them.
+
+For every full scan and automatic index, an index is proposed from the columns the query reads from the
+table (reported by the SQLite authorizer) and from how the query uses them: equality predicates first,
+then one range predicate, or else the GROUP BY / ORDER BY columns. The other columns read from the table
+are appended when the index stays within MAX_INDEX_COLUMNS columns, so that it covers the query. A
+proposal is kept only if the planner uses it, which is checked on an in-memory copy of the schema (and of
+sqlite_stat1), without copying any data. Proposals that are a prefix of another one are merged into it.
+
+With --build, the proposed indexes are created on evaluation copies of the databases; the originals are
+never written. Every query is then timed again on its copy and its result set is compared with the
+original one, so a speedup is only reported together with unchanged results.
+
+Usage:
+    python query_profiler.py experiments/text2sql_bird_single_agent [more output dirs]
+        [--databases-dir dev_databases] [--build .cache/eval_databases] [--repeat 3] [--output profile.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from collections import defaultdict
+from urllib.request import pathname2url
+from checkpoint import atomic_write_json
+from materialize import materialize
+from result_compare import COMPARISON_MODES, compare_streams
+from result_store import RESULT_FILE_PATTERN, ResultStore, find_result_store, result_file_key
+from sql_execution import REQUIRED_KEYS, QueryTimeout, QueryTooLarge, result_prediction, run_query, stream_query
+from sql_extraction import canonical_sql
+
+MAX_INDEX_COLUMNS = 5
+ROLES = ("prediction", "ground_truth")
+
+_PLAN_ACCESS = re.compile(r"^(?P<op>SCAN|SEARCH) (?:TABLE )?(?P<name>\S+)(?: AS (?P<alias>\S+))?(?: USING (?P<using>.*))?$")
+_PLAN_SORT = re.compile(r"^USE TEMP B-TREE FOR (?P<clause>.+)$")
+_AUTOMATIC_COLUMN = re.compile(r"([^\s=<>()]+)\s*(=|>|<|>=|<=)\s*\?")
+_LITERAL = re.compile(r"'[^']*(?:''[^']*)*'")
+_IDENTIFIER = r"""(?:"[^"]+"|`[^`]+`|\[[^\]]+\]|\w+)"""
+_TABLE_REFERENCE = re.compile(rf"(?:\bFROM|\bJOIN|,)\s*(?P<name>{_IDENTIFIER})(?:\s+(?:AS\s+)?(?P<alias>{_IDENTIFIER}))?", re.I)
+_ORDERING_CLAUSE = re.compile(r"\b(?:GROUP|ORDER)\s+BY\b(.*?)(?=\bLIMIT\b|\bHAVING\b|\bORDER\b|\bWINDOW\b|\)|;|$)", re.I | re.S)
+_EQUALITY_AFTER = re.compile(r"\s*(?:==?(?!=)|\bIN\b|\bIS\b(?!\s+NOT\b))", re.I)
+_RANGE_AFTER = re.compile(r"\s*(?:<=?|>=?|\bBETWEEN\b)(?!>)", re.I)
+_EQUALITY_BEFORE = re.compile(r"(?<![<>!=])==?\s*$")
+_RANGE_BEFORE = re.compile(r"(?:<=?|>=?)\s*$")
+_KEYWORDS = {
+    "where", "join", "inner", "left", "right", "full", "cross", "natural", "outer", "on", "using", "group",
+    "order", "limit", "union", "except", "intersect", "having", "window", "as", "select", "from", "and", "or",
+}
+
+
+def _unquote(identifier):
+    return identifier[1:-1] if identifier[:1] in "\"`[" else identifier
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _mask_literals(sql):
+    """Blank the content of string literals, keeping every position of the query text."""
+    return _LITERAL.sub(lambda m: "'" + " " * (len(m.group()) - 2) + "'", sql)
+
+
+def connect_read_only(db_path):
+    return sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+
+
+def resolve_database(sql_path, databases_dir=None):
+    """
+    Path of the database of a result: its sql_path, or <databases_dir>/<db_id>/<db_id>.sqlite|.db when
+    sql_path points to another machine.
+    """
+    if os.path.isfile(sql_path) or not databases_dir:
+        return sql_path
+    db_id = os.path.splitext(os.path.basename(sql_path))[0]
+    for extension in (".sqlite", ".db"):
+        candidate = os.path.join(databases_dir, db_id, db_id + extension)
+        if os.path.isfile(candidate):
+            return candidate
+    return sql_path
+
+
+def iter_results(output_dir):
+    """The result records of an output directory: its result store, or else its result_{i}.json files."""
+    store_path = find_result_store(output_dir)
+    if store_path is not None:
+        with ResultStore(store_path, read_only=True) as store:
+            yield from store
+        return
+    for name in sorted(os.listdir(output_dir), key=result_file_key):
+        if RESULT_FILE_PATTERN.match(name):
+            with open(os.path.join(output_dir, name), "r", encoding="utf-8") as f:
+                yield json.load(f)
+
+
+def collect_queries(output_dirs, databases_dir=None):
+    """
+    Distinct (database, query) pairs of the results of output_dirs, predictions and ground truth.
+    :return: List of {"db_id", "db_path", "sql", "sources": [(question_id, role)]}.
+    """
+    queries = {}
+    for output_dir in output_dirs:
+        for result in iter_results(output_dir):
+            if not REQUIRED_KEYS.issubset(result):
+                continue
+            db_path = resolve_database(result["sql_path"], databases_dir)
+            for role, sql in zip(ROLES, (result_prediction(result), result["ground_truth"])):
+                if not sql:
+                    continue
+                key = (os.path.abspath(db_path), canonical_sql(sql))
+                query = queries.setdefault(
+                    key,
+                    {"db_id": os.path.splitext(os.path.basename(db_path))[0], "db_path": db_path, "sql": sql, "sources": []},
+                )
+                query["sources"].append((result.get("question_id"), role))
+    return list(queries.values())
+
+
+def read_schema(conn):
+    """Tables of a database: {lowercase name: {"name", "columns": [...], "indexes": [[columns]...]}}."""
+    tables = {}
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(name)})")]
+        indexes = []
+        for row in conn.execute(f"PRAGMA index_list({_quote(name)})"):
+            indexes.append([info[2] for info in conn.execute(f"PRAGMA index_info({_quote(row[1])})")])
+        tables[name.lower()] = {"name": name, "columns": columns, "indexes": indexes}
+    return tables
+
+
+def table_aliases(sql, tables):
+    """Map the lowercase names and aliases of the tables referenced by a query to their table name."""
+    aliases = {}
+    for match in _TABLE_REFERENCE.finditer(_mask_literals(sql)):
+        table = tables.get(_unquote(match.group("name")).lower())
+        if table is None:
+            continue
+        aliases[table["name"].lower()] = table["name"]
+        alias = match.group("alias")
+        if alias and _unquote(alias).lower() not in _KEYWORDS:
+            aliases[_unquote(alias).lower()] = table["name"]
+    return aliases
+
+
+def explain(conn, sql):
+    """
+    Plan a query and list the columns it reads.
+    :return: (plan details, {table: [columns read, in order of first use]}).
+    """
+    reads = defaultdict(dict)
+
+    def authorize(action, table, column, database, source):
+        if action == sqlite3.SQLITE_READ and table and column:
+            reads[table][column] = None
+        return sqlite3.SQLITE_OK
+
+    conn.set_authorizer(authorize)
+    try:
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    finally:
+        conn.set_authorizer(None)
+    return plan, {table: list(columns) for table, columns in reads.items()}
+
+
+def scan_patterns(plan, aliases):
+    """
+    The full scans, automatic indexes and sorts of a plan.
+    :return: List of {"kind", "table", "detail"}, with the automatic index columns as "columns".
+    """
+    patterns = []
+    for detail in plan:
+        match = _PLAN_ACCESS.match(detail)
+        if match:
+            table = aliases.get((match.group("alias") or match.group("name")).lower())
+            using = match.group("using") or ""
+            if table is None:
+                continue
+            if "AUTOMATIC" in using:
+                columns = [(column, "eq" if op == "=" else "range") for column, op in _AUTOMATIC_COLUMN.findall(using)]
+                patterns.append({"kind": "automatic index", "table": table, "detail": detail, "columns": columns})
+            elif match.group("op") == "SCAN" and "COVERING INDEX" not in using:
+                patterns.append({"kind": "full scan", "table": table, "detail": detail})
+            continue
+        match = _PLAN_SORT.match(detail)
+        if match:
+            patterns.append({"kind": "temp b-tree", "table": None, "detail": f"USE TEMP B-TREE FOR {match.group('clause')}"})
+    return patterns
+
+
+def column_roles(sql, table, aliases, columns):
+    """
+    How a query uses the columns of one table: (equality columns, range columns, ordering columns).
+    References qualified with another table's name or alias are ignored.
+    """
+    text = _mask_literals(sql)
+    names = {name for name, target in aliases.items() if target == table}
+    orderings = [match.span(1) for match in _ORDERING_CLAUSE.finditer(text)]
+    equality, ranges, ordering = [], [], []
+    for column in columns:
+        pattern = rf"""(?:(?P<qualifier>{_IDENTIFIER})\s*\.\s*)?(?:"{re.escape(column)}"|`{re.escape(column)}`|\[{re.escape(column)}\]|\b{re.escape(column)}\b)"""
+        for match in re.finditer(pattern, text, re.I):
+            qualifier = match.group("qualifier")
+            if qualifier and _unquote(qualifier).lower() not in names:
+                continue
+            before, after = text[: match.start()], text[match.end() :]
+            if _EQUALITY_AFTER.match(after) or _EQUALITY_BEFORE.search(before):
+                role = equality
+            elif _RANGE_AFTER.match(after) or _RANGE_BEFORE.search(before):
+                role = ranges
+            elif any(start <= match.start() < end for start, end in orderings):
+                role = ordering
+            else:
+                continue
+            if column not in role:
+                role.append(column)
+    return equality, ranges, ordering
+
+
+def propose_index(pattern, sql, aliases, reads, schema):
+    """
+    Index proposed for a full scan or an automatic index, or None.
+    :return: {"table", "columns", "covering"}.
+    """
+    table = pattern["table"]
+    columns_read = reads.get(table, [])
+    if pattern["kind"] == "automatic index":
+        equality = [column for column, role in pattern["columns"] if role == "eq"]
+        ranges = [column for column, role in pattern["columns"] if role == "range"]
+        ordering = []
+    else:
+        equality, ranges, ordering = column_roles(sql, table, aliases, columns_read)
+    key = equality + [column for column in ranges[:1] if column not in equality]
+    if not key:
+        key = ordering
+    if not key:
+        return None
+    key = key[:MAX_INDEX_COLUMNS]
+    others = [column for column in columns_read if column not in key]
+    covering = len(key) + len(others) <= MAX_INDEX_COLUMNS
+    columns = key + others if covering else key
+    # An existing index starting with the same columns is already available to the planner
+    existing = schema[table.lower()]["indexes"]
+    if any([c.lower() for c in index[: len(columns)]] == [c.lower() for c in columns] for index in existing):
+        return None
+    return {"table": table, "columns": columns, "covering": covering}
+
+
+def index_name(proposal):
+    return "advisor_" + "_".join(re.sub(r"\W", "", name) for name in [proposal["table"]] + proposal["columns"])
+
+
+def create_index_sql(proposal, if_not_exists=False):
+    columns = ", ".join(_quote(column) for column in proposal["columns"])
+    exists = "IF NOT EXISTS " if if_not_exists else ""
+    return f"CREATE INDEX {exists}{_quote(index_name(proposal))} ON {_quote(proposal['table'])} ({columns})"
+
+
+def schema_copy(conn):
+    """
+    In-memory database with the schema and planner statistics of conn but none of its rows, to check which
+    hypothetical indexes the planner would use.
+    """
+    memory = sqlite3.connect(":memory:")
+    for (sql,) in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY type != 'table'"
+    ):
+        try:
+            memory.execute(sql)
+        except sqlite3.Error:
+            pass  # e.g. virtual tables whose module is not available
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        memory.execute("ANALYZE")
+        memory.execute("DELETE FROM sqlite_stat1")
+        memory.executemany("INSERT INTO sqlite_stat1 VALUES (?, ?, ?)", conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1"))
+        memory.execute("ANALYZE sqlite_master")  # reload the statistics
+    return memory
+
+
+def _used_proposals(memory, sql, proposals):
+    """The proposals the planner uses for sql once they all exist."""
+    for proposal in proposals:
+        memory.execute(create_index_sql(proposal, if_not_exists=True))
+    try:
+        plan = " ".join(row[3] for row in memory.execute("EXPLAIN QUERY PLAN " + sql))
+    finally:
+        for proposal in proposals:
+            memory.execute(f"DROP INDEX IF EXISTS {_quote(index_name(proposal))}")
+    return [proposal for proposal in proposals if re.search(rf"\b{index_name(proposal)}\b", plan)]
+
+
+def time_query(conn, sql, repeat=1, timeout=60.0, max_rows=1_000_000):
+    """
+    Best wall time of a query over repeat runs.
+    :return: (seconds, number of rows).
+    """
+    best, rows = None, 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(run_query(conn, sql, timeout=timeout, max_rows=max_rows))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+
+def profile_queries(queries, repeat=1, timeout=60.0, verbose=True):
+    """
+    Plan and time every query, and propose indexes for its full scans and automatic indexes.
+    :param queries: Queries from collect_queries.
+    :param repeat: Number of timed runs per query; the best is kept.
+    :param timeout: Time budget of each run in seconds.
+    :return: The queries, each with "plan", "patterns", "proposals", "time", "rows" and "error".
+    """
+    by_database = defaultdict(list)
+    for query in queries:
+        by_database[query["db_path"]].append(query)
+
+    for db_path, database_queries in by_database.items():
+        if not os.path.isfile(db_path):
+            for query in database_queries:
+                query.update(plan=[], patterns=[], proposals=[], time=None, rows=None, error="database not found")
+            if verbose:
+                print(f"[!] Database not found: {db_path}")
+            continue
+        conn = connect_read_only(db_path)
+        memory = schema_copy(conn)
+        schema = read_schema(conn)
+        try:
+            for query in database_queries:
+                query.update(plan=[], patterns=[], proposals=[], time=None, rows=None, error=None)
+                try:
+                    query["plan"], reads = explain(conn, query["sql"])
+                    aliases = table_aliases(query["sql"], schema)
+                    query["patterns"] = scan_patterns(query["plan"], aliases)
+                    proposals = []
+                    for pattern in query["patterns"]:
+                        if pattern["table"] is None:
+                            continue
+                        proposal = propose_index(pattern, query["sql"], aliases, reads, schema)
+                        if proposal is not None and proposal not in proposals:
+                            proposals.append(proposal)
+                    query["proposals"] = _used_proposals(memory, query["sql"], proposals) if proposals else []
+                    query["time"], query["rows"] = time_query(conn, query["sql"], repeat, timeout)
+                except (sqlite3.Error, QueryTimeout, QueryTooLarge) as e:
+                    query["error"] = str(e)
+        finally:
+            memory.close()
+            conn.close()
+        if verbose:
+            print(f"[+] Profiled {len(database_queries)} queries on {os.path.basename(db_path)}")
+    return queries
+
+
+def _merge_proposals(proposals):
+    """Merge every proposal whose columns are a prefix of another proposal on the same table into it."""
+    merged = []
+    for proposal in sorted(proposals, key=lambda p: -len(p["columns"])):
+        target = next(
+            (
+                p
+                for p in merged
+                if p["db_path"] == proposal["db_path"]
+                and p["table"] == proposal["table"]
+                and p["columns"][: len(proposal["columns"])] == proposal["columns"]
+            ),
+            None,
+        )
+        if target is None:
+            merged.append(dict(proposal, queries=list(proposal["queries"])))
+        else:
+            target["queries"].extend(q for q in proposal["queries"] if q not in target["queries"])
+    return merged
+
+
+def summarize(queries, top=10):
+    """
+    Aggregate the profiles per db_id.
+    :return: {db_id: {"queries", "errors", "time", "patterns": [...], "proposals": [...]}}, patterns and
+        proposals ranked by the total time of the queries they concern.
+    """
+    summary = {}
+    proposals = defaultdict(list)
+    for index, query in enumerate(queries):
+        database = summary.setdefault(query["db_id"], {"queries": 0, "errors": 0, "time": 0.0, "patterns": {}})
+        database["queries"] += 1
+        if query["error"] is not None:
+            database["errors"] += 1
+            continue
+        database["time"] += query["time"]
+        seen = set()
+        for pattern in query["patterns"]:
+            key = (pattern["kind"], pattern["table"] or "", pattern["detail"] if pattern["table"] is None else "")
+            if key in seen:
+                continue  # e.g. a table scanned again by a subquery
+            seen.add(key)
+            stats = database["patterns"].setdefault(
+                key, {"kind": pattern["kind"], "table": pattern["table"], "queries": 0, "time": 0.0, "max_time": 0.0}
+            )
+            if pattern["table"] is None:
+                stats["detail"] = pattern["detail"]
+            stats["queries"] += 1
+            stats["time"] += query["time"]
+            stats["max_time"] = max(stats["max_time"], query["time"])
+        for proposal in query["proposals"]:
+            proposals[query["db_id"]].append(dict(proposal, db_path=query["db_path"], queries=[index]))
+
+    for db_id, database in summary.items():
+        database["patterns"] = sorted(database["patterns"].values(), key=lambda p: -p["time"])[:top]
+        merged = _merge_proposals(proposals[db_id])
+        for proposal in merged:
+            proposal["time"] = sum(queries[i]["time"] for i in proposal["queries"])
+            proposal["sql"] = create_index_sql(proposal)
+        database["proposals"] = sorted(merged, key=lambda p: -p["time"])
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["time"]))
+
+
+def evaluation_copy_path(source, eval_dir, db_id):
+    """
+    Path of the evaluation copy of a database, <eval_dir>/<db_id>/<file name>.
+    Raises ValueError when writing there could reach the original: eval_dir contains the source, or the
+    path already is the source (the same file, a hard link or a symbolic link to it).
+    """
+    source_real, eval_real = os.path.realpath(source), os.path.realpath(eval_dir)
+    if os.path.commonpath([source_real, eval_real]) == eval_real:
+        raise ValueError(f"The evaluation directory {eval_dir} contains the original database {source}")
+    target = os.path.join(eval_dir, db_id, os.path.basename(source))
+    if os.path.realpath(target) == source_real or (os.path.exists(target) and os.path.samefile(source, target)):
+        raise ValueError(f"{target} is the original database {source}, not a copy")
+    return target
+
+
+def build_indexes(summary, queries, eval_dir, repeat=1, timeout=60.0, comparison="multiset", verbose=True):
+    """
+    Create the proposed indexes on evaluation copies of the databases, then time every query again on its
+    copy and check that its result set is unchanged.
+    :param summary: Output of summarize.
+    :param queries: Profiled queries, updated with "indexed_time" and "unchanged".
+    :param eval_dir: Directory of the copies, laid out as <eval_dir>/<db_id>/<file name>.
+    :param comparison: How result sets are compared: "set", "multiset" or "ordered" (see result_compare).
+    :return: {db_id: {"path", "indexes", "build_time", "added_bytes", "time", "indexed_time", "speedup", "changed"}}.
+        Raises ValueError, before anything is written, when the queries of a db_id come from several database
+        files (e.g. two datasets with a database of the same name): their summary mixes both and one copy
+        could not stand for both.
+    """
+    if comparison not in COMPARISON_MODES:
+        raise ValueError(f"comparison must be one of {COMPARISON_MODES}")
+    # Every database and copy path is checked before anything is written
+    targets = {}
+    for db_id, database in summary.items():
+        if not database["proposals"]:
+            continue
+        paths = sorted({os.path.abspath(query["db_path"]) for query in queries if query["db_id"] == db_id})
+        if len(paths) > 1:
+            raise ValueError(f"The queries of {db_id} come from several databases ({', '.join(paths)}); profile them separately")
+        targets[db_id] = evaluation_copy_path(database["proposals"][0]["db_path"], eval_dir, db_id)
+    report = {}
+    for db_id, target in targets.items():
+        database = summary[db_id]
+        source = database["proposals"][0]["db_path"]
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # A private copy (never a hard or symbolic link): the indexes must not reach the original file
+        if os.path.lexists(target):
+            os.remove(target)
+        materialize(source, target, strategies=("reflink", "copy"))
+
+        start = time.perf_counter()
+        conn = sqlite3.connect(target)
+        try:
+            for proposal in database["proposals"]:
+                conn.execute(create_index_sql(proposal, if_not_exists=True))
+            conn.commit()
+        finally:
+            conn.close()
+        build_time = time.perf_counter() - start
+
+        original, indexed = connect_read_only(source), connect_read_only(target)
+        timed, changed = [], []
+        try:
+            for query in queries:
+                if query["db_id"] != db_id or query["error"] is not None:
+                    continue
+                try:
+                    query["indexed_time"], _ = time_query(indexed, query["sql"], repeat, timeout)
+                    query["unchanged"] = compare_streams(
+                        stream_query(indexed, query["sql"]),
+                        stream_query(original, query["sql"]),
+                        comparison,
+                    )
+                except (sqlite3.Error, QueryTimeout, QueryTooLarge) as e:
+                    query["indexed_time"], query["unchanged"] = None, False
+                    query["error"] = f"on the indexed copy: {e}"
+                if query["unchanged"]:
+                    timed.append(query)
+                else:
+                    changed.append(query["sql"])
+        finally:
+            original.close()
+            indexed.close()
+
+        before = sum(query["time"] for query in timed)
+        after = sum(query["indexed_time"] for query in timed)
+        report[db_id] = {
+            "path": target,
+            "indexes": len(database["proposals"]),
+            "build_time": build_time,
+            "added_bytes": os.path.getsize(target) - os.path.getsize(source),
+            "time": before,
+            "indexed_time": after,
+            "speedup": before / after if after else None,
+            "changed": changed,
+        }
+        if verbose:
+            speedup = f"{before / after:.1f}x" if after else "n/a"
+            print(
+                f"[+] {db_id}: {len(database['proposals'])} indexes built in {build_time:.2f}s "
+                f"(+{report[db_id]['added_bytes'] / 2**20:.1f} MB), {len(timed)} queries "
+                f"{before * 1000:.1f} ms -> {after * 1000:.1f} ms ({speedup})"
+            )
+            for sql in changed:
+                # e.g. a LIMIT without ORDER BY, or a float sum accumulated in another order
+                print(f"[!] {db_id}: result set differs (or failed) on the indexed copy: {sql}")
+    return report
+
+
+def print_summary(summary, top=10):
+    for db_id, database in summary.items():
+        print(
+            f"\n{db_id}: {database['queries']} queries ({database['errors']} errors), "
+            f"{database['time'] * 1000:.1f} ms in total"
+        )
+        for pattern in database["patterns"][:top]:
+            subject = pattern["table"] or pattern.get("detail", "")
+            print(
+                f"    {pattern['kind']:<16}{subject:<40}{pattern['queries']:>5} queries"
+                f"{pattern['time'] * 1000:>12.1f} ms (max {pattern['max_time'] * 1000:.1f} ms)"
+            )
+        for proposal in database["proposals"][:top]:
+            covering = " -- covering" if proposal["covering"] else ""
+            print(f"    [{len(proposal['queries'])} queries, {proposal['time'] * 1000:.1f} ms] {proposal['sql']};{covering}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dirs", nargs="+", help="Output directories holding the results to profile")
+    parser.add_argument("--databases-dir", default="dev_databases", help="Where to find databases missing at their sql_path")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query (the best is kept)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Time budget of each run in seconds")
+    parser.add_argument("--top", type=int, default=10, help="Patterns and proposals listed per database")
+    parser.add_argument("--build", metavar="EVAL_DIR", help="Build the proposed indexes on copies of the databases in EVAL_DIR")
+    parser.add_argument("--comparison", choices=COMPARISON_MODES, default="multiset", help="Result set comparison for --build")
+    parser.add_argument("--output", help="Write the profile, summary and build report to this JSON file")
+    args = parser.parse_args(argv)
+
+    queries = collect_queries(args.output_dirs, args.databases_dir)
+    print(f"[✓] {len(queries)} distinct queries in {len(args.output_dirs)} output directories")
+    profile_queries(queries, args.repeat, args.timeout)
+    summary = summarize(queries, args.top)
+    print_summary(summary, args.top)
+
+    report = None
+    if args.build:
+        print()
+        try:
+            report = build_indexes(summary, queries, args.build, args.repeat, args.timeout, args.comparison)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.output:
+        atomic_write_json(args.output, {"queries": queries, "summary": summary, "build": report}, indent=2)
+        print(f"[✓] Profile saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
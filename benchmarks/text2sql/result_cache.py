@@ -0,0 +1,115 @@
+import os
+import pickle
+import sqlite3
+from sql_extraction import canonical_sql
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ground_truth_results.sqlite")
+
+
+def database_fingerprint(db_path):
+    """
+    Fingerprint a SQLite database file without reading it entirely.
+    Combines the file name, size, modification time and the 100-byte SQLite header, whose
+    file change counter is bumped on every committed write.
+    :param db_path: The path to the SQLite database.
+    :return: A string identifying the current content of the file.
+    """
+    stat = os.stat(db_path)
+    with open(db_path, "rb") as f:
+        header = f.read(100)
+    return f"{os.path.basename(db_path)}:{stat.st_size}:{stat.st_mtime_ns}:{header.hex()}"
+
+
+class GroundTruthCache:
+    """
+    Persistent cache of ground truth result sets keyed by (database fingerprint, canonical SQL).
+    Entries of a database are dropped as soon as its file changes. The cache is a SQLite file in
+    WAL mode so several evaluation workers can read and fill it at the same time.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        self._fingerprints = {}
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "db_path TEXT NOT NULL, fingerprint TEXT NOT NULL, sql TEXT NOT NULL, rows BLOB NOT NULL, "
+                "PRIMARY KEY (fingerprint, sql))"
+            )
+            self._pid = os.getpid()
+            self._fingerprints = {}
+        return self._conn
+
+    def _fingerprint(self, db_path):
+        """Fingerprint a database once per process, dropping the entries of its older versions."""
+        key = os.path.abspath(db_path)
+        stat = os.stat(key)
+        cached = self._fingerprints.get(key)
+        if cached is not None and cached[0] == (stat.st_size, stat.st_mtime_ns):
+            return cached[1]
+
+        fingerprint = database_fingerprint(key)
+        self._connection().execute("DELETE FROM results WHERE db_path = ? AND fingerprint != ?", (key, fingerprint))
+        self._fingerprints[key] = ((stat.st_size, stat.st_mtime_ns), fingerprint)
+        return fingerprint
+
+    def get(self, db_path, sql):
+        """
+        Look up the cached result set of a query.
+        :param db_path: The path to the SQLite database.
+        :param sql: The SQL query.
+        :return: The cached rows, or None on a miss.
+        """
+        row = self._connection().execute(
+            "SELECT rows FROM results WHERE fingerprint = ? AND sql = ?", (self._fingerprint(db_path), canonical_sql(sql))
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def put(self, db_path, sql, rows):
+        """Store the result set of a query."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO results (db_path, fingerprint, sql, rows) VALUES (?, ?, ?, ?)",
+            (os.path.abspath(db_path), self._fingerprint(db_path), canonical_sql(sql), pickle.dumps(rows, pickle.HIGHEST_PROTOCOL)),
+        )
+
+    def fetch(self, conn, db_path, sql):
+        """
+        Return the result set of a query, executing it on conn only on a cache miss.
+        Failing queries are not cached.
+        :param conn: An open connection to the database.
+        :param db_path: The path to the SQLite database.
+        :param sql: The SQL query.
+        :return: The list of result rows.
+        """
+        rows = self.get(db_path, sql)
+        if rows is not None:
+            self.hits += 1
+            return rows
+
+        self.misses += 1
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        self.put(db_path, sql, rows)
+        return rows
+
+    def clear(self):
+        """Remove every cached result set."""
+        self._connection().execute("DELETE FROM results")
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
@@ -0,0 +1,112 @@
+"""
+Exact, early-exiting comparison of two query result sets.
+
+Both results arrive as iterables of row batches (cursor.fetchmany). The predicted batches are checked
+as they are fetched, so a wrong prediction stops being read at the first batch that proves the mismatch:
+- ordered: both results are read in lockstep and rows must be equal position by position.
+- multiset: the ground truth is read into a Counter first; rows must be equal up to order, duplicates included.
+- set: the ground truth is read into a set first; rows must be equal up to order and duplicates, exactly
+  as set(predicted) == set(ground_truth).
+
+Rows are compared with Python equality, never through a digest, so results agree with rows_match on
+materialized results (and 1 == 1.0, as in set()).
+
+Memory: the ordered mode holds one batch of each result. The unordered modes hold the whole ground truth
+result (its distinct rows, with a count each in multiset mode) plus one batch of the prediction, so their
+memory grows with the size of the gold result, which is not budgeted; only the predicted rows are capped
+(max_rows in sql_execution.configure).
+"""
+from collections import Counter
+
+COMPARISON_MODES = ("set", "multiset", "ordered")
+
+
+def _next_batch(batches):
+    """Next non-empty batch of an iterator, or None once it is exhausted."""
+    for batch in batches:
+        if batch:
+            return batch
+    return None
+
+
+def distinct_batches(batches):
+    """
+    Deduplicate a stream of row batches in Python. Fallback for queries that cannot be wrapped in
+    SELECT DISTINCT; it keeps every distinct row seen so far.
+    """
+    seen = set()
+    for batch in batches:
+        fresh = []
+        for row in batch:
+            if row not in seen:
+                seen.add(row)
+                fresh.append(row)
+        if fresh:
+            yield fresh
+
+
+def _compare_ordered(predicted_batches, ground_truth_batches):
+    predicted, gold = [], []
+    while True:
+        predicted = predicted or _next_batch(predicted_batches)
+        gold = gold or _next_batch(ground_truth_batches)
+        if predicted is None or gold is None:
+            return predicted is None and gold is None
+        n = min(len(predicted), len(gold))
+        if predicted[:n] != gold[:n]:
+            return False
+        predicted, gold = predicted[n:], gold[n:]
+
+
+def _compare_sets(predicted_batches, ground_truth_batches):
+    gold = set()
+    for batch in ground_truth_batches:
+        gold.update(batch)
+    missing = set(gold)
+    for batch in predicted_batches:
+        rows = set(batch)
+        if not rows <= gold:
+            return False
+        missing -= rows
+    return not missing
+
+
+def _compare_multisets(predicted_batches, ground_truth_batches):
+    remaining = Counter()
+    for batch in ground_truth_batches:
+        remaining.update(batch)
+    left = sum(remaining.values())
+    for batch in predicted_batches:
+        left -= len(batch)
+        if left < 0:
+            return False
+        for row, count in Counter(batch).items():
+            available = remaining.get(row, 0)
+            if available < count:
+                return False
+            remaining[row] = available - count
+    return left == 0
+
+
+def compare_streams(predicted_batches, ground_truth_batches, mode="multiset"):
+    """
+    Compare two results given as iterables of row batches.
+    :param predicted_batches: Batches of rows of the predicted query, read until a mismatch is proven.
+    :param ground_truth_batches: Batches of rows of the ground truth query (held in memory for the
+        unordered modes).
+    :param mode: "ordered", "multiset" or "set".
+    :return: True if the results match.
+    """
+    if mode not in COMPARISON_MODES:
+        raise ValueError(f"mode must be one of {COMPARISON_MODES}")
+    predicted_batches, ground_truth_batches = iter(predicted_batches), iter(ground_truth_batches)
+    if mode == "ordered":
+        return _compare_ordered(predicted_batches, ground_truth_batches)
+    if mode == "set":
+        return _compare_sets(predicted_batches, ground_truth_batches)
+    return _compare_multisets(predicted_batches, ground_truth_batches)
+
+
+def rows_match(predicted_rows, ground_truth_rows, mode="set"):
+    """Compare two materialized results with the same semantics as compare_streams."""
+    return compare_streams([predicted_rows], [ground_truth_rows], mode)
@@ -0,0 +1,301 @@
+"""
+Append-only JSONL store for text2sql benchmark results.
+
+Each result is one JSON line (or one zstd frame per line when compressed), appended as soon as the
+response arrives. A sidecar index records the byte offset and length of every record so a result can
+be read back by question_id without scanning the file, while evaluators read the whole store in a
+single sequential pass.
+
+Convert existing experiment folders made of result_{i}.json files with:
+    python result_store.py experiments/text2sql_bird_single_agent [--compress]
+"""
+import os
+import re
+import sys
+import json
+import glob
+import argparse
+import threading
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+STORE_NAMES = ("results.jsonl", "results.jsonl.zst")
+RESULT_FILE_PATTERN = re.compile(r"^result_(\d+)\.json$")
+
+
+def result_file_key(file_name):
+    """Sort key ordering result_{i}.json files by i (result_2 before result_10); other names go last."""
+    match = RESULT_FILE_PATTERN.match(file_name)
+    return (0, int(match.group(1)), file_name) if match else (1, 0, file_name)
+
+
+def find_result_store(output_dir):
+    """
+    Find the result store of an output directory.
+    :param output_dir: Directory containing the results.
+    :return: The path to the store, or None if the directory only holds result_{i}.json files.
+    """
+    for name in STORE_NAMES:
+        path = os.path.join(output_dir, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class ResultStore:
+    """
+    Append-only result store with an offset index for random access by question_id.
+    Appending the same question_id again supersedes the previous record. append is thread-safe, so
+    concurrent runs can save their responses as they arrive.
+    """
+
+    def __init__(self, path, compress=None, read_only=False):
+        """
+        :param path: Path of the store, usually <output_dir>/results.jsonl.
+        :param compress: Whether records are zstd-compressed. Defaults to True for paths ending in .zst.
+        :param read_only: Open an existing store for reading: append is refused, and neither the store nor
+            its index is modified, even when the index is stale or the last record is torn.
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.read_only = read_only
+        self.compress = path.endswith(".zst") if compress is None else compress
+        if self.compress and zstandard is None:
+            raise ImportError("zstd compressed result stores require the zstandard package: pip install zstandard")
+
+        self._compressor = zstandard.ZstdCompressor(level=3) if self.compress else None
+        self._decompressor = zstandard.ZstdDecompressor() if self.compress else None
+        self._entries = []  # (question_id, offset, length) in write order
+        self._offsets = {}  # question_id -> (offset, length) of its latest record
+        self._data = None
+        self._index = None
+        self._lock = threading.Lock()
+
+        if not read_only:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._load_index()
+
+    def _encode(self, record):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        return self._compressor.compress(line) if self.compress else line
+
+    def _decode(self, payload):
+        if self.compress:
+            payload = self._decompressor.decompress(payload)
+        return json.loads(payload.decode("utf-8"))
+
+    def _add_entry(self, question_id, offset, length):
+        self._entries.append((question_id, offset, length))
+        self._offsets[question_id] = (offset, length)
+
+    def _frame_length(self, view, position):
+        """
+        Length of the zstd frame starting at position, or None if it is truncated or corrupt. The frame is fed to
+        the decompressor in chunks that double in size, so only about the frame's own bytes are copied.
+        """
+        decompressor = self._decompressor.decompressobj()
+        fed, chunk = 0, 4096
+        try:
+            while position + fed < len(view):
+                piece = view[position + fed : position + fed + chunk]
+                decompressor.decompress(piece)
+                fed += len(piece)
+                if decompressor.eof:
+                    return fed - len(decompressor.unused_data)
+                chunk *= 2
+        except zstandard.ZstdError:
+            return None
+        return None
+
+    def _scan(self, start):
+        """Yield (offset, payload) for every complete record stored from byte start onwards."""
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+
+        view = memoryview(data)
+        position = 0
+        while position < len(data):
+            if self.compress:
+                length = self._frame_length(view, position)
+                if length is None:
+                    return
+            else:
+                end = data.find(b"\n", position)
+                if end < 0:
+                    return
+                length = end + 1 - position
+            yield start + position, data[position : position + length]
+            position += length
+
+    def _load_index(self):
+        """
+        Load the sidecar index, re-indexing any records written after it. When the store is writable, a torn
+        last record is dropped and the index is rewritten if it was stale.
+        """
+        stale = False
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        question_id, offset, length = json.loads(line)
+                    except ValueError:
+                        stale = True  # torn last line after a crash
+                        break
+                    self._add_entry(question_id, offset, length)
+        else:
+            stale = os.path.isfile(self.path)
+
+        data_size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        indexed_end = max((offset + length for _, offset, length in self._entries), default=0)
+        if indexed_end > data_size:
+            # The index points past the data: rebuild it from scratch
+            self._entries, self._offsets = [], {}
+            indexed_end = 0
+            stale = True
+
+        end = indexed_end
+        if data_size > indexed_end:
+            stale = True
+            for offset, payload in self._scan(indexed_end):
+                self._add_entry(self._decode(payload).get("question_id"), offset, len(payload))
+                end = offset + len(payload)
+            if end < data_size and not self.read_only:
+                # Drop the partially written record left by a crash
+                with open(self.path, "r+b") as f:
+                    f.truncate(end)
+
+        if stale and not self.read_only:
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                for entry in self._entries:
+                    f.write(json.dumps(entry) + "\n")
+
+    def append(self, record):
+        """
+        Append a result record. The record is flushed before its index entry is written.
+        :param record: The result dict; its "question_id" is used as the key.
+        """
+        if self.read_only:
+            raise ValueError(f"{self.path} is opened read-only")
+        payload = self._encode(record)
+        with self._lock:
+            if self._data is None:
+                self._data = open(self.path, "ab")
+                self._index = open(self.index_path, "a", encoding="utf-8")
+
+            offset = self._data.seek(0, os.SEEK_END)
+            self._data.write(payload)
+            self._data.flush()
+
+            entry = (record.get("question_id"), offset, len(payload))
+            self._index.write(json.dumps(entry) + "\n")
+            self._index.flush()
+            self._add_entry(*entry)
+
+    def _flush(self):
+        with self._lock:
+            if self._data is not None:
+                self._data.flush()
+
+    def get(self, question_id, default=None):
+        """
+        Read the latest record of a question without scanning the store.
+        :param question_id: The question id.
+        :param default: Value returned when the question is not in the store.
+        :return: The result record.
+        """
+        location = self._offsets.get(question_id)
+        if location is None:
+            return default
+        self._flush()
+        offset, length = location
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return self._decode(f.read(length))
+
+    def __iter__(self):
+        """Yield the latest record of every question, in write order, in one sequential read."""
+        self._flush()
+        if not self._entries:
+            return
+        with open(self.path, "rb") as f:
+            position = 0
+            for question_id, offset, length in self._entries:
+                if self._offsets[question_id] != (offset, length):
+                    continue  # superseded by a later record
+                if offset != position:
+                    f.seek(offset)
+                payload = f.read(length)
+                position = offset + length
+                yield self._decode(payload)
+
+    def __contains__(self, question_id):
+        return question_id in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def question_ids(self):
+        """The ids of the stored questions, in write order."""
+        return [question_id for question_id, offset, length in self._entries if self._offsets[question_id] == (offset, length)]
+
+    def close(self):
+        with self._lock:
+            for handle in (self._data, self._index):
+                if handle is not None:
+                    handle.close()
+            self._data = self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_result_dir(output_dir, compress=False, overwrite=False):
+    """
+    Convert a folder of result_{i}.json files into a result store, in numeric order of i.
+    The original files are left untouched.
+    :param output_dir: Directory containing the result_{i}.json files.
+    :param compress: Whether to write a zstd-compressed store.
+    :param overwrite: Whether to replace an existing store.
+    :return: The path to the store.
+    """
+    store_path = os.path.join(output_dir, STORE_NAMES[1] if compress else STORE_NAMES[0])
+    if os.path.exists(store_path):
+        if not overwrite:
+            print(f"[✓] Result store already exists: {store_path}")
+            return store_path
+        for path in (store_path, store_path + ".idx"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    files = sorted((f for f in os.listdir(output_dir) if RESULT_FILE_PATTERN.match(f)), key=result_file_key)
+    with ResultStore(store_path, compress=compress) as store:
+        for file_name in files:
+            with open(os.path.join(output_dir, file_name), "r", encoding="utf-8") as f:
+                store.append(json.load(f))
+
+    print(f"[+] Converted {len(files)} result files into: {store_path}")
+    return store_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert result_{i}.json folders into JSONL result stores.")
+    parser.add_argument("output_dirs", nargs="+", help="Experiment folders (glob patterns are expanded)")
+    parser.add_argument("--compress", action="store_true", help="Write zstd-compressed stores (requires zstandard)")
+    parser.add_argument("--overwrite", action="store_true", help="Replace existing stores")
+    args = parser.parse_args(argv)
+
+    for pattern in args.output_dirs:
+        for output_dir in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.isdir(output_dir):
+                convert_result_dir(output_dir, compress=args.compress, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
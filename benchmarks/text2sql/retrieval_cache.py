@@ -0,0 +1,127 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DEFAULT_DISK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "retrieval_results.sqlite")
+
+
+class RetrievalCache:
+    """
+    Two-tier cache of retrieval results keyed by (model_id, query, num_results).
+    The memory tier is a thread-safe LRU bounded by max_entries; the optional disk tier is a SQLite
+    file shared by reruns and processes. Entries of both tiers expire after ttl seconds.
+    """
+
+    def __init__(self, max_entries=4096, ttl=24 * 3600, disk_path=None, clock=time.time):
+        """
+        :param max_entries: Maximum number of results kept in memory.
+        :param ttl: Lifetime of an entry in seconds, or None for entries that never expire.
+        :param disk_path: Path of the on-disk tier (e.g. DEFAULT_DISK_PATH), or None for memory only.
+        :param clock: Time function, replaceable in tests.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.clock = clock
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and self.clock() - stored_at > self.ttl
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            conn = sqlite3.connect(self.disk_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "model_id TEXT NOT NULL, query TEXT NOT NULL, num_results INTEGER NOT NULL, "
+                "stored_at REAL NOT NULL, value TEXT NOT NULL, PRIMARY KEY (model_id, query, num_results))"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _remember(self, key, stored_at, value):
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, model_id, query, num_results):
+        """
+        Look a result up in memory, then on disk.
+        :return: The cached result, or None on a miss.
+        """
+        key = (str(model_id), query, num_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        if self.disk_path is not None:
+            row = self._connection().execute(
+                "SELECT stored_at, value FROM results WHERE model_id = ? AND query = ? AND num_results = ?", key
+            ).fetchone()
+            if row is not None and not self._expired(row[0]):
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.disk_hits += 1
+                return row[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model_id, query, num_results, value):
+        """Store a result in memory and, if enabled, on disk."""
+        key = (str(model_id), query, num_results)
+        stored_at = self.clock()
+        self._remember(key, stored_at, value)
+        if self.disk_path is not None:
+            self._connection().execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", key + (stored_at, value))
+
+    def get_or_retrieve(self, model_id, query, num_results, retrieve):
+        """
+        Return the cached result or call retrieve() and cache what it returns.
+        Empty results are not cached, since retrieve_docs returns "" when the request fails.
+        """
+        value = self.get(model_id, query, num_results)
+        if value is None:
+            value = retrieve()
+            if value:
+                self.put(model_id, query, num_results, value)
+        return value
+
+    def clear(self):
+        """Drop every entry of both tiers and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if self.disk_path is not None:
+            self._connection().execute("DELETE FROM results")
+
+    def stats(self):
+        """Hit/miss counters and the memory tier size."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,161 @@
+"""
+Reproducible stratified sampling of benchmark questions.
+
+Samples are drawn as indices into the column lists of decouple_question_schema's output, so no entry
+is copied before it is selected. Questions are balanced across databases (each db_id gets an equal
+share, the remainder going to the databases that have questions left) and, within a database,
+allocated to difficulty levels in proportion to their sizes. Every draw comes from one seeded
+random.Random, so a seed always yields the same subset.
+
+For train-scale inputs, stratified_reservoir_sample draws the same kind of sample from a stream in a
+single pass, keeping at most total_samples indices per stratum.
+
+A frozen manifest (the selected question_ids plus the seed) makes every configuration of a benchmark
+run on exactly the same questions.
+"""
+import os
+import json
+import random
+from collections import defaultdict
+from checkpoint import atomic_write_json
+
+
+def _stratum_order(stratum):
+    # db_id and difficulty may be None; compare them as strings so the order is always defined
+    parts = stratum if isinstance(stratum, tuple) else (stratum,)
+    return tuple("" if part is None else str(part) for part in parts)
+
+
+def _largest_remainder(quota, sizes):
+    """
+    Split quota between strata in proportion to their sizes, never giving a stratum more than its size.
+    :param quota: Number of items to allocate.
+    :param sizes: Dict of stratum -> number of available items.
+    :return: Dict of stratum -> allocated count.
+    """
+    allocation = {stratum: 0 for stratum in sizes}
+    quota = min(quota, sum(sizes.values()))
+    while quota > 0:
+        open_strata = sorted((s for s in sizes if allocation[s] < sizes[s]), key=_stratum_order)
+        spare = {s: sizes[s] - allocation[s] for s in open_strata}
+        total_spare = sum(spare.values())
+        shares = {s: quota * spare[s] / total_spare for s in open_strata}
+        granted = {s: min(spare[s], int(shares[s])) for s in open_strata}
+        left = quota - sum(granted.values())
+        # Hand out the rest by largest fractional part; ties are broken by stratum order
+        for s in sorted(open_strata, key=lambda s: shares[s] - int(shares[s]), reverse=True):
+            if left == 0:
+                break
+            if granted[s] < spare[s]:
+                granted[s] += 1
+                left -= 1
+        for s in open_strata:
+            allocation[s] += granted[s]
+        quota = left
+    return allocation
+
+
+def allocate(counts, total_samples):
+    """
+    Decide how many questions to take from every (db_id, difficulty) stratum.
+    Each database gets total_samples // number_of_databases questions (or all of its questions if it
+    has fewer), the remaining slots go to the databases with questions left in proportion to how
+    many they have left, and each database's share is split across its difficulty levels
+    proportionally.
+    :param counts: Dict of (db_id, difficulty) -> number of questions.
+    :param total_samples: The total number of questions to select.
+    :return: Dict of (db_id, difficulty) -> number of questions to select.
+    """
+    db_sizes = defaultdict(int)
+    for (db_id, _), count in counts.items():
+        db_sizes[db_id] += count
+    if not db_sizes:
+        return {}
+
+    base_per_db = total_samples // len(db_sizes)
+    db_quota = {db_id: min(size, base_per_db) for db_id, size in db_sizes.items()}
+    remaining = total_samples - sum(db_quota.values())
+    if remaining > 0:
+        extra = _largest_remainder(remaining, {db_id: db_sizes[db_id] - db_quota[db_id] for db_id in db_sizes})
+        for db_id, count in extra.items():
+            db_quota[db_id] += count
+
+    allocation = {}
+    for db_id, quota in db_quota.items():
+        by_difficulty = {stratum: count for stratum, count in counts.items() if stratum[0] == db_id}
+        allocation.update(_largest_remainder(quota, by_difficulty))
+    return allocation
+
+
+def stratified_sample(db_ids, difficulties, total_samples=100, seed=42):
+    """
+    Draw a balanced sample of question indices.
+    :param db_ids: db_id of every question (e.g. output["field"]).
+    :param difficulties: difficulty of every question (e.g. output["difficulty"]), or None.
+    :param total_samples: The total number of questions to select.
+    :param seed: Seed of the random generator.
+    :return: Sorted list of the selected indices.
+    """
+    if difficulties is None:
+        difficulties = [None] * len(db_ids)
+    strata = defaultdict(list)
+    for i, stratum in enumerate(zip(db_ids, difficulties)):
+        strata[stratum].append(i)
+
+    allocation = allocate({stratum: len(indices) for stratum, indices in strata.items()}, total_samples)
+    rng = random.Random(seed)
+    selected = []
+    for stratum in sorted(strata, key=_stratum_order):
+        selected.extend(rng.sample(strata[stratum], allocation[stratum]))
+    return sorted(selected)
+
+
+def stratified_reservoir_sample(keys, total_samples=100, seed=42):
+    """
+    Draw the same kind of balanced sample as stratified_sample from a stream, in one pass.
+    Each stratum keeps a reservoir of at most total_samples indices (Algorithm R); once the stream ends
+    the allocation is computed from the stratum counts and each reservoir is subsampled to its share.
+    :param keys: Iterable of (db_id, difficulty) tuples, one per question in stream order.
+    :param total_samples: The total number of questions to select.
+    :param seed: Seed of the random generator.
+    :return: Sorted list of the selected stream positions.
+    """
+    rng = random.Random(seed)
+    reservoirs = defaultdict(list)
+    counts = defaultdict(int)
+    for i, stratum in enumerate(keys):
+        counts[stratum] += 1
+        reservoir = reservoirs[stratum]
+        if len(reservoir) < total_samples:
+            reservoir.append(i)
+        else:
+            j = rng.randrange(counts[stratum])
+            if j < total_samples:
+                reservoir[j] = i
+
+    allocation = allocate(dict(counts), total_samples)
+    selected = []
+    for stratum in sorted(reservoirs, key=_stratum_order):
+        selected.extend(rng.sample(reservoirs[stratum], allocation[stratum]))
+    return sorted(selected)
+
+
+def freeze_manifest(path, question_ids, seed, total_samples):
+    """
+    Save the selected question_ids so later runs and other configurations reuse the same subset.
+    :param path: Path of the manifest, e.g. experiments/sample_manifest_bird_100.json.
+    :param question_ids: The selected question_ids, in selection order.
+    """
+    atomic_write_json(path, {"seed": seed, "total_samples": total_samples, "question_ids": list(question_ids)}, indent=2)
+    print(f"[+] Sample manifest saved to: {path}")
+
+
+def load_manifest(path):
+    """
+    Load a frozen manifest.
+    :return: The manifest dict (seed, total_samples, question_ids), or None if path does not exist.
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,280 @@
+"""
+Schema catalog built directly from the SQLite databases.
+
+Every database is introspected once with PRAGMA table_info / foreign_key_list plus a few cheap column
+statistics (row count, null fraction, distinct count and example values over a row sample). The result
+is persisted as one compact JSON artifact keyed by the SHA-256 of the database file; the file size and
+modification time are remembered as well, so an unchanged file is not even re-hashed on the next start.
+Schema text in the CREATE TABLE layout of the bird/*.txt and spider/*.txt files is rendered on demand.
+
+Build or refresh the catalog with:
+    python schema_catalog.py [databases_dir]
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from urllib.request import pathname2url
+from checkpoint import atomic_write_json
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "schema_catalog.json")
+CATALOG_VERSION = 1
+SAMPLE_ROWS = 1000
+MAX_EXAMPLES = 3
+MAX_EXAMPLE_LENGTH = 40
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _example(value):
+    """A JSON-friendly, shortened example value; None for values not worth showing (NULL, blobs)."""
+    if value is None or isinstance(value, bytes):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        return value if len(value) <= MAX_EXAMPLE_LENGTH else value[:MAX_EXAMPLE_LENGTH] + "..."
+    return value
+
+
+def _column_stats(conn, table, columns, sample_rows=SAMPLE_ROWS):
+    """Null fraction, distinct count and a few example values per column, over the first sample_rows rows."""
+    if not columns:
+        return {}
+    select = ", ".join(quote_identifier(column) for column in columns)
+    rows = conn.execute(f"SELECT {select} FROM {quote_identifier(table)} LIMIT {int(sample_rows)}").fetchall()
+
+    stats = {}
+    for i, column in enumerate(columns):
+        values = [row[i] for row in rows]
+        distinct = []
+        seen = set()
+        for value in values:
+            if value is not None and value not in seen:
+                seen.add(value)
+                example = _example(value)
+                if example is not None and len(distinct) < MAX_EXAMPLES:
+                    distinct.append(example)
+        stats[column] = {
+            "sampled": len(values),
+            "null_fraction": round(sum(value is None for value in values) / len(values), 3) if values else 0.0,
+            "distinct": len(seen),
+            "examples": distinct,
+        }
+    return stats
+
+
+def introspect_database(db_path, sample_rows=SAMPLE_ROWS):
+    """
+    Read the structure of a SQLite database.
+    :param db_path: The path to the database.
+    :param sample_rows: Number of rows per table used for the column statistics.
+    :return: Dict with a "tables" list; every table has its name, row_count, columns (name, type, notnull,
+        default, pk position and stats) and foreign_keys (columns, ref_table, ref_columns).
+    """
+    conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+    try:
+        names = [
+            row[0]
+            for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid")
+        ]
+        tables = []
+        for name in names:
+            quoted = quote_identifier(name)
+            columns = [
+                {"name": column, "type": col_type or "", "notnull": bool(notnull), "default": default, "pk": pk}
+                for _, column, col_type, notnull, default, pk in conn.execute(f"PRAGMA table_info({quoted})")
+            ]
+            stats = _column_stats(conn, name, [column["name"] for column in columns], sample_rows)
+            for column in columns:
+                column["stats"] = stats.get(column["name"], {})
+
+            foreign_keys = {}
+            for fk_id, _, ref_table, from_column, to_column, *_ in conn.execute(f"PRAGMA foreign_key_list({quoted})"):
+                fk = foreign_keys.setdefault(fk_id, {"columns": [], "ref_table": ref_table, "ref_columns": []})
+                fk["columns"].append(from_column)
+                if to_column is not None:
+                    fk["ref_columns"].append(to_column)
+
+            tables.append({
+                "name": name,
+                "row_count": conn.execute(f"SELECT COUNT(*) FROM {quoted}").fetchone()[0],
+                "columns": columns,
+                "foreign_keys": [foreign_keys[fk_id] for fk_id in sorted(foreign_keys)],
+            })
+        return {"tables": tables}
+    finally:
+        conn.close()
+
+
+def render_schema(schema, tables=None, examples=True):
+    """
+    Render an introspected schema as CREATE TABLE statements, one column per line with a "-- comment"
+    holding the column statistics, in the layout schema_pruning.parse_schema understands.
+    :param schema: A schema returned by introspect_database.
+    :param tables: Optional collection of table names to render (case-insensitive); all tables by default.
+    :param examples: Whether to add example values and distinct counts to the column comments.
+    :return: The schema text.
+    """
+    wanted = {name.lower() for name in tables} if tables is not None else None
+    lines = []
+    for table in schema["tables"]:
+        if wanted is not None and table["name"].lower() not in wanted:
+            continue
+        lines.append(f"CREATE TABLE {quote_identifier(table['name'])} (")
+        lines.append(f"    -- {table['row_count']} rows")
+
+        definitions = []
+        for column in table["columns"]:
+            definition = quote_identifier(column["name"]) + (f" {column['type']}" if column["type"] else "")
+            comment = ""
+            stats = column["stats"]
+            if examples and stats.get("examples"):
+                values = ", ".join(repr(value) if isinstance(value, str) else str(value) for value in stats["examples"])
+                more = f"; {stats['distinct']} distinct" if stats["distinct"] > len(stats["examples"]) else ""
+                comment = f"e.g. {values}{more}"
+            definitions.append((definition, comment))
+
+        primary_key = [column["name"] for column in sorted(table["columns"], key=lambda c: c["pk"]) if column["pk"]]
+        if primary_key:
+            definitions.append((f"PRIMARY KEY ({', '.join(map(quote_identifier, primary_key))})", ""))
+        for fk in table["foreign_keys"]:
+            ref_columns = f"({', '.join(map(quote_identifier, fk['ref_columns']))})" if fk["ref_columns"] else ""
+            definitions.append((
+                f"FOREIGN KEY ({', '.join(map(quote_identifier, fk['columns']))}) "
+                f"REFERENCES {quote_identifier(fk['ref_table'])}{ref_columns}",
+                "",
+            ))
+
+        for i, (definition, comment) in enumerate(definitions):
+            separator = "," if i < len(definitions) - 1 else ""
+            lines.append(f"    {definition}{separator}" + (f"  -- {comment}" if comment else ""))
+        lines.append(")")
+    return "\n".join(lines)
+
+
+class SchemaCatalog:
+    """
+    Persistent catalog of introspected database schemas keyed by file hash.
+    Loading the catalog and looking up an unchanged database costs one stat call; a new or modified
+    file is hashed, and only introspected when no schema with that hash is stored yet.
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH, sample_rows=SAMPLE_ROWS):
+        """
+        :param path: Path of the JSON artifact. It is created on the first save.
+        :param sample_rows: Number of rows per table used for the column statistics of new databases.
+        """
+        self.path = path
+        self.sample_rows = sample_rows
+        self.files = {}  # absolute path -> {"size", "mtime_ns", "sha256"}
+        self.schemas = {}  # sha256 -> introspected schema
+        self.introspected = 0
+        self._dirty = False
+        self._rendered = {}
+
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CATALOG_VERSION:
+                self.files = data["files"]
+                self.schemas = data["schemas"]
+
+    def file_hash(self, db_path):
+        """The SHA-256 of a database file, re-hashing it only if its size or modification time changed."""
+        key = os.path.abspath(db_path)
+        stat = os.stat(key)
+        known = self.files.get(key)
+        if known is not None and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"]
+
+        sha256 = file_sha256(key)
+        self.files[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+        self._dirty = True
+        return sha256
+
+    def get(self, db_path):
+        """
+        The introspected schema of a database, introspecting it on first use.
+        :param db_path: The path to the SQLite database.
+        :return: The schema dict (see introspect_database).
+        """
+        sha256 = self.file_hash(db_path)
+        schema = self.schemas.get(sha256)
+        if schema is None:
+            schema = introspect_database(db_path, self.sample_rows)
+            self.schemas[sha256] = schema
+            self.introspected += 1
+            self._dirty = True
+        return schema
+
+    def render(self, db_path, tables=None, examples=True):
+        """
+        Render the schema text of a database (see render_schema). Full renders are memoized per file hash.
+        :param db_path: The path to the SQLite database.
+        """
+        schema = self.get(db_path)
+        if tables is not None:
+            return render_schema(schema, tables, examples)
+        key = (self.file_hash(db_path), examples)
+        if key not in self._rendered:
+            self._rendered[key] = render_schema(schema, None, examples)
+        return self._rendered[key]
+
+    def build(self, databases_dir="dev_databases"):
+        """
+        Add every .sqlite/.db file under databases_dir to the catalog and save it.
+        :return: The number of databases in the directory.
+        """
+        paths = []
+        for root, _, files in os.walk(databases_dir):
+            paths.extend(os.path.join(root, f) for f in sorted(files) if f.endswith((".sqlite", ".db")))
+        for db_path in paths:
+            self.get(db_path)
+        self.save()
+        return len(paths)
+
+    def save(self):
+        """Persist the catalog if it changed, dropping the schemas no known file points to anymore."""
+        if not self._dirty:
+            return
+        live = {entry["sha256"] for entry in self.files.values()}
+        self.schemas = {sha256: schema for sha256, schema in self.schemas.items() if sha256 in live}
+        atomic_write_json(self.path, {"version": CATALOG_VERSION, "files": self.files, "schemas": self.schemas}, separators=(",", ":"))
+        self._dirty = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the schema catalog of the benchmark databases.")
+    parser.add_argument("databases_dir", nargs="?", default="dev_databases")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_PATH, help="Path of the catalog artifact")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    catalog = SchemaCatalog(args.catalog)
+    loaded = time.perf_counter()
+    count = catalog.build(args.databases_dir)
+    elapsed = time.perf_counter() - start
+    print(
+        f"[✓] {count} databases in catalog ({catalog.introspected} introspected), "
+        f"loaded in {(loaded - start) * 1000:.1f} ms, total {elapsed * 1000:.1f} ms: {args.catalog}"
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
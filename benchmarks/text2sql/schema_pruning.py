@@ -0,0 +1,520 @@
+"""
+Local schema linking for text2sql prompts.
+
+The schema dumps in bird/*.txt and spider/*.txt are parsed into tables, columns and foreign keys.
+Columns are scored against the question by lexical overlap with their names and comments and,
+when the database is available, by matching question literals against stored values. The pruned
+schema keeps the relevant tables and columns, the keys joining them and any bridge tables on the
+foreign-key paths between them, rendered in the same format as the original dump.
+
+Report the token reduction and the recall of the gold-query columns on the bundled question sets with:
+    python schema_pruning.py [selected_bird_questions_100.json selected_spider_questions_100.json]
+"""
+import os
+import re
+import sys
+import json
+import sqlite3
+from collections import deque
+from functools import lru_cache
+from urllib.request import pathname2url
+from schema_catalog import quote_identifier
+
+_IDENTIFIER = r'"[^"]+"|`[^`]+`|\[[^\]]+\]|\'[^\']+\'|[A-Za-z_][\w$]*'
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(" + _IDENTIFIER + r")\s*\(?\s*$", re.IGNORECASE)
+_COLUMN = re.compile(r"^\s*(" + _IDENTIFIER + r")")
+_FOREIGN_KEY = re.compile(
+    r"FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s*(" + _IDENTIFIER + r")\s*(?:\(([^)]*)\))?", re.IGNORECASE
+)
+_PRIMARY_KEY = re.compile(r"PRIMARY\s+KEY\s*\(([^)]*)\)", re.IGNORECASE)
+_CONSTRAINT_START = re.compile(r"^\s*(CONSTRAINT|PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE|CHECK)\b", re.IGNORECASE)
+_WORD = re.compile(r"[A-Za-z]+|\d+")
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_QUOTED_LITERAL = re.compile(r"'([^']+)'|\"([^\"]+)\"")
+_CAPITALIZED_PHRASE = re.compile(r"\b([A-Z][\w.-]*(?:\s+[A-Z][\w.-]*)*)")
+
+STOPWORDS = frozenset(
+    "a an the of in on at to for from by with and or not is are was were be been being this that these those "
+    "what which who whom whose how many much list give show find tell return among all each every "
+    "their its his her it they them there than then as do does did have has had please me more most less least "
+    "number count total average avg id ids table column value values identifier unique".split()
+)
+# Rows of each table whose values are indexed for literal matching, and longest value indexed
+VALUE_INDEX_ROWS = 100_000
+MAX_VALUE_LENGTH = 64
+# Distinct values indexed per text column; other columns (numbers, untyped) are indexed only up to this many
+MAX_COLUMN_VALUES = 5000
+LOW_CARDINALITY = 200
+
+
+def strip_identifier(name):
+    """Remove the quotes, backticks or brackets around an SQL identifier."""
+    name = name.strip()
+    if len(name) >= 2 and name[0] in "\"`['" and name[-1] in "\"`]'":
+        return name[1:-1]
+    return name
+
+
+def _split_identifiers(text):
+    return [strip_identifier(part) for part in text.split(",") if part.strip()]
+
+
+def _stem(word):
+    """Light plural stemming: cities -> city, classes -> class, dates -> date."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith("sses"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercase, stemmed word tokens of text, splitting snake_case and camelCase and dropping stopwords."""
+    tokens = set()
+    for word in _WORD.findall(_CAMEL.sub(" ", text.replace("_", " "))):
+        word = word.lower()
+        if word not in STOPWORDS:
+            tokens.add(_stem(word))
+    return tokens
+
+
+def overlap(question_tokens, tokens):
+    """
+    Number of tokens matched by a question token, either exactly or, for tokens of 4+ characters,
+    by prefix (released ~ release, carcinogenic ~ carcinogen).
+    """
+    matched = 0
+    for token in tokens:
+        if token in question_tokens:
+            matched += 1
+        elif len(token) >= 4 and any(len(q) >= 4 and (q.startswith(token) or token.startswith(q)) for q in question_tokens):
+            matched += 1
+    return matched
+
+
+def count_tokens(text):
+    """Approximate LLM token count: words, numbers and punctuation marks."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+class SchemaLine:
+    """One line of a CREATE TABLE body: the definition (without trailing comma) and its comment."""
+
+    def __init__(self, definition, comment):
+        self.definition = definition
+        self.comment = comment
+
+
+class Table:
+    def __init__(self, name, header):
+        self.name = name
+        self.header = header
+        self.columns = {}  # column name -> SchemaLine, in declaration order
+        self.constraints = []  # (SchemaLine, kind, columns, referenced table, referenced columns)
+        self.primary_key = []
+
+
+class Schema:
+    """Tables, columns and foreign keys parsed from a schema dump."""
+
+    def __init__(self, tables):
+        self.tables = {table.name: table for table in tables}
+        self._lower = {name.lower(): name for name in self.tables}
+        self.foreign_keys = []  # (table, columns, referenced table, referenced columns)
+        for table in tables:
+            for _, kind, columns, ref_table, ref_columns in table.constraints:
+                if kind == "foreign" and ref_table.lower() in self._lower:
+                    self.foreign_keys.append((table.name, columns, self._lower[ref_table.lower()], ref_columns))
+
+    def table(self, name):
+        """Look up a table by case-insensitive name."""
+        key = self._lower.get(name.lower())
+        return self.tables[key] if key else None
+
+    def neighbours(self):
+        """Undirected foreign-key graph: table -> set of tables it joins with."""
+        graph = {name: set() for name in self.tables}
+        for table, _, ref_table, _ in self.foreign_keys:
+            if table != ref_table:
+                graph[table].add(ref_table)
+                graph[ref_table].add(table)
+        return graph
+
+    def render(self, keep=None):
+        """
+        Render the schema in the original dump format.
+        :param keep: Optional dict of table name -> set of column names to keep; None keeps everything.
+        """
+        blocks = []
+        for name, table in self.tables.items():
+            if keep is not None and name not in keep:
+                continue
+            columns = table.columns if keep is None else {c: line for c, line in table.columns.items() if c in keep[name]}
+            lines = list(columns.values())
+            for line, kind, cols, ref_table, _ in table.constraints:
+                if keep is None or all(c in columns for c in cols) and (kind != "foreign" or ref_table in keep or self.table(ref_table) is None):
+                    lines.append(line)
+
+            body = []
+            for i, line in enumerate(lines):
+                text = "    " + line.definition + ("," if i < len(lines) - 1 else "")
+                if line.comment:
+                    text += "  -- " + line.comment
+                body.append(text)
+            blocks.append("\n".join([table.header] + body + [")"]))
+        return "\n".join(blocks)
+
+
+def parse_schema(text):
+    """
+    Parse a schema dump made of CREATE TABLE statements with one column or constraint per line
+    and optional "-- comment" suffixes.
+    :param text: The schema text.
+    :return: A Schema.
+    """
+    tables = []
+    table = None
+    for raw_line in text.splitlines():
+        # Some dumps open the next table on the closing line of the previous one: ") CREATE TABLE ..."
+        match = _CREATE_TABLE.search(raw_line)
+        if match:
+            table = Table(strip_identifier(match.group(1)), raw_line[match.start():].rstrip())
+            tables.append(table)
+            continue
+        if table is None:
+            continue
+
+        definition, _, comment = raw_line.partition("--")
+        definition = definition.strip().rstrip(",").strip()
+        comment = comment.strip()
+        if definition in (")", ");"):
+            table = None
+            continue
+        if not definition:
+            continue
+
+        line = SchemaLine(definition, comment)
+        if _CONSTRAINT_START.match(definition):
+            fk = _FOREIGN_KEY.search(definition)
+            pk = _PRIMARY_KEY.search(definition)
+            if fk:
+                ref_columns = _split_identifiers(fk.group(3)) if fk.group(3) else []
+                table.constraints.append((line, "foreign", _split_identifiers(fk.group(1)), strip_identifier(fk.group(2)), ref_columns))
+            elif pk:
+                table.primary_key.extend(_split_identifiers(pk.group(1)))
+                table.constraints.append((line, "primary", table.primary_key, None, []))
+            else:
+                table.constraints.append((line, "other", [], None, []))
+            continue
+
+        column = _COLUMN.match(definition)
+        if column:
+            name = strip_identifier(column.group(1))
+            if " " in name and column.group(1)[0] == '"' and column.end() == len(definition):
+                # Whole definition quoted, e.g. "uid INTEGER PRIMARY KEY"
+                name = name.split()[0]
+            table.columns[name] = line
+            if re.search(r"\bPRIMARY\s+KEY\b", definition, re.IGNORECASE):
+                table.primary_key.append(name)
+            inline_fk = re.search(r"\bREFERENCES\s+(" + _IDENTIFIER + r")\s*(?:\(([^)]*)\))?", definition, re.IGNORECASE)
+            if inline_fk:
+                ref_columns = _split_identifiers(inline_fk.group(2)) if inline_fk.group(2) else []
+                table.constraints.append((SchemaLine("", ""), "inline_foreign", [name], strip_identifier(inline_fk.group(1)), ref_columns))
+
+    schema = Schema(tables)
+    for table in tables:
+        # Inline REFERENCES clauses are part of the column line; only keep them in the foreign-key graph
+        inline = [c for c in table.constraints if c[1] == "inline_foreign"]
+        table.constraints = [c for c in table.constraints if c[1] != "inline_foreign"]
+        for _, _, columns, ref_table, ref_columns in inline:
+            referenced = schema.table(ref_table)
+            if referenced is not None:
+                schema.foreign_keys.append((table.name, columns, referenced.name, ref_columns))
+    return schema
+
+
+@lru_cache(maxsize=None)
+def _parse_cached(text):
+    return parse_schema(text)
+
+
+def question_literals(question):
+    """Candidate cell values mentioned in a question: quoted strings, capitalized phrases and numbers."""
+    literals = {a or b for a, b in _QUOTED_LITERAL.findall(question)}
+    for phrase in _CAPITALIZED_PHRASE.findall(question):
+        words = phrase.split()
+        if words and words[0].lower() in STOPWORDS:
+            words = words[1:]
+        if words:
+            literals.add(" ".join(words))
+    literals.update(re.findall(r"\b\d+(?:\.\d+)?\b", question))
+    return {literal for literal in literals if len(literal) > 1}
+
+
+def _value_key(value):
+    """Normalized form under which a stored value is matched against question literals, or None."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if value is None or isinstance(value, bytes):
+        return None
+    key = str(value).strip().lower()
+    return key if 0 < len(key) <= MAX_VALUE_LENGTH else None
+
+
+def _is_text_type(declared_type):
+    """Whether a declared column type has TEXT affinity (SQLite rules: it contains CHAR, CLOB or TEXT)."""
+    declared_type = declared_type.upper()
+    return "INT" not in declared_type and any(word in declared_type for word in ("CHAR", "CLOB", "TEXT"))
+
+
+def _column_values(conn, table, column, limit):
+    """
+    Distinct short values of a column among the first VALUE_INDEX_ROWS rows of its table, at most limit + 1 of them.
+    Long values, blobs and NULLs are filtered out by SQLite, so they are never materialized in Python.
+    """
+    quoted = quote_identifier(column)
+    return [
+        row[0]
+        for row in conn.execute(
+            f"SELECT DISTINCT {quoted} FROM (SELECT {quoted} FROM {quote_identifier(table)} LIMIT {int(VALUE_INDEX_ROWS)}) "
+            f"WHERE {quoted} IS NOT NULL AND typeof({quoted}) != 'blob' AND length({quoted}) <= {int(MAX_VALUE_LENGTH)} "
+            f"LIMIT {int(limit) + 1}"
+        )
+    ]
+
+
+@lru_cache(maxsize=2)
+def _value_index(db_path, size, mtime_ns):
+    """
+    Map of normalized stored values to the (table, column) pairs holding them, built from the first
+    VALUE_INDEX_ROWS rows of every table of the database. Built once per database file (size and mtime
+    key the cache), so a question costs dictionary lookups instead of a scan per literal and column.
+    Text columns contribute at most MAX_COLUMN_VALUES distinct values; other columns (numbers, untyped)
+    only when they hold at most LOW_CARDINALITY distinct values, which skips ids, measures and blobs.
+    :return: Dict {value: set of (lowercased table, lowercased column)}.
+    """
+    index = {}
+    conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+    try:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            try:
+                columns = [(row[1], row[2] or "") for row in conn.execute(f"PRAGMA table_info({quote_identifier(table)})")]
+            except sqlite3.Error:
+                continue
+            for column, declared_type in columns:
+                if "BLOB" in declared_type.upper():
+                    continue
+                text = _is_text_type(declared_type)
+                try:
+                    values = _column_values(conn, table, column, MAX_COLUMN_VALUES if text else LOW_CARDINALITY)
+                except sqlite3.Error:
+                    continue
+                if text:
+                    values = values[:MAX_COLUMN_VALUES]
+                elif len(values) > LOW_CARDINALITY:
+                    continue
+                for value in values:
+                    key = _value_key(value)
+                    if key is not None:
+                        index.setdefault(key, set()).add((table.lower(), column.lower()))
+    finally:
+        conn.close()
+    return index
+
+
+def _value_matches(db_path, schema, literals):
+    """
+    Columns whose stored values equal one of the literals, ignoring case. Only the first VALUE_INDEX_ROWS
+    rows of each table are indexed, so a value stored further down a large table, or in a high-cardinality
+    column past its cap (see _value_index), is not matched.
+    """
+    matches = set()
+    if not literals or not db_path or not os.path.isfile(db_path):
+        return matches
+
+    stat = os.stat(db_path)
+    index = _value_index(os.path.abspath(db_path), stat.st_size, stat.st_mtime_ns)
+    found = set()
+    for literal in literals:
+        found.update(index.get(_value_key(literal), ()))
+    for table in schema.tables.values():
+        for column in table.columns:
+            if (table.name.lower(), column.lower()) in found:
+                matches.add((table.name, column))
+    return matches
+
+
+def score_schema(schema, question, db_path=None):
+    """
+    Score every column and table of the schema against the question.
+    Each shared token with a column name weighs 2, with a column comment 0.5, and a stored value
+    matching a question literal adds 3. A table scores its name matches, its best column and half
+    of its other column scores.
+    :return: Tuple of ({(table, column): score}, {table: score}).
+    """
+    question_tokens = tokenize(question)
+    value_matches = _value_matches(db_path, schema, question_literals(question))
+
+    column_scores, table_scores = {}, {}
+    for table in schema.tables.values():
+        scores = []
+        for column, line in table.columns.items():
+            score = 2.0 * overlap(question_tokens, tokenize(column)) + 0.5 * overlap(question_tokens, tokenize(line.comment))
+            if (table.name, column) in value_matches:
+                score += 3.0
+            column_scores[(table.name, column)] = score
+            scores.append(score)
+        # The table name and its best column count fully, other matching columns at half weight
+        best = max(scores, default=0.0)
+        table_scores[table.name] = 2.0 * overlap(question_tokens, tokenize(table.name)) + best + 0.5 * (sum(scores) - best)
+    return column_scores, table_scores
+
+
+def _join_path(graph, source, targets):
+    """Shortest foreign-key path from source to the nearest table in targets (excluding source)."""
+    previous = {source: None}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        if node in targets and node != source:
+            path = []
+            while node is not None:
+                path.append(node)
+                node = previous[node]
+            return path
+        for neighbour in graph[node]:
+            if neighbour not in previous:
+                previous[neighbour] = node
+                queue.append(neighbour)
+    return []
+
+
+def prune_schema_tables(schema, question, db_path=None, max_tables=4, table_ratio=0.2, columns_per_table=12, small_table_columns=6):
+    """
+    Choose the tables and columns of the pruned schema.
+    :param schema: A parsed Schema.
+    :param question: The natural language question (optionally followed by the evidence).
+    :param db_path: Optional path to the database, enabling value matching.
+    :param max_tables: Maximum number of tables selected by score (bridge tables come on top).
+    :param table_ratio: Tables scoring at least this fraction of the best table score are selected.
+    :param columns_per_table: Maximum number of scored columns kept per table, keys excluded.
+    :param small_table_columns: Tables with at most this many columns are kept whole.
+    :return: Dict of table name -> set of kept column names.
+    """
+    column_scores, table_scores = score_schema(schema, question, db_path)
+    ranked = sorted(schema.tables, key=lambda name: -table_scores[name])
+    if not ranked:
+        return {}
+
+    best = table_scores[ranked[0]]
+    selected = [name for name in ranked if best > 0 and table_scores[name] >= best * table_ratio][:max_tables] or ranked[:1]
+
+    # Connect the selected tables through their shortest foreign-key paths
+    graph = schema.neighbours()
+    connected = {selected[0]}
+    for name in selected[1:]:
+        path = _join_path(graph, name, connected)
+        connected.update(path or [name])
+    connected.update(selected)
+
+    keep = {}
+    for name in connected:
+        table = schema.tables[name]
+        if len(table.columns) <= small_table_columns:
+            keep[name] = set(table.columns)
+            continue
+        scored = sorted((c for c in table.columns if column_scores[(name, c)] > 0), key=lambda c: -column_scores[(name, c)])
+        keep[name] = set(scored[:columns_per_table]) | {c for c in table.primary_key if c in table.columns}
+    for table, columns, ref_table, ref_columns in schema.foreign_keys:
+        if table in keep and ref_table in keep:
+            keep[table].update(c for c in columns if c in schema.tables[table].columns)
+            keep[ref_table].update(c for c in ref_columns if c in schema.tables[ref_table].columns)
+    for name, columns in keep.items():
+        if not columns:
+            # Keep at least the first column so the table stays valid
+            keep[name] = {next(iter(schema.tables[name].columns))} if schema.tables[name].columns else set()
+    return keep
+
+
+def prune_schema(schema_text, question, db_path=None, **options):
+    """
+    Prune a schema dump down to the tables, columns and foreign-key paths relevant to a question.
+    :param schema_text: The full schema text, e.g. the content of bird/<db_id>.txt.
+    :param question: The natural language question (optionally followed by the evidence).
+    :param db_path: Optional path to the SQLite database, enabling value matching.
+    :param options: Selection options, see prune_schema_tables.
+    :return: The pruned schema text, in the same format as the input.
+    """
+    schema = _parse_cached(schema_text)
+    if not schema.tables:
+        return schema_text
+    return schema.render(prune_schema_tables(schema, question, db_path, **options))
+
+
+def gold_columns(schema, sql):
+    """
+    The (table, column) pairs used by a gold query: identifiers of the query that name a column of
+    a table referenced in the query.
+    """
+    identifiers = {strip_identifier(token).lower() for token in re.findall(_IDENTIFIER, sql)}
+    tables = [table for table in schema.tables.values() if table.name.lower() in identifiers]
+    return {(table.name, column) for table in tables for column in table.columns if column.lower() in identifiers}
+
+
+def resolve_db_path(entry, databases_dir="dev_databases"):
+    """The entry's sql_path when it exists locally, else dev_databases/<db_id>/<db_id>.db if present."""
+    for path in (entry.get("sql_path"), os.path.join(databases_dir, entry["db_id"], f"{entry['db_id']}.db")):
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+def report(question_files, **options):
+    """
+    Print the token reduction and gold-column recall of prune_schema on question sets.
+    :param question_files: JSON files with db_id, question, ground_truth and schema fields. Value matching
+        is used for the questions whose database is available locally (see resolve_db_path).
+    :return: Dict of file -> metrics.
+    """
+    results = {}
+    for path in question_files:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+
+        full_tokens = pruned_tokens = 0
+        found = total = complete = 0
+        for entry in entries:
+            schema = _parse_cached(entry["schema"])
+            keep = prune_schema_tables(schema, entry["question"], resolve_db_path(entry), **options)
+            gold = gold_columns(schema, entry["ground_truth"])
+            hits = sum(1 for table, column in gold if column in keep.get(table, ()))
+
+            full_tokens += count_tokens(entry["schema"])
+            pruned_tokens += count_tokens(schema.render(keep))
+            found += hits
+            total += len(gold)
+            complete += hits == len(gold)
+
+        metrics = {
+            "questions": len(entries),
+            "avg_full_tokens": full_tokens / max(1, len(entries)),
+            "avg_pruned_tokens": pruned_tokens / max(1, len(entries)),
+            "token_reduction": 1 - pruned_tokens / max(1, full_tokens),
+            "gold_column_recall": found / max(1, total),
+            "full_recall_questions": complete / max(1, len(entries)),
+        }
+        results[path] = metrics
+        print(
+            f"{os.path.basename(path)}: {metrics['questions']} questions, "
+            f"tokens {metrics['avg_full_tokens']:.0f} -> {metrics['avg_pruned_tokens']:.0f} "
+            f"({metrics['token_reduction']:.1%} reduction), gold column recall {metrics['gold_column_recall']:.1%}, "
+            f"all gold columns kept for {metrics['full_recall_questions']:.1%} of questions"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    report(sys.argv[1:] or ["selected_bird_questions_100.json", "selected_spider_questions_100.json"])
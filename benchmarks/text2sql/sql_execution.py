@@ -0,0 +1,550 @@
+import io
+import os
+import json
+import time
+import atexit
+import sqlite3
+import contextlib
+from itertools import repeat
+from urllib.request import pathname2url
+from result_cache import GroundTruthCache, DEFAULT_CACHE_PATH
+from sql_extraction import extract_sql, canonical_sql
+from result_compare import COMPARISON_MODES, compare_streams, distinct_batches, rows_match
+from concurrent.futures import ProcessPoolExecutor
+
+# NOTE: this module only depends on the standard library so that evaluation
+# workers spawned by a process pool do not have to import aixplain or nltk.
+
+REQUIRED_KEYS = {"prediction", "ground_truth", "sql_path"}
+
+# Number of SQLite VM instructions between two watchdog checks, and rows fetched per batch
+PROGRESS_INTERVAL = 1000
+FETCH_SIZE = 1000
+
+
+class QueryTimeout(Exception):
+    """Raised when a query exceeds its time or VM-step budget."""
+
+
+class QueryTooLarge(Exception):
+    """Raised when a query returns more rows than allowed."""
+
+
+DATABASE_MODES = ("file", "immutable", "memory")
+
+
+class ConnectionPool:
+    """
+    Keeps one read-only SQLite connection open per database file.
+    Reusing the connection keeps SQLite's page cache warm and lets the sqlite3 module reuse
+    its prepared statement cache across questions that target the same database.
+    The pool is per process: connections inherited through fork are discarded, never reused.
+
+    Databases are opened according to mode:
+    - "file": read-only connection to the file (mode=ro).
+    - "immutable": read-only connection with immutable=1, which skips file locking and change
+      detection. Only safe while nothing writes to the file.
+    - "memory": the file is copied once into a private :memory: database with the backup API,
+      so repeated queries never touch the filesystem.
+    """
+
+    def __init__(self, mode="file", cached_statements=256, cache_size_kib=65536):
+        if mode not in DATABASE_MODES:
+            raise ValueError(f"Unknown database mode '{mode}', expected one of {DATABASE_MODES}")
+        self.mode = mode
+        self.cached_statements = cached_statements
+        self.cache_size_kib = cache_size_kib
+        self._connections = {}
+        self._pid = os.getpid()
+
+    def _connect(self, db_path):
+        uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+        if self.mode == "immutable":
+            uri += "&immutable=1"
+
+        if self.mode == "memory":
+            source = sqlite3.connect(uri, uri=True)
+            try:
+                conn = sqlite3.connect(":memory:", cached_statements=self.cached_statements)
+                source.backup(conn)
+            finally:
+                source.close()
+        else:
+            conn = sqlite3.connect(uri, uri=True, cached_statements=self.cached_statements)
+
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_kib}")
+        return conn
+
+    def set_mode(self, mode):
+        """Switch how databases are opened, closing the connections opened with the previous mode."""
+        if mode not in DATABASE_MODES:
+            raise ValueError(f"Unknown database mode '{mode}', expected one of {DATABASE_MODES}")
+        if mode != self.mode:
+            self.close_all()
+            self.mode = mode
+
+    def get(self, db_path):
+        """
+        Get the connection for a database, opening it on first use.
+        :param db_path: The path to the SQLite database.
+        :return: A read-only sqlite3.Connection.
+        """
+        if self._pid != os.getpid():
+            # SQLite handles must not cross a fork; drop the parent's without closing them
+            self._connections = {}
+            self._pid = os.getpid()
+
+        conn = self._connections.get(db_path)
+        if conn is None:
+            conn = self._connect(db_path)
+            self._connections[db_path] = conn
+        return conn
+
+    def close_all(self):
+        """Close every open connection."""
+        if self._pid == os.getpid():
+            for conn in self._connections.values():
+                conn.close()
+        self._connections = {}
+
+    def __len__(self):
+        return len(self._connections)
+
+
+_POOL = ConnectionPool()
+atexit.register(_POOL.close_all)
+
+
+def get_connection(db_path):
+    """Get the pooled read-only connection for a database in the current process."""
+    return _POOL.get(db_path)
+
+
+def close_all_connections():
+    """Close every pooled connection in the current process."""
+    _POOL.close_all()
+
+
+class _Watchdog:
+    """Progress handler interrupting a query once its time or VM-step budget is spent."""
+
+    def __init__(self, timeout=None, max_vm_steps=None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.max_vm_steps = max_vm_steps
+        self.steps = 0
+        self.reason = None
+        self.paused_at = None
+
+    def pause(self):
+        """Stop the clock while another query runs on the same connection."""
+        self.paused_at = time.monotonic()
+
+    def resume(self):
+        if self.deadline is not None and self.paused_at is not None:
+            self.deadline += time.monotonic() - self.paused_at
+        self.paused_at = None
+
+    def __call__(self):
+        self.steps += PROGRESS_INTERVAL
+        if self.max_vm_steps is not None and self.steps > self.max_vm_steps:
+            self.reason = f"exceeded {self.max_vm_steps} VM steps"
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = "exceeded the time budget"
+        return 1 if self.reason else 0
+
+
+def run_query(conn, sql, timeout=None, max_vm_steps=None, max_rows=None):
+    """
+    Execute a query under a time, VM-step and row budget.
+    The time and step budgets are enforced by a SQLite progress handler, and rows are streamed
+    with fetchmany so an oversized result is abandoned before it is fully materialized.
+    :param conn: An open sqlite3 connection.
+    :param sql: The SQL query.
+    :param timeout: Maximum wall time in seconds, or None for no limit.
+    :param max_vm_steps: Maximum number of SQLite VM instructions, or None for no limit.
+    :param max_rows: Maximum number of rows fetched, or None for no limit.
+    :return: The list of result rows.
+    """
+    watchdog = None
+    if timeout or max_vm_steps is not None:
+        watchdog = _Watchdog(timeout, max_vm_steps)
+        conn.set_progress_handler(watchdog, PROGRESS_INTERVAL)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql)
+        rows = []
+        while True:
+            batch = cursor.fetchmany(FETCH_SIZE)
+            if not batch:
+                break
+            rows.extend(batch)
+            if max_rows is not None and len(rows) > max_rows:
+                raise QueryTooLarge(f"Query returned more than {max_rows} rows")
+        return rows
+    except sqlite3.OperationalError as e:
+        if watchdog is not None and watchdog.reason:
+            raise QueryTimeout(f"Query {watchdog.reason}") from e
+        raise
+    finally:
+        cursor.close()
+        if watchdog is not None:
+            conn.set_progress_handler(None, 0)
+
+
+@contextlib.contextmanager
+def _watched(conn, watchdog):
+    """Run a step of a query under its watchdog, leaving other queries on the connection unbudgeted."""
+    if watchdog is None:
+        yield
+        return
+    watchdog.resume()
+    conn.set_progress_handler(watchdog, PROGRESS_INTERVAL)
+    try:
+        yield
+    finally:
+        conn.set_progress_handler(None, 0)
+        watchdog.pause()
+
+
+def _execute(conn, sql, watchdog=None):
+    """Execute a query and fetch its first batch, translating a watchdog interrupt into QueryTimeout."""
+    cursor = conn.cursor()
+    try:
+        with _watched(conn, watchdog):
+            cursor.execute(sql)
+            return cursor, cursor.fetchmany(FETCH_SIZE)
+    except sqlite3.OperationalError as e:
+        cursor.close()
+        if watchdog is not None and watchdog.reason:
+            raise QueryTimeout(f"Query {watchdog.reason}") from e
+        raise
+
+
+def _batches(conn, cursor, batch, watchdog=None, max_rows=None):
+    """Yield the remaining batches of an executed query, enforcing its budgets."""
+    fetched = 0
+    try:
+        while batch:
+            fetched += len(batch)
+            if max_rows is not None and fetched > max_rows:
+                raise QueryTooLarge(f"Query returned more than {max_rows} rows")
+            yield batch
+            with _watched(conn, watchdog):
+                batch = cursor.fetchmany(FETCH_SIZE)
+    except sqlite3.OperationalError as e:
+        if watchdog is not None and watchdog.reason:
+            raise QueryTimeout(f"Query {watchdog.reason}") from e
+        raise
+    finally:
+        cursor.close()
+
+
+def stream_query(conn, sql, distinct=False, watchdog=None, max_rows=None):
+    """
+    Execute a query and return its rows as a generator of fetchmany batches.
+    With distinct=True the query is wrapped in SELECT DISTINCT so SQLite removes duplicate rows;
+    statements that cannot be wrapped are deduplicated in Python instead.
+    """
+    if distinct:
+        try:
+            cursor, batch = _execute(conn, f"SELECT DISTINCT * FROM (\n{sql}\n)", watchdog)
+            return _batches(conn, cursor, batch, watchdog, max_rows)
+        except sqlite3.OperationalError:
+            pass
+    cursor, batch = _execute(conn, sql, watchdog)
+    batches = _batches(conn, cursor, batch, watchdog, max_rows)
+    return distinct_batches(batches) if distinct else batches
+
+
+_SETTINGS = {"ground_truth_cache": None, "timeout": None, "max_vm_steps": None, "max_rows": None, "comparison": "set"}
+
+
+def configure(
+    ground_truth_cache=None, timeout=None, max_vm_steps=None, max_rows=None, database_mode="file", comparison="set"
+):
+    """
+    Set the execution options of the current process. Unspecified options are reset to their defaults.
+    Process-pool workers call this on startup with the options given to evaluate_files.
+    The budgets are off by default, so scores only change when a caller opts in to them.
+    :param ground_truth_cache: True to cache ground truth result sets in the default on-disk cache,
+        a file path to use another cache file, or None to always execute the ground truth.
+    :param timeout: Time budget in seconds for each predicted query, or None for no limit.
+    :param max_vm_steps: SQLite VM-step budget for each predicted query, or None for no limit.
+    :param max_rows: Maximum number of rows fetched for each predicted query, or None for no limit.
+    :param database_mode: How each database is opened once per process: "file", "immutable" or
+        "memory" (see ConnectionPool).
+    :param comparison: How result sets are compared: "set" (order and duplicates ignored), "multiset"
+        (order ignored) or "ordered" (see result_compare).
+    """
+    if comparison not in COMPARISON_MODES:
+        raise ValueError(f"comparison must be one of {COMPARISON_MODES}")
+    _POOL.set_mode(database_mode)
+    cache_path = DEFAULT_CACHE_PATH if ground_truth_cache is True else ground_truth_cache or None
+    cache = _SETTINGS["ground_truth_cache"]
+    if cache is not None and cache.path != cache_path:
+        cache.close()
+        cache = None
+    if cache_path and cache is None:
+        cache = GroundTruthCache(cache_path)
+    _SETTINGS["ground_truth_cache"] = cache
+    _SETTINGS["timeout"] = timeout
+    _SETTINGS["max_vm_steps"] = max_vm_steps
+    _SETTINGS["max_rows"] = max_rows
+    _SETTINGS["comparison"] = comparison
+
+
+def fetch_results(predicted_sql, ground_truth, db_path):
+    """
+    Execute both SQL queries on the pooled connection and return their rows.
+    The predicted query runs under the configured time, VM-step and row budgets. The ground
+    truth is read from the ground truth cache first when one is configured.
+    :param predicted_sql: The SQL query generated by the model.
+    :param ground_truth: The ground truth SQL query.
+    :param db_path: The path to the SQLite database.
+    :return: Tuple of (predicted rows, ground truth rows). Errors, including QueryTimeout and
+        QueryTooLarge, are raised to the caller.
+    """
+    conn = get_connection(db_path)
+    predicted_res = run_query(
+        conn, predicted_sql, timeout=_SETTINGS["timeout"], max_vm_steps=_SETTINGS["max_vm_steps"], max_rows=_SETTINGS["max_rows"]
+    )
+
+    cache = _SETTINGS["ground_truth_cache"]
+    if cache is not None:
+        ground_truth_res = cache.fetch(conn, db_path, ground_truth)
+    else:
+        ground_truth_res = run_query(conn, ground_truth)
+
+    return predicted_res, ground_truth_res
+
+
+def compare_sql(predicted_sql, ground_truth, db_path, mode=None):
+    """
+    Execute both SQL queries and compare their results exactly (see result_compare).
+    The predicted query is executed first, under the configured budgets, then the ground truth, unless it
+    is read from the ground truth cache. Both results are fetched lazily in fetchmany batches: the unordered
+    modes read the whole ground truth before the predicted rows, the ordered mode reads both in lockstep,
+    and the predicted rows stop being read as soon as they are known to differ. Both cursors are closed on return.
+    :param predicted_sql: The SQL query generated by the model.
+    :param ground_truth: The ground truth SQL query.
+    :param db_path: The path to the SQLite database.
+    :param mode: "set", "multiset" or "ordered"; defaults to the configured comparison.
+    :return: True if the results match. Errors, including QueryTimeout and QueryTooLarge, are raised.
+    """
+    mode = mode or _SETTINGS["comparison"]
+    conn = get_connection(db_path)
+
+    watchdog = None
+    if _SETTINGS["timeout"] or _SETTINGS["max_vm_steps"] is not None:
+        watchdog = _Watchdog(_SETTINGS["timeout"], _SETTINGS["max_vm_steps"])
+        watchdog.pause()
+    predicted_batches = stream_query(conn, predicted_sql, watchdog=watchdog, max_rows=_SETTINGS["max_rows"])
+
+    cache = _SETTINGS["ground_truth_cache"]
+    ground_truth_batches = None
+    try:
+        if cache is not None:
+            ground_truth_batches = [cache.fetch(conn, db_path, ground_truth)]
+        else:
+            ground_truth_batches = stream_query(conn, ground_truth)
+        return compare_streams(predicted_batches, ground_truth_batches, mode)
+    finally:
+        predicted_batches.close()
+        if hasattr(ground_truth_batches, "close"):
+            ground_truth_batches.close()
+
+
+def execute_sql(predicted_sql, ground_truth, db_path):
+    """
+    Execute the SQL queries and compare the results.
+    :param predicted_sql: The SQL query generated by the model.
+    :param ground_truth: The ground truth SQL query.
+    :param db_path: The path to the SQLite database.
+    :return: 1 if the results match, 0 otherwise.
+    """
+    try:
+        return 1 if compare_sql(predicted_sql, ground_truth, db_path) else 0
+    except Exception as e:
+        print(f"Error executing SQL: {e}")
+        return 0
+
+
+def sql_res(predicted_sql, ground_truth, db_path):
+    """
+    Execute the SQL queries and return the results.
+    :param predicted_sql: The SQL query generated by the model.
+    :param ground_truth: The ground truth SQL query.
+    :param db_path: The path to the SQLite database.
+    :return: The results of the SQL queries.
+    """
+    try:
+        return fetch_results(predicted_sql, ground_truth, db_path)
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def result_prediction(result):
+    """The SQL query of a result: its clean_sql field, or the query extracted from its raw prediction."""
+    clean_sql = result.get("clean_sql")
+    return clean_sql if clean_sql is not None else extract_sql(result["prediction"])
+
+
+def evaluate_file(file_path, with_results=False):
+    """
+    Evaluate a single result_{i}.json file, or a result record already loaded from a ResultStore.
+    Everything printed while evaluating is captured in the "log" field so the caller can
+    replay it in file order, whether the file was evaluated in-process or in a worker.
+    :param file_path: Path to the result file, or the result record itself.
+    :param with_results: Whether to also print both result sets (as evaluate_sql_predictions does).
+    :return: A dict with the evaluation status, the cleaned prediction, the difficulty, the score and
+        the execution outcome (correct, incorrect, error, timeout or oversize).
+    """
+    record = {"status": "error", "res": 0}
+    log = io.StringIO()
+
+    with contextlib.redirect_stdout(log):
+        try:
+            if isinstance(file_path, dict):
+                out_data = dict(file_path)
+                file_path = f"question {out_data.get('question_id')}"
+            else:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    out_data = json.load(f)
+
+            if REQUIRED_KEYS.issubset(out_data):
+                out_data["prediction"] = result_prediction(out_data)
+                record["prediction"] = out_data["prediction"]
+
+                # Results are streamed and compared, or fetched once when they also have to be printed
+                try:
+                    if with_results:
+                        p, g = fetch_results(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"])
+                        res = 1 if rows_match(p, g, _SETTINGS["comparison"]) else 0
+                        print(p, "===", g)
+                    else:
+                        res = 1 if compare_sql(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"]) else 0
+                    record["outcome"] = "correct" if res == 1 else "incorrect"
+                except QueryTimeout as e:
+                    print(f"Timeout executing SQL: {e}")
+                    res, record["outcome"] = 0, "timeout"
+                except QueryTooLarge as e:
+                    print(f"Oversized SQL result: {e}")
+                    res, record["outcome"] = 0, "oversize"
+                except Exception as e:
+                    print(f"Error executing SQL: {e}")
+                    res, record["outcome"] = 0, "error"
+
+                if "difficulty" in out_data:
+                    record["difficulty"] = out_data["difficulty"]
+                record["res"] = res
+                record["status"] = "evaluated"
+            else:
+                record["status"] = "skipped"
+                print(f"Skipping {file_path}: Missing required keys.")
+
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+
+    record["log"] = log.getvalue()
+    return record
+
+
+def _init_worker(options):
+    configure(**options)
+
+
+def evaluate_files(file_paths, num_workers=1, with_results=False, **options):
+    """
+    Evaluate result files either serially or across a pool of worker processes.
+    Each worker executes the queries with its own pooled SQLite connections; records are returned
+    in the same order as file_paths so the merged report is identical to a serial run.
+    :param file_paths: Paths of the result files to evaluate, or result records read from a ResultStore.
+    :param num_workers: Number of worker processes. 1 (default) evaluates in the calling process.
+    :param with_results: Whether to also print both result sets for each file.
+    :param options: Execution options applied in every process, see configure.
+    :return: A list of evaluation records, one per file.
+    """
+    configure(**options)
+    if num_workers is None or num_workers <= 1 or len(file_paths) <= 1:
+        return [evaluate_file(path, with_results) for path in file_paths]
+
+    num_workers = min(num_workers, len(file_paths))
+    # A few chunks per worker balances slow BIRD queries without paying IPC per file
+    chunksize = max(1, len(file_paths) // (num_workers * 4))
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(options,)) as executor:
+        return list(executor.map(evaluate_file, file_paths, repeat(with_results), chunksize=chunksize))
+
+
+def _read_result(result):
+    """The result record of a result file or record, or None if it cannot be read."""
+    if isinstance(result, dict):
+        return result
+    try:
+        with open(result, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def execution_key(result):
+    """
+    Key of the execution a result needs: (database path, canonical predicted SQL, canonical ground truth).
+    Results with the same key have the same outcome, whatever configuration produced them.
+    :param result: A result record with the REQUIRED_KEYS.
+    :return: The key tuple.
+    """
+    return (
+        os.path.abspath(result["sql_path"]),
+        canonical_sql(result_prediction(result)),
+        canonical_sql(result["ground_truth"]),
+    )
+
+
+def evaluate_unique(results, num_workers=1, with_results=False, **options):
+    """
+    Evaluate results, executing each distinct query once.
+    Results are grouped by execution_key, for instance across the output directories of several agent
+    configurations; one result per group is evaluated with evaluate_files and its outcome is fanned back
+    out to the others, with their own prediction and difficulty.
+    :param results: Paths of result files or result records.
+    :param num_workers: Number of worker processes, see evaluate_files.
+    :param with_results: Whether to also print both result sets for each file.
+    :param options: Execution options applied in every process, see configure.
+    :return: (records, stats): one evaluation record per result, in order, and a dict with the number of
+        results, of executions and of executions saved.
+    """
+    to_run, slots, owners = [], [], []
+    groups = {}
+    for result in results:
+        data = _read_result(result)
+        key = None
+        if data is not None and REQUIRED_KEYS.issubset(data):
+            try:
+                key = execution_key(data)
+            except (TypeError, AttributeError):
+                key = None
+        if key is not None and key in groups:
+            slots.append(groups[key])
+        else:
+            if key is not None:
+                groups[key] = len(to_run)
+            slots.append(len(to_run))
+            to_run.append(result)
+        owners.append(data if key is not None else None)
+
+    evaluated = evaluate_files(to_run, num_workers, with_results, **options)
+    records = []
+    for slot, data in zip(slots, owners):
+        record = dict(evaluated[slot])
+        if data is not None and record["status"] == "evaluated":
+            record["prediction"] = result_prediction(data)
+            record.pop("difficulty", None)
+            if "difficulty" in data:
+                record["difficulty"] = data["difficulty"]
+        records.append(record)
+
+    stats = {"results": len(records), "executions": len(to_run), "executions_saved": len(records) - len(to_run)}
+    return records, stats
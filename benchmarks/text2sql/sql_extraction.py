@@ -0,0 +1,148 @@
+"""
+Extraction of the SQL query from a raw model output, and SQL normalization.
+
+extract_sql runs once per response when the results are saved (process_and_save_results stores it in the
+"clean_sql" field), so the evaluators read the query instead of parsing the output again. The query text
+itself is never rewritten: only the markdown fences and the prose around it are dropped, so identifiers
+such as sql_id and literals containing ':' or ';' are kept.
+"""
+import re
+
+# Fenced code block: ```lang ... ```; the closing fence is optional for truncated outputs
+_FENCE = re.compile(r"```(?:[ \t]*([\w+-]+)[ \t]*\n)?(.*?)(?:```|\Z)", re.S)
+# Start of a statement at the beginning of a line or after a label such as "SQL:"
+_STATEMENT_START = re.compile(
+    r"(?:^|(?<=:))[ \t]*(?P<sql>select\b|with\s+(?:recursive\s+)?\S+\s*(?:\([^)]*\)\s*)?as\s*\()", re.I | re.M
+)
+_INLINE_SELECT = re.compile(r"\bSELECT\b")
+# Quoted literals/identifiers, comments, statement separators and blank lines
+_STATEMENT_TOKEN = re.compile(
+    r"""'[^']*(?:''[^']*)*'|"[^"]*(?:""[^"]*)*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|\Z)|(?P<end>;|\n[ \t]*\n)""", re.S
+)
+# Quoted literals/identifiers and comments, captured so re.split keeps them
+_QUOTED_OR_COMMENT = re.compile(
+    r"""('[^']*(?:''[^']*)*'|"[^"]*(?:""[^"]*)*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|\Z))""", re.S
+)
+_PUNCTUATION_SPACE = re.compile(r" ?([(),]) ?")
+# Clauses continuing a statement after a blank line. Keywords are matched in lower or upper case only,
+# so prose sentences such as "From the results..." or "Where possible..." still end the statement
+_CONTINUATION_KEYWORDS = (
+    "from where group_by order_by having limit offset join inner_join left_join left_outer_join "
+    "right_join full_join cross_join natural_join on and or union intersect except"
+).split()
+_CONTINUATION = re.compile(
+    r"[ \t\n]*(?:(?:"
+    + "|".join(case.replace("_", r"\s+") for keyword in _CONTINUATION_KEYWORDS for case in (keyword, keyword.upper()))
+    + r")\b|[),=<>])"
+)
+# A statement cut right after an open clause, e.g. "WHERE", "UNION ALL", a comma or an operator
+_OPEN_CLAUSE = re.compile(
+    r"(?:\b(?:select|distinct|from|where|by|having|join|on|and|or|not|in|union|all|intersect|except|when|then|else)|[(,=<>+*/%|])[ \t]*\Z",
+    re.I,
+)
+
+
+def _segments(sql):
+    """
+    Split SQL into (text, quoted) segments: quoted literals and identifiers are kept verbatim, comments
+    are merged into the surrounding text as whitespace.
+    """
+    parts = _QUOTED_OR_COMMENT.split(sql)
+    segments, plain = [], parts[0]
+    for i in range(1, len(parts), 2):
+        token = parts[i]
+        if token[0] in "-/":
+            plain += " " + parts[i + 1]
+        else:
+            segments.append((plain, False))
+            segments.append((token, True))
+            plain = parts[i + 1]
+    segments.append((plain, False))
+    return segments
+
+
+def _collapse(text):
+    """Collapse every run of whitespace to one space, keeping a space at either end if there was one."""
+    collapsed = " ".join(text.split())
+    if not collapsed:
+        return " " if text else ""
+    if text[0].isspace():
+        collapsed = " " + collapsed
+    if text[-1].isspace():
+        collapsed += " "
+    return collapsed
+
+
+def normalize_sql(sql):
+    """
+    Normalize SQL text: drop comments, collapse whitespace outside quoted literals and identifiers
+    and drop trailing semicolons.
+    :param sql: The SQL query.
+    :return: The normalized SQL query.
+    """
+    sql = "".join(text if quoted else _collapse(text) for text, quoted in _segments(sql.strip()))
+    return sql.rstrip("; ").strip()
+
+
+def canonical_sql(sql):
+    """
+    Canonical form of a query for cache keys: normalize_sql, then lowercase everything outside quoted
+    literals and identifiers (SQLite keywords and bare identifiers are case-insensitive) and drop the
+    spaces around parentheses and commas.
+    :param sql: The SQL query.
+    :return: The canonical SQL query.
+    """
+    return "".join(
+        text if quoted else _PUNCTUATION_SPACE.sub(r"\1", text.lower()) for text, quoted in _segments(normalize_sql(sql))
+    )
+
+
+def _statement_start(text):
+    match = _STATEMENT_START.search(text)
+    if match is not None:
+        return match.start("sql")
+    match = _INLINE_SELECT.search(text)
+    return match.start() if match is not None else None
+
+
+def _first_statement(text, stop_at_blank_line):
+    """
+    Cut text at the first semicolon outside quotes and comments, or at the first blank line that is not
+    followed by a clause continuing the statement (FROM, WHERE, JOIN...) nor preceded by an open clause.
+    """
+    if ";" not in text and not (stop_at_blank_line and "\n" in text):
+        return text
+    for match in _STATEMENT_TOKEN.finditer(text):
+        end = match.group("end")
+        if end == ";":
+            return text[: match.start()]
+        if end and stop_at_blank_line:
+            if _CONTINUATION.match(text, match.end()) or _OPEN_CLAUSE.search(text, 0, match.start()):
+                continue
+            return text[: match.start()]
+    return text
+
+
+def extract_sql(output):
+    """
+    Extract the SQL query from a raw model output.
+    The query is taken from the first fenced block tagged sql (or else the first fenced block holding a
+    statement), or from the prose, where it starts at a SELECT/WITH at the beginning of a line or after
+    a label such as "SQL:". Only the first statement is kept, and it is normalized with normalize_sql.
+    An output without any recognizable query is returned normalized, so it fails at execution.
+    :param output: The raw prediction returned by the agent.
+    :return: The SQL query.
+    """
+    if not output:
+        return ""
+    text, fenced = output, "```" in output
+    if fenced:
+        blocks = _FENCE.findall(output)
+        candidates = [body for lang, body in blocks if lang.lower() in ("sql", "sqlite")] or [body for _, body in blocks]
+        starts = ((body, _statement_start(body)) for body in candidates)
+        text, start = next(((body, start) for body, start in starts if start is not None), (candidates[0], None))
+    else:
+        start = _statement_start(text)
+    if start is not None:
+        text = _first_statement(text[start:], stop_at_blank_line=not fenced)
+    return normalize_sql(text)
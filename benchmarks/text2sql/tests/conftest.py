@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The text2sql modules are flat scripts imported by name (as the notebooks do)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
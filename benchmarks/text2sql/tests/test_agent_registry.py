@@ -0,0 +1,64 @@
+"""Tests for the build-once registry of tools and agents."""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from agent_registry import AgentRegistry
+
+
+class FakeAgent:
+    def __init__(self, name, deleted, fail=False):
+        self.name = name
+        self.deleted = deleted
+        self.fail = fail
+
+    def delete(self):
+        if self.fail:
+            raise RuntimeError("already deleted")
+        self.deleted.append(self.name)
+
+
+def test_concurrent_callers_share_one_build():
+    registry = AgentRegistry(verbose=False)
+    builds = []
+    lock = threading.Lock()
+
+    def build():
+        with lock:
+            builds.append(1)
+        time.sleep(0.05)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        objects = list(executor.map(lambda _: registry.get(("agent", "pets_1", "llm", "team"), build), range(8)))
+    assert len(builds) == 1 and all(obj is objects[0] for obj in objects)
+    assert registry.get(("agent", "shop", "llm", "team"), object) is not objects[0]
+    assert registry.stats() == {"created": 2, "reused": 7, "by_kind": {"agent": {"created": 2, "reused": 7}}}
+
+
+def test_failed_build_is_retried():
+    registry = AgentRegistry(verbose=False)
+
+    def build():
+        raise ConnectionError("platform unavailable")
+
+    with pytest.raises(ConnectionError):
+        registry.get(("sql_tool", "pets_1"), build)
+    assert len(registry) == 0
+    assert registry.get(("sql_tool", "pets_1"), lambda: "tool") == "tool"
+
+
+def test_teardown_deletes_newest_first_and_empties_the_registry():
+    deleted = []
+    with AgentRegistry(verbose=False) as registry:
+        registry.get(("sql_tool", "pets_1"), lambda: "tool without delete")
+        registry.get(("agent", "pets_1"), lambda: FakeAgent("agent", deleted))
+        registry.get(("agent", "shop"), lambda: FakeAgent("broken agent", deleted, fail=True))
+        registry.get(("team_agent", "pets_1"), lambda: FakeAgent("team agent", deleted))
+        registry.get(("agent", "pets_1"), lambda: FakeAgent("duplicate", deleted))
+    # Team agents go before the agents they use; a failing delete does not stop the others
+    assert deleted == ["team agent", "agent"]
+    assert len(registry) == 0
+    stats = registry.teardown()
+    assert deleted == ["team agent", "agent"] and stats["created"] == 4 and stats["reused"] == 1
@@ -0,0 +1,76 @@
+"""Tests for the on-disk BM25 index."""
+
+import json
+import math
+import os
+from array import array
+from collections import Counter
+import pytest
+import bm25
+
+DOCUMENTS = [
+    "Question: How many singers are there? SQL: SELECT COUNT(*) FROM singer",
+    "Question: List the names of singers from France. SQL: SELECT name FROM singer WHERE country = 'France'",
+    "Question: Average age of all pets. SQL: SELECT AVG(pet_age) FROM pets",
+    "Question: Nom des chanteurs née à Zürich. SQL: SELECT name FROM singer WHERE city = 'Zürich'",
+    "",
+]
+
+
+def reference_scores(query, k1=1.5, b=0.75):
+    """BM25 computed directly from the texts."""
+    terms = [bm25.tokenize(text) for text in DOCUMENTS]
+    avg_length = sum(map(len, terms)) / len(terms)
+    scores = {}
+    for term, query_tf in Counter(bm25.tokenize(query)).items():
+        df = sum(term in doc for doc in terms)
+        if not df:
+            continue
+        idf = math.log(1 + (len(terms) - df + 0.5) / (df + 0.5))
+        for doc_id, doc in enumerate(terms):
+            tf = doc.count(term)
+            if tf:
+                norm = k1 * (1 - b + b * len(doc) / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * (k1 + 1) * query_tf * tf / (tf + norm)
+    return scores
+
+
+@pytest.mark.parametrize("byteswap", [False, True])
+def test_index_round_trips_through_its_files(tmp_path, monkeypatch, byteswap):
+    # Forcing the byteswap path exercises the loading done on big-endian machines
+    monkeypatch.setattr(bm25, "_BYTESWAP", byteswap)
+    index_dir = str(tmp_path / "index")
+    assert bm25.build_index(iter(DOCUMENTS), index_dir) == len(DOCUMENTS)
+    assert bm25.is_bm25_index(index_dir) and not bm25.is_bm25_index(str(tmp_path))
+
+    lengths = array("I")
+    with open(os.path.join(index_dir, "doc_lengths.u32"), "rb") as f:
+        lengths.frombytes(f.read())
+    if byteswap:
+        lengths.byteswap()
+    assert list(lengths) == [len(bm25.tokenize(text)) for text in DOCUMENTS]
+
+    index = bm25.BM25Index(index_dir)
+    assert len(index) == len(DOCUMENTS)
+    assert [index.document(i) for i in range(len(DOCUMENTS))] == DOCUMENTS
+    for query in ("singer France", "names of singers", "pets age age", "zürich", "unknown words"):
+        expected = reference_scores(query)
+        results = index.search(query, num_results=10)
+        assert dict(results) == pytest.approx(expected)
+        assert [score for _, score in results] == sorted(expected.values(), reverse=True)
+    assert index.retrieve("France", 1) == DOCUMENTS[1]
+
+
+def test_empty_and_unsupported_indexes(tmp_path):
+    index_dir = str(tmp_path / "empty")
+    assert bm25.build_index([], index_dir) == 0
+    assert bm25.BM25Index(index_dir).search("singer") == []
+
+    meta_path = os.path.join(index_dir, "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta["version"] = bm25.INDEX_VERSION + 1
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    with pytest.raises(ValueError):
+        bm25.BM25Index(index_dir)
@@ -0,0 +1,83 @@
+"""Tests for the append-only run checkpoint."""
+
+import json
+import threading
+import pytest
+from checkpoint import RunCheckpoint
+
+ENTRIES = [{"question_id": i} for i in range(6)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "results" / "checkpoint.jsonl")
+
+
+def lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_restarted_run_skips_finished_questions(path):
+    with RunCheckpoint(path) as checkpoint:
+        for i, entry in checkpoint.pending(ENTRIES[:3], "team", "llm"):
+            checkpoint.record(entry["question_id"], "team", "llm", f"SELECT {i}")
+    # One line per question, written as each one finishes
+    assert len(lines(path)) == 3
+
+    calls = []
+    with RunCheckpoint(path) as checkpoint:
+        assert [entry["question_id"] for _, entry in checkpoint.pending(ENTRIES, "team", "llm")] == [3, 4, 5]
+        assert checkpoint.pending(ENTRIES, "single", "llm") == list(enumerate(ENTRIES))
+        responses = checkpoint.run(ENTRIES, lambda i, entry: calls.append(i) or f"SELECT {i}", "team", "llm")
+    assert calls == [3, 4, 5]
+    assert responses == [f"SELECT {i}" for i in range(6)]
+    assert RunCheckpoint(path).is_done(5, "team", "llm")
+
+
+def test_torn_line_is_dropped_on_load(path):
+    with RunCheckpoint(path) as checkpoint:
+        checkpoint.record(0, "team", "llm", "SELECT 0")
+        checkpoint.record(1, "team", "llm", "SELECT 1")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"run": "llm/team", "question_id": "2", "resp')
+
+    checkpoint = RunCheckpoint(path)
+    assert checkpoint.responses(ENTRIES[:3], "team", "llm", default="") == ["SELECT 0", "SELECT 1", ""]
+    # The log was compacted, so the next record starts on a fresh line
+    checkpoint.record(2, "team", "llm", "SELECT 2")
+    checkpoint.close()
+    assert [json.loads(line)["question_id"] for line in lines(path)] == ["0", "1", "2"]
+
+
+def test_rerecorded_questions_are_compacted_on_close(path):
+    with RunCheckpoint(path) as checkpoint:
+        checkpoint.record(0, "team", "llm", "SELECT 1")
+        checkpoint.record(0, "team", "llm", "SELECT 0")
+        assert len(lines(path)) == 2
+    assert len(lines(path)) == 1
+    assert RunCheckpoint(path).responses(ENTRIES[:1], "team", "llm") == ["SELECT 0"]
+
+
+def test_manifest_of_earlier_versions_is_converted(path, tmp_path):
+    (tmp_path / "results").mkdir()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"runs": {"llm/team": {"0": "SELECT 0", "1": "SELECT 1"}}}, f, indent=2)
+    checkpoint = RunCheckpoint(path)
+    assert [i for i, _ in checkpoint.pending(ENTRIES[:3], "team", "llm")] == [2]
+    assert len(lines(path)) == 2
+
+
+def test_concurrent_records_are_all_kept(path):
+    checkpoint = RunCheckpoint(path)
+    threads = [
+        threading.Thread(target=lambda start: [checkpoint.record(i, "team", "llm", i) for i in range(start, 200, 4)], args=(start,))
+        for start in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    checkpoint.close()
+    assert RunCheckpoint(path).responses([{"question_id": i} for i in range(200)], "team", "llm") == list(range(200))
+    assert len(lines(path)) == 200
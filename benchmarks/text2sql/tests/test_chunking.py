@@ -0,0 +1,36 @@
+"""Tests for the offset-based text chunker."""
+
+import pytest
+from chunking import chunk_text, iter_chunk_spans, sentence_spans
+
+DOCUMENT = "Question: How many singers are there; list them? \nSQL: SELECT COUNT(*) FROM singer. Done!"
+
+
+def test_sentences_end_where_nltk_ends_them():
+    assert [DOCUMENT[s:e] for s, e in sentence_spans(DOCUMENT)] == [
+        "Question: How many singers are there; list them?",
+        "SQL: SELECT COUNT(*) FROM singer.",
+        "Done!",
+    ]
+    assert sentence_spans("  \n ") == []
+
+
+@pytest.mark.parametrize("unit, chunk_size", [("char", 40), ("char", 60), ("token", 4), ("token", 9)])
+def test_chunks_are_slices_within_the_budget(unit, chunk_size):
+    for start, end in iter_chunk_spans(DOCUMENT, chunk_size, unit=unit):
+        chunk = DOCUMENT[start:end]
+        assert chunk == chunk.strip()
+        assert (len(chunk) if unit == "char" else len(chunk.split())) <= chunk_size
+    # Without overlap, the chunks cover the text once and in order (character budgets may split words)
+    assert "".join("".join(chunk.split()) for chunk in chunk_text(DOCUMENT, chunk_size, unit=unit)) == "".join(DOCUMENT.split())
+
+
+def test_overlap_repeats_the_last_sentences():
+    text = "One two. Three four. Five six. Seven eight."
+    assert chunk_text(text, 20) == ["One two. Three four.", "Five six.", "Seven eight."]
+    chunks = chunk_text(text, 4, overlap=2, unit="token")
+    assert chunks == ["One two. Three four.", "Three four. Five six.", "Five six. Seven eight."]
+    with pytest.raises(ValueError):
+        chunk_text(text, 4, overlap=4, unit="token")
+    with pytest.raises(ValueError):
+        chunk_text(text, 4, unit="word")
@@ -0,0 +1,51 @@
+"""Tests for evaluating the output directories of several agent configurations."""
+
+import json
+import sqlite3
+import pytest
+
+pytest.importorskip("aixplain")
+import utilities  # noqa: E402
+from result_store import ResultStore  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "shop.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, amount REAL)")
+    conn.executemany("INSERT INTO orders VALUES (?, ?)", ((i, i * 1.5) for i in range(100)))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def result(question_id, db_path, prediction, ground_truth, difficulty="simple"):
+    return {"question_id": question_id, "sql_path": db_path, "prediction": prediction, "ground_truth": ground_truth, "difficulty": difficulty}
+
+
+def test_configurations_share_executions(tmp_path, db_path):
+    single = [
+        result(0, db_path, "SELECT COUNT(*) FROM orders", "SELECT 100"),
+        result(1, db_path, "SELECT MAX(id) FROM orders", "SELECT 99", "moderate"),
+        result(2, db_path, "SELECT nope FROM orders", "SELECT 1"),
+    ]
+    team = [
+        result(0, db_path, "```sql\nselect count(*) from orders;\n```", "SELECT 100"),
+        result(1, db_path, "SELECT MIN(id) FROM orders", "SELECT 99", "moderate"),
+        result(2, db_path, "SELECT nope FROM orders", "SELECT 1"),
+    ]
+    # One configuration saved in a result store, the other as result_{i}.json files
+    with ResultStore(str(tmp_path / "single" / "results.jsonl")) as store:
+        for record in single:
+            store.append(record)
+    (tmp_path / "team").mkdir()
+    for i, record in enumerate(team):
+        (tmp_path / "team" / f"result_{i}.json").write_text(json.dumps(record))
+
+    reports, stats = utilities.evaluate_configurations({"single": str(tmp_path / "single"), "team": str(tmp_path / "team")})
+    assert stats == {"results": 6, "executions": 4, "executions_saved": 2}
+    assert reports["single"] == ({"simple": "50.00% of 2", "moderate": "100.00% of 1"}, "66.67%")
+    assert reports["team"] == ({"simple": "50.00% of 2", "moderate": "0.00% of 1"}, "33.33%")
+    # Each configuration scores as it does on its own
+    assert utilities.evaluate_predictions(str(tmp_path / "team")) == reports["team"]
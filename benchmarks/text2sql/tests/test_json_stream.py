@@ -0,0 +1,41 @@
+"""Tests for the incremental JSON array reader at every block boundary."""
+
+import json
+import pytest
+from json_stream import batched, iter_json_array
+
+DOCUMENTS = [
+    "[1.5e3, 2]",
+    "[1.5E-3,-0.25e+2 ,\n 12345678901234567890]",
+    '[true, false, null, "a,]\\"b", 10]',
+    '  [{"question": "How many?", "sql": "SELECT 1", "ids": [1, 2.50, -3e2]}, [], {}, -7]  ',
+    "[]",
+    "[ 0 ]",
+]
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "data.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_every_read_size_decodes_like_json_loads(tmp_path, text):
+    path = _write(tmp_path, text)
+    for read_size in range(1, len(text) + 2):
+        assert list(iter_json_array(path, read_size=read_size)) == json.loads(text), read_size
+
+
+@pytest.mark.parametrize("text", ["[1.5e", "[1, 2", "[1 2]", '[{"a": 1}'])
+def test_invalid_documents_raise_at_every_read_size(tmp_path, text):
+    path = _write(tmp_path, text)
+    for read_size in range(1, len(text) + 2):
+        with pytest.raises(ValueError):
+            list(iter_json_array(path, read_size=read_size))
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    with pytest.raises(ValueError):
+        list(batched([], 0))
@@ -0,0 +1,75 @@
+"""Tests for the zero-copy file materialization and its fallbacks."""
+
+import os
+import pytest
+import materialize
+from materialize import STRATEGIES
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "pets_1.sqlite"
+    path.write_bytes(b"SQLite format 3\0" + bytes(range(256)) * 64)
+    return str(path)
+
+
+class Attempts(list):
+    """Strategies tried, in order; those in failing raise OSError as on a filesystem without them."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = set()
+
+
+@pytest.fixture
+def attempts(monkeypatch):
+    tried = Attempts()
+    create = materialize._create
+
+    def recording_create(strategy, source, target):
+        tried.append(strategy)
+        if strategy in tried.failing:
+            raise OSError(f"{strategy} not supported")
+        create(strategy, source, target)
+
+    monkeypatch.setattr(materialize, "_create", recording_create)
+    return tried
+
+
+def leftovers(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("failing", [0, 1, 2, 3])
+def test_strategies_fall_back_in_order(tmp_path, source, attempts, failing):
+    attempts.failing.update(STRATEGIES[:failing])
+    target = str(tmp_path / "pets_1.db")
+    assert materialize.materialize(source, target) == STRATEGIES[failing]
+    assert attempts == list(STRATEGIES[:failing + 1])
+    with open(source, "rb") as src, open(target, "rb") as dst:
+        assert src.read() == dst.read()
+    assert os.path.islink(target) == (STRATEGIES[failing] == "symlink")
+    assert os.path.samefile(source, target) == (STRATEGIES[failing] in ("hardlink", "symlink"))
+    assert materialize.materialize(source, target) == "existing"
+    assert leftovers(tmp_path) == []
+
+
+def test_stale_targets_are_replaced(tmp_path, source):
+    target = str(tmp_path / "pets_1.db")
+    assert materialize.materialize(source, target, strategies=("copy",)) == "copy"
+    with open(source, "ab") as f:
+        f.write(b"more pages")
+    assert not materialize.is_materialized(source, target)
+    assert materialize.materialize(source, target, strategies=("copy",)) == "copy"
+    assert os.path.getsize(target) == os.path.getsize(source)
+
+
+def test_errors_name_every_failed_strategy(tmp_path, source, attempts):
+    attempts.failing.update(STRATEGIES)
+    with pytest.raises(OSError, match="hardlink: .*reflink: .*symlink: .*copy: "):
+        materialize.materialize(source, str(tmp_path / "pets_1.db"))
+    assert not os.path.exists(tmp_path / "pets_1.db") and leftovers(tmp_path) == []
+    with pytest.raises(FileNotFoundError):
+        materialize.materialize(str(tmp_path / "missing.sqlite"), str(tmp_path / "missing.db"))
+    with pytest.raises(ValueError):
+        materialize.materialize(source, str(tmp_path / "pets_1.db"), strategies=("teleport",))
@@ -0,0 +1,92 @@
+"""Tests for the query profiler and the index build guard."""
+
+import os
+import json
+import sqlite3
+import pytest
+from query_profiler import build_indexes, collect_queries, profile_queries, summarize
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    databases = tmp_path / "dev_databases"
+    (databases / "shop").mkdir(parents=True)
+    db_path = str(databases / "shop" / "shop.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER, status TEXT)")
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?)", ((i, i % 50, "paid" if i % 3 else "void") for i in range(2000)))
+    conn.commit()
+    conn.close()
+
+    results = tmp_path / "results"
+    results.mkdir()
+    result = {
+        "question_id": 0,
+        "sql_path": "/elsewhere/shop/shop.db",
+        "prediction": "SELECT COUNT(*) FROM orders WHERE customer_id = 7",
+        "ground_truth": "SELECT count(*) FROM orders AS o WHERE o.customer_id = 7 AND o.status = 'paid'",
+    }
+    with open(results / "result_0.json", "w") as f:
+        json.dump(result, f)
+
+    queries = profile_queries(collect_queries([str(results)], str(databases)), verbose=False)
+    return {"tmp": tmp_path, "databases": str(databases), "db_path": db_path, "queries": queries, "summary": summarize(queries)}
+
+
+def test_profile_proposes_index(workspace):
+    assert [query["error"] for query in workspace["queries"]] == [None, None]
+    assert all("SCAN" in " ".join(query["plan"]) for query in workspace["queries"])
+    proposals = workspace["summary"]["shop"]["proposals"]
+    assert proposals and proposals[0]["table"] == "orders" and proposals[0]["columns"][0] == "customer_id"
+
+
+def test_build_indexes_on_copy(workspace):
+    stat = os.stat(workspace["db_path"])
+    eval_dir = str(workspace["tmp"] / "eval")
+    report = build_indexes(workspace["summary"], workspace["queries"], eval_dir, verbose=False)
+    assert report["shop"]["changed"] == []
+    assert all(query["unchanged"] for query in workspace["queries"])
+    assert os.stat(workspace["db_path"]).st_mtime_ns == stat.st_mtime_ns
+    conn = sqlite3.connect(workspace["db_path"])
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name LIKE 'advisor_%'").fetchone() == (0,)
+    conn.close()
+
+
+@pytest.mark.parametrize("layout", ["databases_dir", "hardlink", "symlink"])
+def test_build_indexes_never_touches_original(workspace, layout):
+    with open(workspace["db_path"], "rb") as f:
+        original = f.read()
+    eval_dir = str(workspace["tmp"] / "eval")
+    if layout == "databases_dir":
+        eval_dir = workspace["databases"]
+    else:
+        os.makedirs(os.path.join(eval_dir, "shop"))
+        link = os.link if layout == "hardlink" else os.symlink
+        link(workspace["db_path"], os.path.join(eval_dir, "shop", "shop.db"))
+
+    with pytest.raises(ValueError):
+        build_indexes(workspace["summary"], workspace["queries"], eval_dir, verbose=False)
+    with open(workspace["db_path"], "rb") as f:
+        assert f.read() == original
+
+
+def test_build_indexes_rejects_databases_sharing_a_db_id(workspace):
+    # A second dataset with its own shop database
+    other = workspace["tmp"] / "spider" / "shop"
+    other.mkdir(parents=True)
+    conn = sqlite3.connect(str(other / "shop.db"))
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER, status TEXT)")
+    conn.commit()
+    conn.close()
+    results = workspace["tmp"] / "spider_results"
+    results.mkdir()
+    with open(results / "result_0.json", "w") as f:
+        json.dump({"sql_path": str(other / "shop.db"), "prediction": "SELECT id FROM orders", "ground_truth": "SELECT id FROM orders"}, f)
+
+    queries = profile_queries(collect_queries([str(workspace["tmp"] / "results"), str(results)], workspace["databases"]), verbose=False)
+    summary = summarize(queries)
+    assert list(summary) == ["shop"]
+    eval_dir = workspace["tmp"] / "eval"
+    with pytest.raises(ValueError, match="several databases"):
+        build_indexes(summary, queries, str(eval_dir), verbose=False)
+    assert not eval_dir.exists()
@@ -0,0 +1,74 @@
+"""Tests for the on-disk ground truth result cache."""
+
+import os
+import sqlite3
+import pytest
+from result_cache import GroundTruthCache, database_fingerprint
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "pets.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE pets (id INTEGER PRIMARY KEY, kind TEXT)")
+    conn.executemany("INSERT INTO pets VALUES (?, ?)", [(1, "dog"), (2, "cat")])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def insert_pet(db_path, pet_id, kind):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO pets VALUES (?, ?)", (pet_id, kind))
+    conn.commit()
+    conn.close()
+
+
+def test_hits_are_keyed_by_canonical_sql(tmp_path, db_path):
+    cache = GroundTruthCache(str(tmp_path / "cache.sqlite"))
+    conn = sqlite3.connect(db_path)
+    assert cache.fetch(conn, db_path, "SELECT kind FROM pets ORDER BY id") == [("dog",), ("cat",)]
+    assert cache.fetch(conn, db_path, "select  kind\nfrom PETS order by id;") == [("dog",), ("cat",)]
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Quoted literals keep their case
+    assert cache.fetch(conn, db_path, "SELECT id FROM pets WHERE kind = 'Dog'") == []
+    assert cache.misses == 2
+    conn.close()
+    cache.close()
+
+
+def test_failing_queries_are_not_cached(tmp_path, db_path):
+    cache = GroundTruthCache(str(tmp_path / "cache.sqlite"))
+    conn = sqlite3.connect(db_path)
+    with pytest.raises(sqlite3.OperationalError):
+        cache.fetch(conn, db_path, "SELECT nope FROM pets")
+    assert cache.get(db_path, "SELECT nope FROM pets") is None
+    conn.close()
+    cache.close()
+
+
+def test_writes_to_the_database_invalidate_its_entries(tmp_path, db_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    cache = GroundTruthCache(cache_path)
+    conn = sqlite3.connect(db_path)
+    assert cache.fetch(conn, db_path, "SELECT COUNT(*) FROM pets") == [(2,)]
+    conn.close()
+    cache.close()
+
+    # Same size and modification time: only the change counter of the SQLite header tells them apart
+    stat = os.stat(db_path)
+    before = database_fingerprint(db_path)
+    insert_pet(db_path, 3, "fish")
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.path.getsize(db_path) == stat.st_size
+    assert database_fingerprint(db_path) != before
+
+    cache = GroundTruthCache(cache_path)
+    assert cache.get(db_path, "SELECT COUNT(*) FROM pets") is None
+    conn = sqlite3.connect(db_path)
+    assert cache.fetch(conn, db_path, "SELECT COUNT(*) FROM pets") == [(3,)]
+    conn.close()
+    # The entries of the previous version were dropped
+    rows = sqlite3.connect(cache_path).execute("SELECT COUNT(*) FROM results").fetchone()
+    assert rows == (1,)
+    cache.close()
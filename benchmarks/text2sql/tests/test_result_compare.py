@@ -0,0 +1,92 @@
+"""Tests for the exact result-set comparison."""
+
+import random
+import sqlite3
+import pytest
+import sql_execution
+from result_compare import COMPARISON_MODES, compare_streams, rows_match
+
+
+def batches(rows, size=2):
+    return [rows[i : i + size] for i in range(0, len(rows), size)]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(1, "x"), (2, "y"), (2, "y"), (3, None)])
+    conn.commit()
+    conn.close()
+    sql_execution.configure()
+    yield path
+    sql_execution.close_all_connections()
+
+
+@pytest.mark.parametrize("mode", COMPARISON_MODES)
+@pytest.mark.parametrize(
+    "predicted, gold",
+    [
+        ([(-1,)], [(-2,)]),  # hash(-1) == hash(-2)
+        ([(-1, -2)], [(-2, -1)]),
+        ([(0,)], [(2**61 - 1,)]),  # numeric hashes are reduced modulo 2**61 - 1
+        ([(1,), (2,)], [(1,), (3,)]),
+    ],
+)
+def test_hash_collisions_do_not_match(mode, predicted, gold):
+    assert not compare_streams(batches(predicted), batches(gold), mode)
+    assert not rows_match(predicted, gold, mode)
+
+
+@pytest.mark.parametrize(
+    "predicted, gold",
+    [("SELECT -1, -2", "SELECT -2, -1"), ("SELECT 0", "SELECT 2305843009213693951"), ("SELECT -1", "SELECT -2")],
+)
+def test_execute_sql_rejects_colliding_results(db_path, predicted, gold):
+    assert sql_execution.execute_sql(predicted, gold, db_path) == 0
+
+
+def test_modes(db_path):
+    rows = [(1, "x"), (2, "y"), (2, "y"), (3, None)]
+    shuffled = [(3, None), (2, "y"), (1, "x"), (2, "y")]
+    deduplicated = [(3, None), (2, "y"), (1, "x")]
+    assert rows_match(shuffled, rows, "set") and rows_match(deduplicated, rows, "set")
+    assert rows_match(shuffled, rows, "multiset") and not rows_match(deduplicated, rows, "multiset")
+    assert rows_match(rows, rows, "ordered") and not rows_match(shuffled, rows, "ordered")
+    assert sql_execution.compare_sql("SELECT DISTINCT a, b FROM t", "SELECT a, b FROM t", db_path, "set")
+    assert not sql_execution.compare_sql("SELECT DISTINCT a, b FROM t", "SELECT a, b FROM t", db_path, "multiset")
+
+
+def test_numeric_equality_follows_python():
+    assert rows_match([(1,)], [(1.0,)], "set")
+    assert rows_match([(1,), (1.0,)], [(1,), (1,)], "multiset")
+    assert not rows_match([("1",)], [(1,)], "set")
+
+
+@pytest.mark.parametrize("mode", COMPARISON_MODES)
+def test_streams_agree_with_materialized_comparison(mode):
+    rng = random.Random(0)
+    for _ in range(300):
+        gold = [(rng.randint(-3, 3), rng.choice("ab")) for _ in range(rng.randint(0, 6))]
+        predicted = rng.choice([list(gold), gold[::-1], gold + gold[:1], gold[1:], [(rng.randint(-3, 3), "a")] + gold])
+        expected = {
+            "set": set(predicted) == set(gold),
+            "multiset": sorted(predicted) == sorted(gold),
+            "ordered": predicted == gold,
+        }[mode]
+        assert compare_streams(batches(predicted, rng.randint(1, 3)), batches(gold, rng.randint(1, 3)), mode) == expected
+        assert rows_match(predicted, gold, mode) == expected
+
+
+@pytest.mark.parametrize("mode", ("set", "multiset"))
+def test_unordered_modes_stop_at_first_mismatch(mode):
+    read = []
+
+    def predicted():
+        for batch in ([(1,)], [(99,)], [(2,)]):
+            read.append(batch)
+            yield batch
+
+    assert not compare_streams(predicted(), [[(1,), (2,)]], mode)
+    assert read == [[(1,)], [(99,)]]
@@ -0,0 +1,88 @@
+"""Tests for the append-only result store and its offset index."""
+
+import os
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from result_store import ResultStore
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    with ResultStore(path) as store:
+        for question_id in range(3):
+            store.append({"question_id": question_id, "prediction": f"SELECT {question_id}"})
+    return path
+
+
+def _snapshot(path):
+    with open(path, "rb") as f:
+        return os.stat(path).st_mtime_ns, f.read()
+
+
+def test_reading_leaves_the_index_untouched(store_path):
+    before = _snapshot(store_path + ".idx")
+    with ResultStore(store_path, read_only=True) as store:
+        assert [record["question_id"] for record in store] == [0, 1, 2]
+        with pytest.raises(ValueError):
+            store.append({"question_id": 3})
+    with ResultStore(store_path) as store:
+        assert store.get(1)["prediction"] == "SELECT 1"
+    assert _snapshot(store_path + ".idx") == before
+
+
+def test_read_only_open_of_a_crashed_store_modifies_nothing(store_path):
+    with open(store_path + ".idx", "a") as f:
+        f.write('[3, 99')
+    with open(store_path, "ab") as f:
+        f.write(b'{"question_id": 3, "predic')
+    index, data = _snapshot(store_path + ".idx"), _snapshot(store_path)
+
+    with ResultStore(store_path, read_only=True) as store:
+        assert store.question_ids() == [0, 1, 2]
+    assert _snapshot(store_path + ".idx") == index and _snapshot(store_path) == data
+
+    # Opening it for writing drops the torn record and rewrites the stale index
+    with ResultStore(store_path) as store:
+        store.append({"question_id": 3})
+    with ResultStore(store_path, read_only=True) as store:
+        assert store.question_ids() == [0, 1, 2, 3] and store.get(3) == {"question_id": 3}
+
+
+def test_records_missing_from_the_index_are_reindexed(store_path):
+    os.remove(store_path + ".idx")
+    with ResultStore(store_path, read_only=True) as store:
+        assert len(store) == 3
+    assert not os.path.exists(store_path + ".idx")
+    with ResultStore(store_path) as store:
+        assert len(store) == 3
+    with open(store_path + ".idx") as f:
+        assert len(f.readlines()) == 3
+
+
+@pytest.mark.parametrize("name", ["results.jsonl", "results.jsonl.zst"])
+def test_stores_without_an_index_are_rescanned(tmp_path, name):
+    if name.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / name)
+    records = [{"question_id": i, "prediction": "SELECT " + "x" * (i * 37 % 9000)} for i in range(300)]
+    with ResultStore(path) as store:
+        for record in records:
+            store.append(record)
+    os.remove(path + ".idx")
+    with open(path, "ab") as f:
+        f.write(b"\x28\xb5\x2f\xfd" if name.endswith(".zst") else b'{"question_id": 300')
+
+    with ResultStore(path) as store:
+        assert list(store) == records
+        assert store.get(299) == records[299]
+    assert os.path.getsize(path) == sum(length for _, _, length in ResultStore(path, read_only=True)._entries)
+
+
+def test_concurrent_appends_are_all_indexed(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    with ResultStore(path) as store, ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: store.append({"question_id": i, "prediction": f"SELECT {i}"}), range(200)))
+    with ResultStore(path, read_only=True) as store:
+        assert sorted(store.question_ids()) == list(range(200))
+        assert all(store.get(i)["prediction"] == f"SELECT {i}" for i in range(200))
@@ -0,0 +1,70 @@
+"""Tests for the two-tier retrieval result cache."""
+
+import pytest
+from retrieval_cache import RetrievalCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = RetrievalCache(ttl=60, clock=clock)
+    cache.put("index", "singers", 3, "doc")
+    clock.now += 60
+    assert cache.get("index", "singers", 3) == "doc"
+    clock.now += 1
+    assert cache.get("index", "singers", 3) is None
+    assert cache.stats()["entries"] == 0 and (cache.hits, cache.misses) == (1, 1)
+
+    cache = RetrievalCache(ttl=None, clock=clock)
+    cache.put("index", "singers", 3, "doc")
+    clock.now += 10 ** 9
+    assert cache.get("index", "singers", 3) == "doc"
+
+
+def test_disk_tier_is_shared_and_expires(tmp_path, clock):
+    path = str(tmp_path / "retrieval.sqlite")
+    RetrievalCache(ttl=60, disk_path=path, clock=clock).put("index", "singers", 3, "doc")
+
+    rerun = RetrievalCache(ttl=60, disk_path=path, clock=clock)
+    assert rerun.get("index", "singers", 3) == "doc" and rerun.disk_hits == 1
+    # The disk hit is promoted to memory with its original timestamp, so it expires on time in both tiers
+    assert rerun.get("index", "singers", 3) == "doc" and rerun.hits == 1
+    clock.now += 61
+    assert rerun.get("index", "singers", 3) is None
+    assert RetrievalCache(ttl=60, disk_path=path, clock=clock).get("index", "singers", 3) is None
+
+
+def test_memory_tier_is_a_bounded_lru(clock):
+    cache = RetrievalCache(max_entries=2, clock=clock)
+    cache.put("index", "a", 3, "A")
+    cache.put("index", "b", 3, "B")
+    assert cache.get("index", "a", 3) == "A"
+    cache.put("index", "c", 3, "C")
+    assert cache.get("index", "b", 3) is None
+    assert cache.get("index", "a", 3) == "A" and cache.get("index", "c", 3) == "C"
+
+
+def test_failed_retrievals_are_not_cached(clock):
+    cache = RetrievalCache(clock=clock)
+    calls = []
+
+    def retrieve():
+        # retrieve_docs returns "" when the request fails
+        calls.append(1)
+        return ""
+
+    assert cache.get_or_retrieve("index", "singers", 3, retrieve) == ""
+    assert cache.get_or_retrieve("index", "singers", 3, lambda: "doc") == "doc"
+    assert cache.get_or_retrieve("index", "singers", 3, retrieve) == "doc"
+    assert len(calls) == 1
@@ -0,0 +1,64 @@
+"""Tests for the seeded stratified sampling of benchmark questions."""
+
+import random
+import pytest
+from sampling import allocate, stratified_reservoir_sample, stratified_sample, freeze_manifest, load_manifest
+
+
+def make_questions(seed=0, n=1500):
+    rng = random.Random(seed)
+    # Uneven databases, some smaller than their equal share, and a few questions without a difficulty
+    weights = {f"db{i}": rng.choice([1, 2, 5, 40, 200]) for i in range(23)}
+    db_ids = rng.choices(list(weights), weights=list(weights.values()), k=n)
+    difficulties = [rng.choice(["simple", "moderate", "challenging", None]) for _ in range(n)]
+    return db_ids, difficulties
+
+
+@pytest.mark.parametrize("total_samples", [1, 22, 23, 100, 377, 1500, 2000])
+def test_allocation_totals_are_exact(total_samples):
+    db_ids, difficulties = make_questions()
+    counts = {}
+    for stratum in zip(db_ids, difficulties):
+        counts[stratum] = counts.get(stratum, 0) + 1
+    allocation = allocate(counts, total_samples)
+    assert sum(allocation.values()) == min(total_samples, len(db_ids))
+    assert all(0 <= allocation[stratum] <= counts[stratum] for stratum in counts)
+
+    # Databases get an equal share, or all of their questions when they have fewer
+    per_db = {}
+    for (db_id, _), count in allocation.items():
+        per_db[db_id] = per_db.get(db_id, 0) + count
+    sizes = {db_id: db_ids.count(db_id) for db_id in per_db}
+    base = total_samples // len(sizes)
+    assert all(per_db[db_id] >= min(base, sizes[db_id]) for db_id in sizes)
+
+
+def test_samples_are_reproducible_and_balanced():
+    db_ids, difficulties = make_questions()
+    sample = stratified_sample(db_ids, difficulties, total_samples=100, seed=7)
+    assert len(sample) == len(set(sample)) == 100 and sample == sorted(sample)
+    assert stratified_sample(db_ids, difficulties, total_samples=100, seed=7) == sample
+    assert stratified_sample(db_ids, difficulties, total_samples=100, seed=8) != sample
+    assert stratified_sample(db_ids, None, total_samples=100, seed=7) != sample
+
+
+def test_reservoir_sample_matches_the_allocation_in_one_pass():
+    db_ids, difficulties = make_questions()
+    sample = stratified_reservoir_sample(iter(list(zip(db_ids, difficulties))), total_samples=100, seed=7)
+    assert len(sample) == len(set(sample)) == 100
+    assert sample == stratified_reservoir_sample(zip(db_ids, difficulties), total_samples=100, seed=7)
+
+    counts = {}
+    for stratum in zip(db_ids, difficulties):
+        counts[stratum] = counts.get(stratum, 0) + 1
+    drawn = {}
+    for i in sample:
+        drawn[(db_ids[i], difficulties[i])] = drawn.get((db_ids[i], difficulties[i]), 0) + 1
+    assert drawn == {stratum: count for stratum, count in allocate(counts, 100).items() if count}
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "sample_manifest.json")
+    assert load_manifest(path) is None
+    freeze_manifest(path, [3, 1, 2], seed=42, total_samples=3)
+    assert load_manifest(path) == {"seed": 42, "total_samples": 3, "question_ids": [3, 1, 2]}
@@ -0,0 +1,44 @@
+"""Tests for the memoized schema loading of decouple_question_schema."""
+
+import json
+import pytest
+
+pytest.importorskip("aixplain")
+import utilities  # noqa: E402
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    # Schema files are read from <dataset_name>/<db_id>.txt relative to the working directory, as in the notebooks
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "spider").mkdir(parents=True)
+    questions = [{"db_id": db_id, "question": f"q{i}", "query": "SELECT 1"} for i, db_id in enumerate(["pets", "shop", "pets", "pets"])]
+    (tmp_path / "data" / "spider" / "dev.json").write_text(json.dumps(questions))
+    (tmp_path / "spider").mkdir()
+    for db_id in ("pets", "shop", "unused"):
+        (tmp_path / "spider" / f"{db_id}.txt").write_text(f"CREATE TABLE {db_id} (id INTEGER);")
+    utilities.load_schema.cache_clear()
+    yield tmp_path
+    utilities.load_schema.cache_clear()
+
+
+def test_schemas_are_read_on_access_and_only_once(dataset):
+    _, _, _, output = utilities.decouple_question_schema("data", "spider")
+    schemas = output["schema"]
+    assert len(schemas) == 4 and utilities.load_schema.cache_info().currsize == 0
+
+    assert schemas[0] == "CREATE TABLE pets (id INTEGER);"
+    # Later reads share the cached text even if the file changes
+    (dataset / "spider" / "pets.txt").write_text("changed")
+    assert schemas[2] is schemas[0] and schemas[3] is schemas[0]
+    assert schemas[1:2] == ["CREATE TABLE shop (id INTEGER);"]
+    info = utilities.load_schema.cache_info()
+    assert (info.misses, info.currsize) == (2, 2)
+
+
+def test_missing_schema_file_raises_on_access(dataset):
+    (dataset / "spider" / "shop.txt").unlink()
+    _, _, _, output = utilities.decouple_question_schema("data", "spider")
+    assert output["schema"][0].startswith("CREATE TABLE pets")
+    with pytest.raises(FileNotFoundError):
+        output["schema"][1]
@@ -0,0 +1,82 @@
+"""Tests for matching question literals against stored values in schema pruning."""
+
+import os
+import sqlite3
+import pytest
+import schema_pruning
+from schema_pruning import _value_matches, parse_schema
+
+SCHEMA = """CREATE TABLE singer (
+    singer_id INTEGER PRIMARY KEY,
+    name TEXT,
+    country TEXT,
+    birth_year REAL
+)
+"""
+
+
+@pytest.fixture
+def database(tmp_path):
+    db_path = str(tmp_path / "concert.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE singer (singer_id INTEGER PRIMARY KEY, name TEXT, country TEXT, birth_year REAL)")
+    conn.executemany(
+        "INSERT INTO singer VALUES (?, ?, ?, ?)",
+        [(1, "Joe Sharp", "Netherlands", 1980.0), (2, "Timbaland", "United States", 1972.5), (3, "Rose White", "France", 1990.0)],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_literals_match_stored_values(database):
+    schema = parse_schema(SCHEMA)
+    assert _value_matches(database, schema, {"netherlands", "Rose White"}) == {("singer", "country"), ("singer", "name")}
+    assert _value_matches(database, schema, {"1980", "1972.5"}) == {("singer", "birth_year")}
+    assert _value_matches(database, schema, {"Germany"}) == set()
+    assert _value_matches(str(database) + ".missing", schema, {"France"}) == set()
+
+
+def test_index_is_rebuilt_when_the_database_changes(database):
+    schema = parse_schema(SCHEMA)
+    assert _value_matches(database, schema, {"Germany"}) == set()
+    conn = sqlite3.connect(database)
+    conn.execute("INSERT INTO singer VALUES (4, 'Nena', 'Germany', 1960)")
+    conn.commit()
+    conn.close()
+    # A different size keys a new index even when the modification time did not move
+    assert _value_matches(database, schema, {"Germany"}) == {("singer", "country")}
+
+
+def test_only_leading_rows_are_indexed(database, monkeypatch):
+    monkeypatch.setattr(schema_pruning, "VALUE_INDEX_ROWS", 2)
+    schema_pruning._value_index.cache_clear()
+    schema = parse_schema(SCHEMA)
+    assert _value_matches(database, schema, {"France", "Netherlands"}) == {("singer", "country")}
+    assert _value_matches(database, schema, {"France"}) == set()
+    schema_pruning._value_index.cache_clear()
+
+
+def test_only_short_text_and_low_cardinality_values_are_indexed(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_pruning, "LOW_CARDINALITY", 3)
+    monkeypatch.setattr(schema_pruning, "MAX_COLUMN_VALUES", 4)
+    db_path = str(tmp_path / "notes.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE "my ""notes""" (id INTEGER, title VARCHAR(20), body TEXT, kind, photo BLOB)')
+    conn.executemany(
+        'INSERT INTO "my ""notes""" VALUES (?, ?, ?, ?, ?)',
+        [(i, f"Title {i}", "x" * 100 if i else "short", i % 2, b"Title 0") for i in range(6)],
+    )
+    conn.commit()
+    conn.close()
+    schema_pruning._value_index.cache_clear()
+    index = schema_pruning._value_index(db_path, os.path.getsize(db_path), os.stat(db_path).st_mtime_ns)
+    schema_pruning._value_index.cache_clear()
+
+    table = 'my "notes"'
+    # Text columns keep their first MAX_COLUMN_VALUES distinct values, and long values are skipped in SQL
+    assert {key for key, columns in index.items() if (table, "title") in columns} == {f"title {i}" for i in range(4)}
+    assert {key for key, columns in index.items() if (table, "body") in columns} == {"short"}
+    # Untyped columns are indexed while they have few distinct values; ids and blobs are not
+    assert {key for key, columns in index.items() if (table, "kind") in columns} == {"0", "1"}
+    assert not any((table, column) in columns for columns in index.values() for column in ("id", "photo"))
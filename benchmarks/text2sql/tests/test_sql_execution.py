@@ -0,0 +1,204 @@
+"""Tests for the execution-accuracy evaluator and its SQLite execution options."""
+
+import os
+import json
+import sqlite3
+import pytest
+import sql_execution
+from sql_execution import evaluate_files
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "shop.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer TEXT, amount REAL)")
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?)", ((i, f"c{i % 7}", i * 1.5) for i in range(5000)))
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def reset_execution_options():
+    yield
+    sql_execution.configure()
+    sql_execution.close_all_connections()
+
+
+def write_results(tmp_path, db_path, pairs):
+    paths = []
+    for i, (prediction, ground_truth) in enumerate(pairs):
+        path = str(tmp_path / f"result_{i}.json")
+        with open(path, "w") as f:
+            json.dump({"question_id": i, "prediction": prediction, "ground_truth": ground_truth, "sql_path": db_path}, f)
+        paths.append(path)
+    return paths
+
+
+PAIRS = [
+    ("SELECT COUNT(*) FROM orders", "SELECT count(*) FROM orders"),
+    ("SELECT customer FROM orders WHERE id < 10", "SELECT customer FROM orders WHERE id < 10 ORDER BY id DESC"),
+    ("SELECT MAX(amount) FROM orders", "SELECT MIN(amount) FROM orders"),
+    ("SELECT nope FROM orders", "SELECT id FROM orders"),
+    ("not even sql", "SELECT 1"),
+] * 3
+
+
+def test_process_pool_matches_serial_evaluation(tmp_path, db_path):
+    paths = write_results(tmp_path, db_path, PAIRS)
+    serial = evaluate_files(paths, num_workers=1)
+    parallel = evaluate_files(paths, num_workers=3)
+    assert parallel == serial
+    assert [record["res"] for record in serial[:5]] == [1, 1, 0, 0, 0]
+    assert [record["outcome"] for record in serial[:5]] == ["correct", "correct", "incorrect", "error", "error"]
+    assert "Error executing SQL" in serial[3]["log"]
+
+
+def test_connections_are_reused_per_database(db_path):
+    conn = sql_execution.get_connection(db_path)
+    assert sql_execution.get_connection(db_path) is conn
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM orders")
+    sql_execution.close_all_connections()
+    assert sql_execution.get_connection(db_path) is not conn
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_forked_process_opens_its_own_connection(db_path):
+    parent = sql_execution.get_connection(db_path)
+    pid = os.fork()
+    if pid == 0:
+        # Exit code 0 only if the child got a fresh, working connection
+        ok = False
+        try:
+            child = sql_execution.get_connection(db_path)
+            ok = child is not parent and child.execute("SELECT COUNT(*) FROM orders").fetchone() == (5000,)
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    # The parent's connection is untouched by the child
+    assert sql_execution.get_connection(db_path) is parent
+    assert parent.execute("SELECT COUNT(*) FROM orders").fetchone() == (5000,)
+
+
+CROSS_JOIN = "SELECT COUNT(*) FROM orders a, orders b, orders c"
+
+
+def test_budgets_are_off_by_default(db_path):
+    sql_execution.configure()
+    conn = sql_execution.get_connection(db_path)
+    assert len(sql_execution.run_query(conn, "SELECT a.id FROM orders a, orders b WHERE b.id < 300")) == 1_500_000
+    assert sql_execution.compare_sql("SELECT id FROM orders", "SELECT id FROM orders ORDER BY id DESC", db_path)
+
+
+def test_watchdog_interrupts_slow_queries(db_path):
+    conn = sql_execution.get_connection(db_path)
+    with pytest.raises(sql_execution.QueryTimeout, match="time budget"):
+        sql_execution.run_query(conn, CROSS_JOIN, timeout=0.2)
+    with pytest.raises(sql_execution.QueryTimeout, match="VM steps"):
+        sql_execution.run_query(conn, CROSS_JOIN, max_vm_steps=100_000)
+    # The connection is usable and unbudgeted afterwards
+    assert sql_execution.run_query(conn, "SELECT COUNT(*) FROM orders") == [(5000,)]
+
+
+def test_row_cap_stops_oversized_results(db_path):
+    conn = sql_execution.get_connection(db_path)
+    assert len(sql_execution.run_query(conn, "SELECT id FROM orders", max_rows=5000)) == 5000
+    with pytest.raises(sql_execution.QueryTooLarge):
+        sql_execution.run_query(conn, "SELECT id FROM orders", max_rows=4999)
+
+
+def test_budget_outcomes_are_reported(tmp_path, db_path):
+    paths = write_results(
+        tmp_path,
+        db_path,
+        [(CROSS_JOIN, "SELECT 1"), ("SELECT id FROM orders", "SELECT id FROM orders"), ("SELECT 1", "SELECT 1")],
+    )
+    records = evaluate_files(paths, timeout=0.2, max_rows=1000)
+    assert [record["outcome"] for record in records] == ["timeout", "oversize", "correct"]
+    assert [record["res"] for record in records] == [0, 0, 1]
+    # Only the prediction is budgeted, not the ground truth
+    records = evaluate_files(write_results(tmp_path, db_path, [("SELECT 1", "SELECT id FROM orders")]), max_rows=1000)
+    assert records[0]["outcome"] == "incorrect"
+
+
+@pytest.mark.parametrize("mode", sql_execution.DATABASE_MODES)
+def test_database_modes_return_the_same_results(tmp_path, db_path, mode):
+    paths = write_results(tmp_path, db_path, PAIRS[:5])
+    expected = evaluate_files(paths)
+    assert evaluate_files(paths, database_mode=mode) == expected
+    with pytest.raises(sqlite3.OperationalError):
+        sql_execution.get_connection(db_path).execute("DELETE FROM orders")
+
+
+def test_memory_mode_does_not_read_the_file_again(tmp_path, db_path):
+    sql_execution.configure(database_mode="memory")
+    assert sql_execution.compare_sql("SELECT COUNT(*) FROM orders", "SELECT 5000", db_path)
+    os.rename(db_path, db_path + ".moved")
+    assert sql_execution.compare_sql("SELECT COUNT(*) FROM orders", "SELECT 5000", db_path)
+    # Switching mode closes the pooled copies
+    sql_execution.configure(database_mode="file")
+    assert len(sql_execution._POOL) == 0
+    with pytest.raises(sqlite3.OperationalError):
+        sql_execution.compare_sql("SELECT 1", "SELECT 1", db_path)
+
+
+def test_unknown_database_mode_is_rejected():
+    with pytest.raises(ValueError):
+        sql_execution.configure(database_mode="mmap")
+
+
+@pytest.mark.parametrize("mode", ["set", "multiset", "ordered"])
+def test_compare_sql_closes_both_result_streams(db_path, monkeypatch, mode):
+    streams = []
+    stream_query = sql_execution.stream_query
+
+    def recording_stream_query(*args, **kwargs):
+        streams.append(stream_query(*args, **kwargs))
+        return streams[-1]
+
+    monkeypatch.setattr(sql_execution, "stream_query", recording_stream_query)
+    # The first batch already differs, so neither result is read to the end
+    assert not sql_execution.compare_sql("SELECT id FROM orders", "SELECT id + 1 FROM orders", db_path, mode=mode)
+    assert len(streams) == 2 and all(stream.gi_frame is None for stream in streams)
+    # The connection has no statement left running
+    assert sql_execution.get_connection(db_path).execute("SELECT COUNT(*) FROM orders").fetchone() == (5000,)
+
+
+def test_identical_predictions_are_executed_once(tmp_path, db_path, monkeypatch):
+    executed = []
+    evaluate_files_once = sql_execution.evaluate_files
+
+    def recording_evaluate_files(results, *args, **kwargs):
+        executed.extend(results)
+        return evaluate_files_once(results, *args, **kwargs)
+
+    monkeypatch.setattr(sql_execution, "evaluate_files", recording_evaluate_files)
+    single = [
+        {"prediction": "SELECT COUNT(*) FROM orders", "ground_truth": "SELECT 5000", "sql_path": db_path, "difficulty": "simple"},
+        {"prediction": "SELECT MAX(id) FROM orders", "ground_truth": "SELECT 4999", "sql_path": db_path},
+        {"prediction": "SELECT nope FROM orders", "ground_truth": "SELECT 1", "sql_path": db_path},
+        {"prediction": "SELECT 1", "sql_path": db_path},
+    ]
+    team = [
+        # Same canonical SQL as the first single-agent prediction, with its own difficulty
+        {"prediction": "```sql\nselect count(*)\nfrom ORDERS;\n```", "ground_truth": "SELECT 5000;", "sql_path": db_path, "difficulty": "hard"},
+        {"prediction": "SELECT MIN(id) FROM orders", "ground_truth": "SELECT 4999", "sql_path": db_path},
+        {"prediction": "SELECT nope FROM orders", "ground_truth": "SELECT 1", "sql_path": db_path},
+        {"prediction": "SELECT 1", "sql_path": db_path},
+    ]
+    records, stats = sql_execution.evaluate_unique(single + team)
+
+    assert stats == {"results": 8, "executions": 6, "executions_saved": 2}
+    assert len(executed) == 6
+    assert [record["outcome"] for record in records if record["status"] == "evaluated"] == [
+        "correct", "correct", "error", "correct", "incorrect", "error"
+    ]
+    assert [record["status"] for record in records].count("skipped") == 2
+    assert records[4]["prediction"] == sql_execution.result_prediction(team[0]) and records[4]["difficulty"] == "hard"
+    assert records[0]["difficulty"] == "simple" and "difficulty" not in records[1]
+    # The shared outcomes are those of evaluating every prediction on its own
+    expected = evaluate_files_once(single + team)
+    assert [(r["status"], r.get("res")) for r in records] == [(r["status"], r.get("res")) for r in expected]
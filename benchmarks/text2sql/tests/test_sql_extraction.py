@@ -0,0 +1,36 @@
+"""Tests for extracting the SQL query from model outputs."""
+
+import pytest
+from sql_extraction import extract_sql
+
+
+@pytest.mark.parametrize(
+    "output, sql",
+    [
+        ("SELECT a\nFROM t\n\nWHERE b=1", "SELECT a FROM t WHERE b=1"),
+        ("SQL: select a from t\n\n  order by a desc limit 1\n\nThis returns the top a.", "select a from t order by a desc limit 1"),
+        ("SELECT a FROM t WHERE\n\nb = 1\n\nExplanation: b is fixed.", "SELECT a FROM t WHERE b = 1"),
+        ("SELECT a FROM t UNION ALL\n\nSELECT b FROM u", "SELECT a FROM t UNION ALL SELECT b FROM u"),
+        ("SELECT a FROM t\n\nLEFT JOIN u ON t.id = u.id", "SELECT a FROM t LEFT JOIN u ON t.id = u.id"),
+        ("SELECT a\n\nFROM t; SELECT b FROM u", "SELECT a FROM t"),
+    ],
+)
+def test_blank_lines_inside_a_statement_are_kept(output, sql):
+    assert extract_sql(output) == sql
+
+
+@pytest.mark.parametrize(
+    "output",
+    [
+        "SELECT a FROM t\n\nThis query returns a.",
+        "SELECT a FROM t\n\nFrom the table, a is returned.",
+        "SELECT a FROM t\n\nOr alternatively: SELECT a FROM u",
+        "SELECT a FROM t\n\nSELECT b FROM u",
+    ],
+)
+def test_prose_after_a_blank_line_ends_the_statement(output):
+    assert extract_sql(output) == "SELECT a FROM t"
+
+
+def test_fenced_blocks_keep_blank_lines():
+    assert extract_sql("Here:\n```sql\nSELECT a\n\nFROM t\n```\nDone.") == "SELECT a FROM t"
@@ -1,56 +1,32 @@
 import os
-import shutil
+import sys
 import json
-import re
-import random
-import sqlite3
-import nltk
-nltk.download('punkt')
-nltk.download('punkt_tab')
 from collections import defaultdict
-from typing import List, Dict, Text
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import List, Dict, Text, Iterator
 from aixplain.modules.model.record import Record 
 from aixplain.factories import ModelFactory, AgentFactory, TeamAgentFactory
-
-def __parse_question_chunks(text: Text, chunk_size: int = 1000) -> List[Text]:
-    """Chunk natural language questions using sentence-aware splitting"""
-    if not text.strip():
-        return []
-
-    chunks = []
-    current_chunk = []
-    current_length = 0
-    sentences = nltk.sent_tokenize(text)
-
-    for sentence in sentences:
-        sentence_length = len(sentence)
-        
-        # Split long sentences into sub-chunks
-        if sentence_length > chunk_size:
-            sub_chunks = [sentence[i:i+chunk_size] for i in range(0, sentence_length, chunk_size)]
-            for sub in sub_chunks:
-                if current_length + len(sub) > chunk_size:
-                    if current_chunk:
-                        chunks.append(" ".join(current_chunk))
-                    current_chunk = [sub]
-                    current_length = len(sub)
-                else:
-                    current_chunk.append(sub)
-                    current_length += len(sub) + 1
-        else:
-            if current_length + len(sentence) + 1 > chunk_size:
-                if current_chunk:
-                    chunks.append(" ".join(current_chunk))
-                current_chunk = [sentence]
-                current_length = len(sentence)
-            else:
-                current_chunk.append(sentence)
-                current_length += len(sentence) + 1
-
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    
-    return chunks
+from sql_execution import execute_sql, sql_res, evaluate_files, evaluate_unique, close_all_connections
+from sql_extraction import extract_sql, canonical_sql
+from result_store import ResultStore, find_result_store, result_file_key, convert_result_dir
+from agent_registry import AgentRegistry
+from checkpoint import RunCheckpoint, atomic_write_json
+from materialize import materialize
+from schema_pruning import prune_schema
+from schema_catalog import SchemaCatalog
+from json_stream import iter_json_array
+from chunking import iter_chunks
+from index_ingest import BulkUpserter, LocalIndex, content_id
+from bm25 import build_index, open_index, is_bm25_index
+from retrieval_cache import RetrievalCache
+from sampling import stratified_sample, stratified_reservoir_sample, freeze_manifest, load_manifest
+
+# Run instrumentation, trace logging and the concurrent runner are shared with the other benchmarks (benchmarks/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import RunRecorder
+from trace_log import TraceLog, read_traces, safe_dump_response_step
+from agent_runner import ConcurrentRunner
 
 def __parse_sql_chunks(sql: Text, chunk_size: int = 1000) -> List[Text]:
     """Chunk SQL queries while preserving syntax structure"""
@@ -89,14 +65,14 @@ def __parse_sql_chunks(sql: Text, chunk_size: int = 1000) -> List[Text]:
     
     return chunks
 
-def process_train_data(file_path: str, chunk_size: int = 1000) -> List[Record]:
-    """Process training data with proper chunking for different field types"""
-    with open(file_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
-
-    records = []
-    
-    for entry in data:
+def iter_train_records(file_path: str, chunk_size: int = 1000, chunk_overlap: int = 0, unit: str = "char") -> Iterator[Record]:
+    """
+    Stream the chunked Records of a training file, parsing the JSON array incrementally
+    so memory does not grow with the size of the file.
+    Documents are split with chunking.iter_chunks: chunk_size and chunk_overlap are counted in
+    characters (unit="char") or whitespace-separated tokens (unit="token").
+    """
+    for entry in iter_json_array(file_path):
         db_id = entry.get("db_id", "").strip()
         evidence = entry.get("evidence", "").strip()
         question = entry.get("question", "").strip()
@@ -105,16 +81,15 @@ def process_train_data(file_path: str, chunk_size: int = 1000) -> List[Record]:
         docs = f"""Question: {question}; \nSQL: {sql_query}"""
 
         # Process questions with sentence-aware chunking
-        question_chunks = __parse_question_chunks(docs, chunk_size)
-        for chunk in question_chunks:
-            records.append(
-                            Record(
-                                value=chunk,
-                                attributes={
-                                    "Database Id": db_id,
-                                    "Evidence": evidence,
-                                }
-                                ))
+        for chunk in iter_chunks(docs, chunk_size, chunk_overlap, unit):
+            yield Record(
+                        id=content_id(db_id, evidence, chunk), # deterministic, so re-upserting overwrites
+                        value=chunk,
+                        attributes={
+                            "Database Id": db_id,
+                            "Evidence": evidence,
+                        }
+                    )
 
         # # Process SQL with syntax-aware chunking
         # sql_chunks = __parse_sql_chunks(sql_query, chunk_size)
@@ -130,12 +105,44 @@ def process_train_data(file_path: str, chunk_size: int = 1000) -> List[Record]:
         #             }
         #     ))
 
-    return records
+
+def process_train_data(file_path: str, chunk_size: int = 1000, chunk_overlap: int = 0) -> List[Record]:
+    """Process training data with proper chunking for different field types"""
+    return list(iter_train_records(file_path, chunk_size, chunk_overlap))
+
+
+def upsert_train_data(index_model, file_path: str, chunk_size: int = 1000, batch_size: int = 500, chunk_overlap: int = 0,
+                      max_batch_bytes: int = 1 << 20, max_workers: int = 4, max_retries: int = 3) -> Dict:
+    """
+    Chunk a training file and upsert it into an index with index_ingest.BulkUpserter: the Records are
+    streamed into batches bounded by count and payload size, several batches are uploaded concurrently,
+    and failed batches are retried. Record ids are derived from their content, so a retried or repeated
+    ingestion overwrites instead of duplicating.
+    :param index_model: The index, e.g. created with IndexFactory.create.
+    :param file_path: Path to the training JSON file.
+    :param chunk_size: Maximum chunk length in characters.
+    :param batch_size: Maximum number of Records per upsert call.
+    :param chunk_overlap: Number of characters repeated between consecutive chunks of a document.
+    :param max_batch_bytes: Maximum payload size of an upsert call.
+    :param max_workers: Number of upsert calls in flight.
+    :param max_retries: Number of retries of a failed upsert call.
+    :return: The ingestion stats (records, batches, retries, failed_batches, records_per_sec, ...).
+    """
+    upserter = BulkUpserter(
+        index_model,
+        max_batch_bytes=max_batch_bytes,
+        max_batch_records=batch_size,
+        max_workers=max_workers,
+        max_retries=max_retries,
+    )
+    return upserter.upsert(iter_train_records(file_path, chunk_size, chunk_overlap))
 
 def rename_and_save_sqlite(original_path, base_dir="dev_databases"):
     """
-    Rename a .sqlite file to .db and save it under dev_databases/<db_id>/<db_id>.db
-    Skip if the .db version already exists.
+    Make a .sqlite file available as dev_databases/<db_id>/<db_id>.db without copying its data when possible.
+    The file is hardlinked, else reflinked, else symlinked, else copied (see materialize.materialize).
+    An existing .db is reused when its size and modification time match the original. Safe to call
+    from several workers at the same time.
 
     Args:
         original_path (str): Path to the original .sqlite file.
@@ -156,27 +163,53 @@ def rename_and_save_sqlite(original_path, base_dir="dev_databases"):
 
     target_path = os.path.join(target_dir, f"{db_id}.db")
 
-    # Skip if .db already exists
-    if os.path.exists(target_path):
+    strategy = materialize(original_path, target_path)
+    if strategy == "existing":
         print(f"[✓] Target .db already exists: {target_path}")
-        return target_path
-
-    # Otherwise, rename and save
-    shutil.copyfile(original_path, target_path)
-    print(f"[+] Renamed and saved as: {target_path}")
+    else:
+        print(f"[+] Saved as: {target_path} ({strategy})")
     return target_path
 
 
-def retrieve_docs(query, model_id, num_results):
+def build_retrieval_index(file_path, index_dir, chunk_size=1000, chunk_overlap=0):
+    """
+    Build a local BM25 index (see bm25.py) from the same chunked Records that are upserted to the remote index.
+    :param file_path: Path to the training JSON file.
+    :param index_dir: Directory of the index, usable as the model_id of retrieve_docs.
+    :return: The number of indexed documents.
+    """
+    return build_index((record.value for record in iter_train_records(file_path, chunk_size, chunk_overlap)), index_dir)
+
+
+RETRIEVAL_CACHE = RetrievalCache()
+
+
+@lru_cache(maxsize=None)
+def get_index_model(model_id):
+    """Resolve an index model once per process instead of on every retrieval."""
+    return ModelFactory.get(model_id)
+
+
+def retrieve_docs(query, model_id, num_results, backend="auto", cache=None):
     """
     Retrieves documents from a model based on the query.
     :param query: The query string to search for.
-    :param model_id: The ID of the model to use for retrieval.
+    :param model_id: The ID of the model to use for retrieval, or the directory of a local BM25 index.
     :param num_results: The number of results to retrieve.
+    :param backend: "remote" for the aiXplain index, "bm25" for a local index built with build_retrieval_index,
+        or "auto" to use the local index when model_id is one.
+    :param cache: RetrievalCache for remote results keyed by (model_id, query, num_results); defaults to the
+        process-wide RETRIEVAL_CACHE. Pass RetrievalCache(disk_path=...) to share results across reruns, or False to disable.
     :return: A string containing the retrieved documents.
     """
+    if backend == "bm25" or (backend == "auto" and is_bm25_index(model_id)):
+        return open_index(model_id).retrieve(query, num_results)
+    if cache is None:
+        cache = RETRIEVAL_CACHE
+    if cache is not False:
+        return cache.get_or_retrieve(model_id, query, num_results, lambda: retrieve_docs(query, model_id, num_results, "remote", False))
     try:
-        index_model = ModelFactory.get(model_id)  # Retrieves the model by ID
+        index_model = get_index_model(model_id)  # Retrieves the model by ID
         response = index_model.run(query, parameters={"numResults": num_results})
         details = response.get("details", [])
         limited_details = details[:num_results]
@@ -187,6 +220,43 @@ def retrieve_docs(query, model_id, num_results):
         return ""
 
 
+@lru_cache(maxsize=None)
+def load_schema(dataset_name, db_id):
+    """
+    Load the schema text of a database from <dataset_name>/<db_id>.txt.
+    Each schema is read once per process and every caller shares the same string.
+    :param dataset_name: Name of the dataset (folder containing the schema files).
+    :param db_id: The database id.
+    :return: The schema text.
+    """
+    schema_path = os.path.join(dataset_name, f"{db_id}.txt")
+    with open(schema_path, "r", encoding="utf8") as file:
+        return file.read()
+
+
+class LazySchemas(Sequence):
+    """
+    Schema column of decouple_question_schema's output.
+    Stores the db_id of every question and loads the schema text on access through load_schema,
+    so only the schemas of the questions actually used are read, and each of them only once.
+    """
+
+    def __init__(self, dataset_name, db_ids=None):
+        self.dataset_name = dataset_name
+        self.db_ids = list(db_ids or [])
+
+    def append(self, db_id):
+        self.db_ids.append(db_id)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [load_schema(self.dataset_name, db_id) for db_id in self.db_ids[index]]
+        return load_schema(self.dataset_name, self.db_ids[index])
+
+    def __len__(self):
+        return len(self.db_ids)
+
+
 def decouple_question_schema(dataset_dir, dataset_name):
     """
     Decouples the question and schema from the dataset.
@@ -209,7 +279,7 @@ def decouple_question_schema(dataset_dir, dataset_name):
         "difficulty": [],
         "field": [],
         "sql_path": [],
-        "schema": [],
+        "schema": LazySchemas(dataset_name),
         "question": [],
         "prediction": [],
         "ground_truth": [],
@@ -219,8 +289,6 @@ def decouple_question_schema(dataset_dir, dataset_name):
         basename = f"{data.get('db_id', '')}.sqlite"
         path = os.path.join(db_root_path, data.get("db_id", ""), basename)
         db_path_list.append(path)
-        schema_path = os.path.join(dataset_name, f"{data['db_id']}.txt")
-        schema = open(schema_path, "r", encoding="utf8").read()
         question_list.append(data.get("question", ""))
         knowledge_list.append(data.get("evidence", None))
 
@@ -230,192 +298,183 @@ def decouple_question_schema(dataset_dir, dataset_name):
         output_data["question"].append(data.get("question", None))
         output_data["ground_truth"].append(data.get("SQL", "") or data.get("query", ""))
         output_data["sql_path"].append(path)
-        output_data["schema"].append(schema)
+        output_data["schema"].append(data["db_id"])
 
     return question_list, db_path_list, knowledge_list, output_data
 
 
-def select_fixed_total_samples(output, total_samples=100):
+def select_fixed_total_samples(output, total_samples=100, seed=42, manifest_path=None):
     """
     Select a fixed number of samples from the output data, ensuring a balanced selection across different databases.
+    Questions are stratified by db_id and difficulty and drawn with a seeded generator (see sampling.stratified_sample),
+    so the same seed always selects the same questions. Only the selected entries are built, so only their schemas are read.
     :param output: The output data containing question IDs and other information.
     :param total_samples: The total number of samples to select.
+    :param seed: Seed of the random generator.
+    :param manifest_path: Optional path of a frozen manifest. If it exists its question_ids are selected,
+        otherwise the new selection is saved there so every configuration runs on the same questions.
     :return: A list of selected entries.
     """
-    db_to_entries = defaultdict(list)
+    manifest = load_manifest(manifest_path) if manifest_path else None
+    if manifest is not None:
+        position = {question_id: i for i, question_id in enumerate(output["question_id"])}
+        indices = [position[question_id] for question_id in manifest["question_ids"]]
+        print(f"[✓] Loaded {len(indices)} questions from sample manifest: {manifest_path}")
+    else:
+        indices = stratified_sample(output["field"], output["difficulty"], total_samples, seed)
+        if manifest_path:
+            freeze_manifest(manifest_path, [output["question_id"][i] for i in indices], seed, total_samples)
 
-    for i, db_id in enumerate(output["field"]):
-        entry = {
+    return [
+        {
             "question_id": output["question_id"][i],
             "difficulty": output["difficulty"][i],
-            "db_id": db_id,
+            "db_id": output["field"][i],
             "question": output["question"][i],
             "prediction": output["prediction"][i] if output["prediction"] else None,
             "ground_truth": output["ground_truth"][i],
             "sql_path": output["sql_path"][i],
             "schema": output["schema"][i],
         }
-        db_to_entries[db_id].append(entry)
-
-    num_dbs = len(db_to_entries)
-    base_per_db = total_samples // num_dbs
-
-    selected_entries = []
-    for db, entries in db_to_entries.items():
-        if len(entries) >= base_per_db:
-            selected = random.sample(entries, base_per_db)  # Pick random
-        else:
-            selected = entries
+        for i in indices
+    ]
 
-        selected_entries.extend(selected)
 
-    remaining_slots = total_samples - len(selected_entries)
-    if remaining_slots > 0:
-        all_entries = [(db, entry) for db, entries in db_to_entries.items() for entry in entries if len(entries) > base_per_db]
-        selected_extra = random.sample(all_entries, remaining_slots)
-
-        selected_entries.extend([entry for _, entry in selected_extra])
+def result_record(data, response):
+    """
+    The result record of a question: its entry fields, the raw response and the SQL query extracted from it
+    (saved in the "clean_sql" field, so the evaluators do not parse the response again).
+    :param data: The question entry.
+    :param response: The response text of the agent.
+    """
+    return {
+        "question_id": data["question_id"],
+        "difficulty": data["difficulty"] if data["difficulty"] is not None else "Undefined",
+        "field": data["db_id"],
+        "sql_path": data["sql_path"],
+        "question": data["question"],
+        "prediction": response,
+        "clean_sql": extract_sql(response),
+        "ground_truth": data["ground_truth"],
+    }
 
-    if len(selected_entries) > total_samples:
-        selected_entries = random.sample(selected_entries, total_samples)
 
-    return selected_entries
+def save_result(store, data, response):
+    """
+    Append the result of one question to a result store as soon as its response arrives, so an interrupted
+    run keeps every response received so far.
+    :param store: An open ResultStore, e.g. ResultStore(os.path.join(output_dir, "results.jsonl")).
+    :param data: The question entry.
+    :param response: The response text of the agent.
+    """
+    store.append(result_record(data, response))
 
 
-def process_and_save_results(responses, output, output_dir, start=0):
+def process_and_save_results(responses, output, output_dir, start=0, result_format="json"):
     """
     Process the responses and save them to JSON files.
-    :param responses: List of responses from the model.
+    The SQL query is extracted from each response once here and saved in the "clean_sql" field.
+    :param responses: List of responses from the model. None entries (unfinished questions) are skipped.
     :param output: The output data containing question IDs and other information.
     :param output_dir: Directory to save the results.
     :param start: Starting index for processing.
+    :param result_format: "json" writes one result_{i}.json file per question, "jsonl" appends to the
+        results.jsonl result store and "jsonl.zst" to its zstd-compressed variant (requires zstandard).
+        To append each response as it arrives instead, call save_result from the run loop.
     """
     os.makedirs(output_dir, exist_ok=True)
+    store = ResultStore(os.path.join(output_dir, f"results.{result_format}")) if result_format != "json" else None
 
     for i, (response, data) in enumerate(zip(responses, output[start:]), start=start):
-        output_data = {
-            "question_id": data["question_id"],
-            "difficulty": data["difficulty"] if data["difficulty"] is not None else "Undefined",
-            "field": data["db_id"],
-            "sql_path": data["sql_path"],
-            "question": data["question"],
-            "prediction": response,
-            "ground_truth": data["ground_truth"],
-        }
+        if response is None:
+            print(f"{i}. Skipping question {data['question_id']}: no response yet")
+            continue
+
+        output_data = result_record(data, response)
 
         print(f"{i}. {data['question']}")
         print("   ", response.replace("\t", " ").replace("\n", " "))
         print()
 
-        result_file_path = os.path.join(output_dir, f"result_{i}.json")
-        with open(result_file_path, "w", encoding="utf-8") as file:
-            json.dump(output_data, file, indent=4, ensure_ascii=False)
-    print(f"Results successfully saved in {output_dir}")
-
-
-def execute_sql(predicted_sql, ground_truth, db_path):
-    """
-    Execute the SQL queries and compare the results.
-    :param predicted_sql: The SQL query generated by the model.
-    :param ground_truth: The ground truth SQL query.
-    :param db_path: The path to the SQLite database.
-    :return: 1 if the results match, 0 otherwise.
-    """
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(predicted_sql)
-        predicted_res = cursor.fetchall()
-
-        cursor.execute(ground_truth)
-        ground_truth_res = cursor.fetchall()
-
-        conn.close()
+        if store is not None:
+            store.append(output_data)
+        else:
+            result_file_path = os.path.join(output_dir, f"result_{i}.json")
+            atomic_write_json(result_file_path, output_data, indent=4)
 
-        return 1 if set(predicted_res) == set(ground_truth_res) else 0
-    except Exception as e:
-        print(f"Error executing SQL: {e}")
-        return 0
+    if store is not None:
+        store.close()
+    print(f"Results successfully saved in {output_dir}")
 
 
-def sql_res(predicted_sql, ground_truth, db_path):
+def _load_results(output_dir, start=0, end=None):
     """
-    Execute the SQL queries and return the results.
-    :param predicted_sql: The SQL query generated by the model.
-    :param ground_truth: The ground truth SQL query.
-    :param db_path: The path to the SQLite database.
-    :return: The results of the SQL queries.
+    List the results of an output directory, limited to the start:end range.
+    Results are read from the directory's result store in one sequential pass when it has one,
+    otherwise from its result_{i}.json files in numeric order.
+    :return: A list of (index, result) tuples, where result is a result record or a file path.
     """
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(predicted_sql)
-        predicted_res = cursor.fetchall()
-
-        cursor.execute(ground_truth)
-        ground_truth_res = cursor.fetchall()
-
-        conn.close()
-
-        return predicted_res, ground_truth_res
-    except Exception as e:
-        return f"Error: {e}"
+    store_path = find_result_store(output_dir)
+    if store_path is not None:
+        with ResultStore(store_path, read_only=True) as store:
+            results = list(store)
+        results = results[start:end] if end else results[start:]
+        return list(enumerate(results))
+
+    files = sorted((f for f in os.listdir(output_dir) if f != "results"), key=result_file_key)
+    files = files[start:end] if end else files[start:]  # Limit files based on start:end range
+    file_paths = [(i, os.path.join(output_dir, path)) for i, path in enumerate(files)]
+    return [(i, file_path) for i, file_path in file_paths if os.path.isfile(file_path)]
 
 
-def evaluate_predictions(output_dir, start=0, end=None):
+def evaluate_predictions(output_dir, start=0, end=None, num_workers=1, **execution_options):
     """
     Evaluate SQL predictions by executing them against the database and comparing results.
     :param output_dir: Directory containing the output files.
     :param start: Starting index for processing files.
     :param end: Ending index for processing files.
+    :param num_workers: Number of worker processes used to execute the queries (1 runs serially).
+    :param execution_options: SQL execution options, e.g. ground_truth_cache=True or timeout=30 (see sql_execution.configure).
+    :return: Accuracy by difficulty level and final accuracy.
+    """
+    indexed_results = _load_results(output_dir, start, end)
+    records = evaluate_files([result for _, result in indexed_results], num_workers=num_workers, **execution_options)
+    return _report_accuracy(indexed_results, records)
+
+
+def _report_accuracy(indexed_results, records):
+    """
+    Print the evaluation log, the incorrect predictions and the accuracy of a list of evaluation records.
+    :param indexed_results: The (index, result) tuples returned by _load_results.
+    :param records: The evaluation records of these results.
     :return: Accuracy by difficulty level and final accuracy.
     """
-    replacements = {r"\n": " ", r"```": "", r";": "", r":": "", r"(?i)sql": ""}
     # Initialize counters for difficulty-based evaluation
     difficulty_count = defaultdict(int)
     difficulty_correct = defaultdict(int)
 
     # Initialize counters for overall SQL prediction evaluation
     total_correct, num_files = 0, 0
+    outcome_count = defaultdict(int)
 
-    files = sorted(f for f in os.listdir(output_dir) if f != "results")
-    files = files[start:end] if end else files[start:]  # Limit files based on start:end range
-
-    for i, path in enumerate(files):
-        file_path = os.path.join(output_dir, path)
-        if path == "results" or not os.path.isfile(file_path):
-            continue
-
+    for (i, _), record in zip(indexed_results, records):
         num_files += 1
+        print(record["log"], end="")
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                out_data = json.load(f)
-
-            required_keys = {"prediction", "ground_truth", "sql_path"}
-            if set(required_keys).issubset(out_data):
-                for pattern, replacement in replacements.items():
-                    out_data["prediction"] = re.sub(pattern, replacement, out_data["prediction"])
-
-                res = execute_sql(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"])
-
-                if "difficulty" in out_data:
-                    difficulty = out_data["difficulty"]
-                    difficulty_count[difficulty] += 1
-                    if res == 1:
-                        difficulty_correct[difficulty] += 1
-
-                total_correct += res
-                if res == 0:
-                    print(f"Incorrect Prediction {i}: {out_data['prediction']}")
+        if record["status"] != "evaluated":
+            continue
 
-            else:
-                print(f"Skipping {file_path}: Missing required keys.")
+        res = record["res"]
+        outcome_count[record["outcome"]] += 1
+        if "difficulty" in record:
+            difficulty = record["difficulty"]
+            difficulty_count[difficulty] += 1
+            if res == 1:
+                difficulty_correct[difficulty] += 1
 
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
+        total_correct += res
+        if res == 0:
+            print(f"Incorrect Prediction {i}: {record['prediction']}")
 
     # Calculate and print accuracy for each difficulty level
     accuracy_by_difficulty = {}
@@ -430,62 +489,81 @@ def evaluate_predictions(output_dir, start=0, end=None):
     final_accuracy = f"{(total_correct / num_files * 100):.2f}%" if num_files > 0 else "No valid files found"
 
     print("Accuracy by Difficulty:", accuracy_by_difficulty)
+    print("Execution Outcomes:", dict(outcome_count))
     print("Final SQL Prediction Accuracy:", final_accuracy)
 
     return accuracy_by_difficulty, final_accuracy
 
 
-def evaluate_sql_predictions(output_dir, start=0, end=None):
+def evaluate_configurations(output_dirs, start=0, end=None, num_workers=1, **execution_options):
+    """
+    Evaluate the predictions of several agent configurations, executing each distinct query once.
+    Predictions are grouped by (database, canonical SQL, ground truth) across all output directories, so
+    SQL produced identically by e.g. the single agent and the team agent runs once and its outcome is
+    reported for both. Each configuration is reported as by evaluate_predictions.
+    :param output_dirs: Dict of {configuration: output directory}, or a list of output directories.
+    :param start: Starting index for processing files in every directory.
+    :param end: Ending index for processing files in every directory.
+    :param num_workers: Number of worker processes used to execute the queries (1 runs serially).
+    :param execution_options: SQL execution options, e.g. ground_truth_cache=True (see sql_execution.configure).
+    :return: ({configuration: (accuracy by difficulty, final accuracy)}, stats) where stats counts the
+        results, the executions and the executions saved.
+    """
+    if not isinstance(output_dirs, dict):
+        output_dirs = {output_dir: output_dir for output_dir in output_dirs}
+
+    indexed = {configuration: _load_results(output_dir, start, end) for configuration, output_dir in output_dirs.items()}
+    results = [result for indexed_results in indexed.values() for _, result in indexed_results]
+    records, stats = evaluate_unique(results, num_workers=num_workers, **execution_options)
+
+    reports, offset = {}, 0
+    for configuration, indexed_results in indexed.items():
+        print(f"[+] Configuration: {configuration}")
+        reports[configuration] = _report_accuracy(indexed_results, records[offset:offset + len(indexed_results)])
+        offset += len(indexed_results)
+
+    print(
+        f"[✓] Executed {stats['executions']} distinct queries for {stats['results']} predictions "
+        f"({stats['executions_saved']} executions saved)"
+    )
+    return reports, stats
+
+
+def evaluate_sql_predictions(output_dir, start=0, end=None, num_workers=1, **execution_options):
     """
     Evaluate SQL predictions by executing them against the database and comparing results.
     :param output_dir: Directory containing the output files.
     :param start: Starting index for processing files.
     :param end: Ending index for processing files.
+    :param num_workers: Number of worker processes used to execute the queries (1 runs serially).
+    :param execution_options: SQL execution options, e.g. ground_truth_cache=True or timeout=30 (see sql_execution.configure).
     :return: Final accuracy of SQL predictions.
     """
-    replacements = {r"\n": " ", r"```": "", r";": "", r":": "", r"(?i)sql": ""}
     total_correct, num_files = 0, 0
-    files = sorted(f for f in os.listdir(output_dir) if f != "results")
-
-    # Limit files based on start:end range
-    files = files[start:end] if end else files[start:]
+    outcome_count = defaultdict(int)
 
-    for i, path in enumerate(files):
-        file_path = os.path.join(output_dir, path)
-        if path == "results" or not os.path.isfile(file_path):
-            continue
+    indexed_results = _load_results(output_dir, start, end)
+    records = evaluate_files(
+        [result for _, result in indexed_results], num_workers=num_workers, with_results=True, **execution_options
+    )
 
+    for (i, _), record in zip(indexed_results, records):
         num_files += 1
+        print(record["log"], end="")
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                out_data = json.load(f)
-
-            required_keys = {"prediction", "ground_truth", "sql_path"}
-            if required_keys.issubset(out_data):
-                # Clean prediction: Remove markdown code fences, 'sql' substring, and newlines
-                for pattern, replacement in replacements.items():
-                    out_data["prediction"] = re.sub(pattern, replacement, out_data["prediction"])
-
-                # Execute SQL and compute results
-                res = execute_sql(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"])
-                p, g = sql_res(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"])
-
-                print(p, "===", g)
-                total_correct += res
-
-                # Log incorrect predictions
-                if res == 0:
-                    print(f"Incorrect Prediction {i}: {out_data['prediction']}")
+        if record["status"] != "evaluated":
+            continue
 
-            else:
-                print(f"Skipping {file_path}: Missing required keys.")
+        total_correct += record["res"]
+        outcome_count[record["outcome"]] += 1
 
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
+        # Log incorrect predictions
+        if record["res"] == 0:
+            print(f"Incorrect Prediction {i}: {record['prediction']}")
 
     # Compute final accuracy
     final_result = f"{(total_correct / num_files * 100):.2f}%" if num_files > 0 else "No valid files found"
+    print("Execution Outcomes:", dict(outcome_count))
     print(f"Final Accuracy: {final_result}")
 
     return final_result
@@ -502,13 +580,27 @@ def create_agent(name, description, assets, llm_id):
             )
 
 
-def create_sql_tool(entry):
-    """Helper function to create an SQL tool asset."""
+def create_sql_tool(entry, prune=False, catalog=None):
+    """
+    Helper function to create an SQL tool asset.
+    With prune=True the schema is reduced to the tables and columns relevant to entry["question"]
+    (see schema_pruning.prune_schema), shrinking the prompt of every agent step.
+    With a schema_catalog.SchemaCatalog the schema text is rendered from the database itself
+    instead of the hand-maintained .txt file; a database missing from the catalog is introspected
+    and the catalog saved, so later runs load it instead.
+    """
+    if catalog is not None:
+        schema = catalog.render(entry["sql_path"])
+        catalog.save()  # No-op unless the lookup introspected or re-hashed a database
+    else:
+        schema = entry["schema"]
+    if prune:
+        schema = prune_schema(schema, entry["question"], entry["sql_path"])
     return AgentFactory.create_sql_tool(
                 description=f"This is the database about {entry['db_id'].replace('_', ' ')}",
                 source=rename_and_save_sqlite(entry["sql_path"]), # it has to be a .bd for an sqlite file
                 source_type="sqlite",
-                schema=entry["schema"], #It automatically parses the schema
+                schema=schema, #It automatically parses the schema
                 enable_commit=False,
             )
 
@@ -526,43 +618,90 @@ def create_team_agent(agents, TEAM_ROLE, sql_exe, llm_id):
             llm_id=llm_id,
         )
 
-def execute_query(query, agent, team_agent, configuration, plan_inspector):
-    """Execute the query with either a single agent or a team of agents."""
-
+def get_text2sql_agents(registry, entry, role, team_role, llm_id, configuration, sql_exe="", python_tool=False, prune=False, catalog=None):
+    """
+    Get the Text2SQL agent and its team agent for an entry from an agent_registry.AgentRegistry.
+    They are built once per (db_id, llm_id, configuration) and reused by every question on the same
+    database, and the SQL tool once per database; registry.teardown() deletes them at the end of the run.
+    With prune=True the schema depends on the question, so the tool and the agents are built per question.
+    :param registry: The AgentRegistry of the run.
+    :param entry: The question entry (db_id, sql_path, schema, question...).
+    :param role: Description and instructions of the Text2SQL agent.
+    :param team_role: Description of the team agent, formatted with sql_exe.
+    :param llm_id: The LLM used by the agents.
+    :param configuration: The agent configuration; single agent configurations get no team agent.
+    :param python_tool: Whether the Text2SQL agent also gets a Python interpreter tool.
+    :return: (text2sql_agent, team_agent), where team_agent is None for single agent configurations.
+    """
+    scope = (entry["db_id"], entry["question_id"]) if prune else (entry["db_id"],)
+    key = scope + (llm_id, configuration)
+
+    # Tools are looked up on every call so the registry counts every creation a question would have made
+    assets = [registry.get(("sql_tool",) + scope, lambda: create_sql_tool(entry, prune, catalog))]
+    if python_tool:
+        assets.append(registry.get(("python_tool",), create_python_tool))
+    agent = registry.get(
+        ("agent",) + key, lambda: create_agent(name="Text2SQL Agent", description=role, assets=assets, llm_id=llm_id)
+    )
     if "single" in configuration:
-        response = agent.run(query)
-    else:
+        return agent, None
+    team_agent = registry.get(("team_agent",) + key, lambda: create_team_agent([agent], team_role, sql_exe, llm_id))
+    return agent, team_agent
+
+
+def execute_query(query, agent, team_agent, configuration, plan_inspector, recorder=None, question_id=None, submitted_at=None):
+    """
+    Execute the query with either a single agent or a team of agents.
+    With an instrumentation.RunRecorder the run is recorded under configuration (wall and queue time,
+    credits, iterations and steps).
+    """
+    runner = agent
+    if "single" not in configuration:
         team_agent.use_mentalist = plan_inspector if "planner" in configuration else False
         team_agent.use_inspector = plan_inspector if "inspector" in configuration else False
         if team_agent.use_inspector:
             team_agent.num_inspectors = 1
             team_agent.inspector_targets = ["steps"]   
-        response = team_agent.run(query)
+        runner = team_agent
 
-    return response
+    if recorder is None:
+        return runner.run(query)
+    return recorder.run(runner, query, question_id=question_id, configuration=configuration, submitted_at=submitted_at)
 
-def safe_dump_response_step(response, result_path):
+def execute_queries(queries, agents, team_agents, configuration, plan_inspector, max_workers=4, rate=None, timeout=None, max_retries=3,
+                    recorder=None, question_ids=None, on_response=None):
     """
-    Save all intermediate steps from an Agent response into one JSON file.
+    Execute many queries concurrently with execute_query, returning the responses in input order.
+    :param queries: List of prompts.
+    :param agents: One agent per query, or a single agent shared by every query.
+    :param team_agents: One team agent per query, a single shared team agent, or None for single-agent configurations.
+    :param configuration: The agent configuration (see execute_query).
+    :param plan_inspector: Whether to enable the planner/inspector of the team agent.
+    :param max_workers: Maximum number of agent runs in flight.
+    :param rate: Maximum number of agent runs started per second, or None for no limit.
+    :param timeout: Per-run timeout in seconds, or None to wait indefinitely. A run that times out is abandoned,
+        not cancelled: it keeps running on the platform and consuming credits (see agent_runner.call_with_timeout).
+    :param max_retries: Number of retries, with jittered exponential backoff, after a failed run.
+    :param recorder: Optional instrumentation.RunRecorder; queue time is measured from the submission of the batch.
+    :param question_ids: Ids recorded with each run (default: the query positions).
+    :param on_response: Optional function called as on_response(index, response) as soon as a run succeeds,
+        e.g. to save its result and trace while the other runs are still in flight.
+    :return: List of responses in the order of queries; runs that still fail after all retries are None,
+        e.g. responses = [r.data.output if r else "" for r in execute_queries(...)].
     """
-    try:
-        steps = response.data.intermediate_steps
-        serialized_steps = []
-
-        for i, step in enumerate(steps):
-            if hasattr(step, "model_dump"):
-                serialized_steps.append(step.model_dump())
-            elif hasattr(step, "__dict__"):
-                serialized_steps.append(step.__dict__)
-            else:
-                serialized_steps.append(str(step))  # fallback
-
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump(serialized_steps, f, indent=4, ensure_ascii=False)
-
-        print(f"[✓] Saved {len(serialized_steps)} intermediate steps to {result_path}")
-    
-    except Exception as e:
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump({"error": f"Failed to dump steps: {str(e)}"}, f, indent=2)
-        print(f"[!] Failed to save steps: {e}")
+    agents = agents if isinstance(agents, (list, tuple)) else [agents] * len(queries)
+    team_agents = team_agents if isinstance(team_agents, (list, tuple)) else [team_agents] * len(queries)
+    question_ids = question_ids if question_ids is not None else range(len(queries))
+
+    runner = ConcurrentRunner(max_workers=max_workers, rate=rate, timeout=timeout, max_retries=max_retries)
+    submitted_at = recorder.clock() if recorder is not None else None
+    responses = runner.map(
+        lambda args: execute_query(*args[:3], configuration, plan_inspector, recorder, args[3], submitted_at),
+        zip(queries, agents, team_agents, question_ids),
+        on_result=on_response,
+    )
+    print(
+        f"[✓] Executed {runner.stats['requests']} queries in {runner.stats['elapsed']:.1f}s "
+        f"({runner.stats['retries']} retries, {runner.stats['failures']} failures, {runner.stats['abandoned']} timed out)"
+    )
+    return responses
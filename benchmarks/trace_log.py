@@ -0,0 +1,305 @@
+"""
+Compact trace log of agent runs, shared by the benchmark harnesses (fact_verification, text2sql).
+
+The intermediate steps of each response are converted once to plain data (dicts, lists, strings, numbers)
+and appended as one record to a single compressed log, instead of one indented JSON file per question:
+- records are JSON lines (encoded with orjson when it is installed), or msgpack objects for a path ending
+  with .msgpack.gz (requires msgpack), in a gzip stream flushed after every record;
+- strings of at least min_length characters are stored once per log: every later occurrence becomes
+  {"$ref": id}, and a long string containing an earlier string of the same record, such as the prompt
+  echoed in the input of every step, stores it as {"$join": [text, {"$ref": id}, text...]}.
+read_traces expands the references back to the original strings.
+
+Unknown objects are stored as str(obj) rather than through their __dict__, which can hold clients,
+models and other large nested objects.
+
+From a benchmark folder:
+    sys.path.append("..")
+    from trace_log import TraceLog, safe_dump_response_step
+
+    with TraceLog("results/traces.jsonl.gz") as traces:
+        safe_dump_response_step(response, trace_log=traces, question_id=idx, prompt=prompt)
+
+    python trace_log.py results/traces.jsonl.gz --question-id 3
+"""
+import os
+import json
+import gzip
+import zlib
+import enum
+import argparse
+import tempfile
+import threading
+
+try:
+    import orjson
+except ImportError:  # the standard json module is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack logs are optional
+    msgpack = None
+
+MIN_SHARED_LENGTH = 256
+MAX_DEPTH = 32
+# Truncated gzip stream, corrupt deflate data, incomplete JSON line or msgpack object
+_READ_ERRORS = (EOFError, OSError, zlib.error, ValueError)
+
+
+def to_plain(obj, depth=0):
+    """
+    Convert an intermediate step (or any value) to JSON-compatible data.
+    Pydantic models are dumped, enums replaced by their value, and any other object by str(obj).
+    :param obj: The value to convert.
+    :param depth: Current nesting depth; deeper values are stored as strings.
+    :return: Plain data.
+    """
+    if obj is None or isinstance(obj, (str, bool, int, float)):
+        return obj
+    if isinstance(obj, enum.Enum):
+        return to_plain(obj.value, depth)
+    if depth >= MAX_DEPTH:
+        return str(obj)
+    if isinstance(obj, dict):
+        return {str(key): to_plain(value, depth + 1) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [to_plain(value, depth + 1) for value in obj]
+    if hasattr(obj, "model_dump"):
+        return to_plain(obj.model_dump(), depth + 1)
+    return str(obj)
+
+
+def _split(parts, snippet, ref):
+    """Replace every occurrence of snippet in the string parts by ref."""
+    result = []
+    for part in parts:
+        if isinstance(part, str) and snippet in part:
+            pieces = part.split(snippet)
+            for piece in pieces[:-1]:
+                if piece:
+                    result.append(piece)
+                result.append(ref)
+            if pieces[-1]:
+                result.append(pieces[-1])
+        else:
+            result.append(part)
+    return result
+
+
+class TraceLog:
+    """
+    Append-only compressed log of agent traces, one record per response. Thread-safe.
+    Reopening an existing log appends to it and keeps sharing the strings it already stores. A log left
+    unterminated by an interrupted run is first rewritten with its complete records.
+    """
+
+    def __init__(self, path, min_length=MIN_SHARED_LENGTH):
+        """
+        :param path: Path of the log: .jsonl.gz, or .msgpack.gz with msgpack.
+        :param min_length: Length from which a string is stored once and referenced afterwards.
+        """
+        self.path = path
+        self.min_length = min_length
+        self.binary = path.endswith(".msgpack.gz")
+        if self.binary and msgpack is None:
+            raise ImportError("msgpack trace logs require the msgpack package: pip install msgpack")
+        self.records = 0
+        self._strings = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            state, texts = {}, {}
+            entries = list(_read_entries(path, self.binary, state))
+            for entry in entries:
+                if "$string" in entry:
+                    texts[entry["$string"]] = _expand(entry["value"], texts)
+                    self._strings[texts[entry["$string"]]] = entry["$string"]
+                else:
+                    self.records += 1
+            if not state["complete"]:
+                # Appending behind an unterminated gzip member would make the whole log unreadable
+                self._rewrite(entries)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = gzip.open(path, "ab")
+
+    def _rewrite(self, entries):
+        """Replace the log atomically with the given entries, in one terminated gzip member."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(b"".join(self._encode(entry) for entry in entries))
+            os.replace(temporary, self.path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        print(f"[+] Recovered {self.records} records of {self.path}")
+
+    def _encode(self, entry):
+        if self.binary:
+            return msgpack.packb(entry, use_bin_type=True)
+        if orjson is not None:
+            return orjson.dumps(entry) + b"\n"
+        return (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _intern(self, text, snippets, chunks):
+        """Reference to text, defining it (relative to the snippets of the record) when it is new."""
+        ref = self._strings.get(text)
+        if ref is None:
+            parts = [text]
+            for snippet, snippet_ref in sorted(snippets.items(), key=lambda item: -len(item[0])):
+                if len(snippet) < len(text):
+                    parts = _split(parts, snippet, snippet_ref)
+            value = parts[0] if len(parts) == 1 and isinstance(parts[0], str) else {"$join": parts}
+            ref = len(self._strings)
+            self._strings[text] = ref
+            chunks.append(self._encode({"$string": ref, "value": value}))
+        ref = {"$ref": ref}
+        snippets[text] = ref
+        return ref
+
+    def _compact(self, obj, snippets, chunks):
+        if isinstance(obj, str):
+            return self._intern(obj, snippets, chunks) if len(obj) >= self.min_length else obj
+        if isinstance(obj, dict):
+            return {key: self._compact(value, snippets, chunks) for key, value in obj.items()}
+        if isinstance(obj, list):
+            return [self._compact(value, snippets, chunks) for value in obj]
+        return obj
+
+    def append(self, steps, question_id=None, configuration=None, prompt=None, **fields):
+        """
+        Append the trace of one response.
+        :param steps: Intermediate steps, already converted with to_plain.
+        :param question_id: Identifier of the question, e.g. its index.
+        :param configuration: Name of the agent configuration.
+        :param prompt: Prompt sent to the agent; stored once and referenced from the steps echoing it.
+        :param fields: Other JSON-compatible values to store in the record, e.g. status or output.
+        """
+        record = {"question_id": question_id, "configuration": configuration, **fields}
+        with self._lock:
+            snippets, chunks = {}, []
+            if prompt:
+                record["prompt"] = self._compact(prompt, snippets, chunks)
+            record["steps"] = self._compact(steps, snippets, chunks)
+            chunks.append(self._encode(record))
+            self._file.write(b"".join(chunks))
+            # Sync flush: the records written so far stay readable if the run is interrupted
+            self._file.flush()
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_entries(path, binary, state=None):
+    """
+    Entries of a log (string definitions and records). Reading stops at a truncated or corrupt tail, e.g.
+    after an interrupted run, keeping the complete entries before it.
+    :param state: Optional dict whose "complete" key is set to whether the log ended cleanly.
+    """
+    if binary and msgpack is None:
+        raise ImportError("msgpack trace logs require the msgpack package: pip install msgpack")
+    complete = False
+    try:
+        with gzip.open(path, "rb") as f:
+            if binary:
+                yield from msgpack.Unpacker(f, raw=False)
+            else:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete last record")
+                    yield json.loads(line)
+        complete = True
+    except _READ_ERRORS as e:
+        print(f"[!] {path} ends with a truncated or corrupt record ({e}); the records before it are kept")
+    finally:
+        if state is not None:
+            state["complete"] = complete
+
+
+def _expand(obj, texts):
+    if isinstance(obj, dict):
+        if "$ref" in obj and len(obj) == 1:
+            return texts[obj["$ref"]]
+        if "$join" in obj and len(obj) == 1:
+            return "".join(part if isinstance(part, str) else texts[part["$ref"]] for part in obj["$join"])
+        return {key: _expand(value, texts) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_expand(value, texts) for value in obj]
+    return obj
+
+
+def read_traces(path, question_id=None, configuration=None):
+    """
+    Read the records of a trace log with their strings expanded.
+    :param path: Path of the log.
+    :param question_id: Only yield the records of this question.
+    :param configuration: Only yield the records of this configuration.
+    :return: Iterator of records: {"question_id", "configuration", "prompt", "steps", ...}.
+    """
+    texts = {}
+    for entry in _read_entries(path, path.endswith(".msgpack.gz")):
+        if "$string" in entry:
+            texts[entry["$string"]] = _expand(entry["value"], texts)
+        elif (question_id is None or entry.get("question_id") == question_id) and (
+            configuration is None or entry.get("configuration") == configuration
+        ):
+            yield _expand(entry, texts)
+
+
+def serialize_steps(response):
+    """The intermediate steps of an agent or team agent response as plain data."""
+    steps = response.data.intermediate_steps or []
+    return [to_plain(step) for step in (steps if isinstance(steps, (list, tuple)) else [steps])]
+
+
+def safe_dump_response_step(response, result_path=None, trace_log=None, **fields):
+    """
+    Save all intermediate steps from an Agent response, serialized once, to a compact JSON file and/or a
+    shared trace log.
+    :param response: The agent or team agent response.
+    :param result_path: Path of a JSON file holding the steps of this response only.
+    :param trace_log: TraceLog to append the steps to.
+    :param fields: Passed to TraceLog.append, e.g. question_id, configuration and prompt.
+    """
+    try:
+        if result_path is None and trace_log is None:
+            raise ValueError("Either result_path or trace_log is required")
+        steps = serialize_steps(response)
+        if result_path is not None:
+            with open(result_path, "w", encoding="utf-8") as f:
+                json.dump(steps, f, ensure_ascii=False, separators=(",", ":"))
+        if trace_log is not None:
+            trace_log.append(steps, **fields)
+        print(f"[✓] Saved {len(steps)} intermediate steps to {result_path or trace_log.path}")
+
+    except Exception as e:
+        if result_path is not None:
+            with open(result_path, "w", encoding="utf-8") as f:
+                json.dump({"error": f"Failed to dump steps: {str(e)}"}, f, indent=2)
+        print(f"[!] Failed to save steps: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--question-id", help="Only print the traces of this question")
+    parser.add_argument("--configuration", help="Only print the traces of this configuration")
+    args = parser.parse_args()
+    for record in read_traces(args.path, configuration=args.configuration):
+        if args.question_id is None or str(record.get("question_id")) == args.question_id:
+            print(json.dumps(record, indent=4, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import sys
 import csv
 
 os.environ["AIXPLAIN_API_KEY"] = "<YOUR_API_KEY>"  
@@ -6,6 +7,10 @@ os.environ["AIXPLAIN_API_KEY"] = "<YOUR_API_KEY>"
 from aixplain.factories import IndexFactory
 from aixplain.modules.model.record import Record
 
+# Batched, concurrent upserts with retries come from the text2sql benchmark (benchmarks/text2sql/index_ingest.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "benchmarks", "text2sql"))
+from index_ingest import BulkUpserter
+
 
 index = IndexFactory.create(
     name="CompanyIndex",
@@ -37,10 +42,11 @@ with open(csv_path, "r", encoding="utf-8") as f:
         record = Record(id=id, value=value, value_type="text")
         records.append(record)
 
-# Upsert in batches of 500
-for i in range(0, len(records), 500):
-    index.upsert(records[i: i + 500])
-    print(f"✅ Upserted {i + min(500, len(records) - i)} records. Current count: {index.count()}")
+# Upsert in batches of up to 500 records / 1 MB, 4 batches in flight, retrying failed batches.
+# Record ids come from the company name, so a retried batch overwrites instead of duplicating.
+upserter = BulkUpserter(index, max_batch_records=500, max_batch_bytes=1 << 20, max_workers=4, max_retries=3)
+stats = upserter.upsert(records)
+print(f"✅ Upserted {stats['records']} of {len(records)} records ({stats['records_per_sec']:.0f} records/s). Current count: {index.count()}")
 
 # Retrieve the index
 index = IndexFactory.get(index.id)
@@ -1,14 +1,25 @@
 import os
+import io
 import json
 import re
 import random
 import sqlite3
+import sys
+import contextlib
 from collections import defaultdict
+from collections.abc import Sequence
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from agentification.utilities.models import Agent, UtilityTool, UtilityToolType, TeamAgent, AgentExecuteInput, SQLTool
 from agentification.team_agent import TeamAgentService, TeamAgentExecuteInput
 from agentification.agent import AgentService
 from aixplain.factories import ModelFactory
 
+# The concurrent agent runner is shared with the benchmark harnesses (benchmarks/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from agent_runner import ConcurrentRunner
+
 
 def retrieve_docs(query, model_id, num_results):
     try:
@@ -23,6 +34,43 @@ def retrieve_docs(query, model_id, num_results):
         return ""
 
 
+@lru_cache(maxsize=None)
+def load_schema(dataset_name, db_id):
+    """
+    Load the schema text of a database from <dataset_name>/<db_id>.txt.
+    Each schema is read once per process and every caller shares the same string.
+    :param dataset_name: Name of the dataset (folder containing the schema files).
+    :param db_id: The database id.
+    :return: The schema text.
+    """
+    schema_path = os.path.join(dataset_name, f"{db_id}.txt")
+    with open(schema_path, "r", encoding="utf8") as file:
+        return file.read()
+
+
+class LazySchemas(Sequence):
+    """
+    Schema column of decouple_question_schema's output.
+    Stores the db_id of every question and loads the schema text on access through load_schema,
+    so only the schemas of the questions actually used are read, and each of them only once.
+    """
+
+    def __init__(self, dataset_name, db_ids=None):
+        self.dataset_name = dataset_name
+        self.db_ids = list(db_ids or [])
+
+    def append(self, db_id):
+        self.db_ids.append(db_id)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [load_schema(self.dataset_name, db_id) for db_id in self.db_ids[index]]
+        return load_schema(self.dataset_name, self.db_ids[index])
+
+    def __len__(self):
+        return len(self.db_ids)
+
+
 def decouple_question_schema(dataset_dir, dataset_name, lowercase=False):
     dataset_path = os.path.join(dataset_dir, dataset_name, "dev.json")
     db = "dev_databases" if dataset_name == "bird" else "database"
@@ -39,7 +87,7 @@ def decouple_question_schema(dataset_dir, dataset_name, lowercase=False):
         "difficulty": [],
         "field": [],
         "sql_path": [],
-        "schema": [],
+        "schema": LazySchemas(dataset_name),
         "question": [],
         "prediction": [],
         "ground_truth": [],
@@ -49,8 +97,6 @@ def decouple_question_schema(dataset_dir, dataset_name, lowercase=False):
         basename = f"{data.get('db_id', '')}_lowercase.sqlite" if lowercase else f"{data.get('db_id', '')}.sqlite"
         path = os.path.join(db_root_path, data.get("db_id", ""), basename)
         db_path_list.append(path)
-        schema_path = os.path.join(dataset_name, f"{data['db_id']}.txt")
-        schema = open(schema_path, "r", encoding="utf8").read()
         question_list.append(data.get("question", ""))
         knowledge_list.append(data.get("evidence", None))
 
@@ -60,7 +106,7 @@ def decouple_question_schema(dataset_dir, dataset_name, lowercase=False):
         output_data["question"].append(data.get("question", None))
         output_data["ground_truth"].append(data.get("SQL", "") or data.get("query", ""))
         output_data["sql_path"].append(path)
-        output_data["schema"].append(schema)
+        output_data["schema"].append(data["db_id"])
 
     return question_list, db_path_list, knowledge_list, output_data
 
@@ -167,52 +213,91 @@ def sql_res(predicted_sql, ground_truth, db_path):
         return f"Error: {e}"
 
 
-def evaluate_predictions(output_dir, start=0, end=None):
-    replacements = {r"\n": " ", r"```": "", r";": "", r":": "", r"(?i)sql": ""}
-    # Initialize counters for difficulty-based evaluation
-    difficulty_count = defaultdict(int)
-    difficulty_correct = defaultdict(int)
+REPLACEMENTS = {r"\n": " ", r"```": "", r";": "", r":": "", r"(?i)sql": ""}
 
-    # Initialize counters for overall SQL prediction evaluation
-    total_correct, num_files = 0, 0
 
-    files = sorted(f for f in os.listdir(output_dir) if f != "results")
-    files = files[start:end] if end else files[start:]  # Limit files based on start:end range
-
-    for i, path in enumerate(files):
-        file_path = os.path.join(output_dir, path)
-        if path == "results" or not os.path.isfile(file_path):
-            continue
-
-        num_files += 1
+def _evaluate_file(file_path, with_results=False):
+    """Evaluate one result file, capturing its printed output so it can be replayed in file order."""
+    record = {"status": "error", "res": 0}
+    log = io.StringIO()
 
+    with contextlib.redirect_stdout(log):
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 out_data = json.load(f)
 
             required_keys = {"prediction", "ground_truth", "sql_path"}
-            if set(required_keys).issubset(out_data):
-                for pattern, replacement in replacements.items():
+            if required_keys.issubset(out_data):
+                # Clean prediction: Remove markdown code fences, 'sql' substring, and newlines
+                for pattern, replacement in REPLACEMENTS.items():
                     out_data["prediction"] = re.sub(pattern, replacement, out_data["prediction"])
+                record["prediction"] = out_data["prediction"]
 
                 res = execute_sql(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"])
+                if with_results:
+                    p, g = sql_res(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"])
+                    print(p, "===", g)
 
                 if "difficulty" in out_data:
-                    difficulty = out_data["difficulty"]
-                    difficulty_count[difficulty] += 1
-                    if res == 1:
-                        difficulty_correct[difficulty] += 1
-
-                total_correct += res
-                if res == 0:
-                    print(f"Incorrect Prediction {i}: {out_data['prediction']}")
-
+                    record["difficulty"] = out_data["difficulty"]
+                record["res"] = res
+                record["status"] = "evaluated"
             else:
+                record["status"] = "skipped"
                 print(f"Skipping {file_path}: Missing required keys.")
 
         except Exception as e:
             print(f"Error reading {file_path}: {e}")
 
+    record["log"] = log.getvalue()
+    return record
+
+
+def _evaluate_files(output_dir, start=0, end=None, num_workers=1, with_results=False):
+    """Evaluate the result files in start:end serially or across a process pool, keeping file order."""
+    files = sorted(f for f in os.listdir(output_dir) if f != "results")
+    files = files[start:end] if end else files[start:]  # Limit files based on start:end range
+    indexed_files = [(i, os.path.join(output_dir, path)) for i, path in enumerate(files)]
+    indexed_files = [(i, file_path) for i, file_path in indexed_files if os.path.isfile(file_path)]
+    file_paths = [file_path for _, file_path in indexed_files]
+
+    if num_workers is None or num_workers <= 1 or len(file_paths) <= 1:
+        records = [_evaluate_file(file_path, with_results) for file_path in file_paths]
+    else:
+        num_workers = min(num_workers, len(file_paths))
+        chunksize = max(1, len(file_paths) // (num_workers * 4))
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            records = list(executor.map(_evaluate_file, file_paths, repeat(with_results), chunksize=chunksize))
+
+    return [(i, record) for (i, _), record in zip(indexed_files, records)]
+
+
+def evaluate_predictions(output_dir, start=0, end=None, num_workers=1):
+    # Initialize counters for difficulty-based evaluation
+    difficulty_count = defaultdict(int)
+    difficulty_correct = defaultdict(int)
+
+    # Initialize counters for overall SQL prediction evaluation
+    total_correct, num_files = 0, 0
+
+    for i, record in _evaluate_files(output_dir, start, end, num_workers):
+        num_files += 1
+        print(record["log"], end="")
+
+        if record["status"] != "evaluated":
+            continue
+
+        res = record["res"]
+        if "difficulty" in record:
+            difficulty = record["difficulty"]
+            difficulty_count[difficulty] += 1
+            if res == 1:
+                difficulty_correct[difficulty] += 1
+
+        total_correct += res
+        if res == 0:
+            print(f"Incorrect Prediction {i}: {record['prediction']}")
+
     # Calculate and print accuracy for each difficulty level
     accuracy_by_difficulty = {}
     for difficulty, count in difficulty_count.items():
@@ -231,47 +316,21 @@ def evaluate_predictions(output_dir, start=0, end=None):
     return accuracy_by_difficulty, final_accuracy
 
 
-def evaluate_sql_predictions(output_dir, start=0, end=None):
-    replacements = {r"\n": " ", r"```": "", r";": "", r":": "", r"(?i)sql": ""}
+def evaluate_sql_predictions(output_dir, start=0, end=None, num_workers=1):
     total_correct, num_files = 0, 0
-    files = sorted(f for f in os.listdir(output_dir) if f != "results")
-
-    # Limit files based on start:end range
-    files = files[start:end] if end else files[start:]
-
-    for i, path in enumerate(files):
-        file_path = os.path.join(output_dir, path)
-        if path == "results" or not os.path.isfile(file_path):
-            continue
 
+    for i, record in _evaluate_files(output_dir, start, end, num_workers, with_results=True):
         num_files += 1
+        print(record["log"], end="")
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                out_data = json.load(f)
-
-            required_keys = {"prediction", "ground_truth", "sql_path"}
-            if required_keys.issubset(out_data):
-                # Clean prediction: Remove markdown code fences, 'sql' substring, and newlines
-                for pattern, replacement in replacements.items():
-                    out_data["prediction"] = re.sub(pattern, replacement, out_data["prediction"])
-
-                # Execute SQL and compute results
-                res = execute_sql(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"])
-                p, g = sql_res(out_data["prediction"], out_data["ground_truth"], out_data["sql_path"])
-
-                print(p, "===", g)
-                total_correct += res
-
-                # Log incorrect predictions
-                if res == 0:
-                    print(f"Incorrect Prediction {i}: {out_data['prediction']}")
+        if record["status"] != "evaluated":
+            continue
 
-            else:
-                print(f"Skipping {file_path}: Missing required keys.")
+        total_correct += record["res"]
 
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
+        # Log incorrect predictions
+        if record["res"] == 0:
+            print(f"Incorrect Prediction {i}: {record['prediction']}")
 
     # Compute final accuracy
     final_result = f"{(total_correct / num_files * 100):.2f}%" if num_files > 0 else "No valid files found"
@@ -366,3 +425,22 @@ def execute_query(query, agent, team_agent, configuration, session_id, llm_id):
         )
 
     return response
+
+
+def execute_queries(
+    queries, agents, team_agents, configuration, session_ids, llm_id, max_workers=4, rate=None, timeout=None, max_retries=3, backoff=1.0
+):
+    """
+    Execute many queries concurrently with execute_query, returning the responses in input order.
+    agents, team_agents and session_ids take either one value per query or a single shared value.
+    Runs go through benchmarks/agent_runner.ConcurrentRunner: they are rate limited to `rate` starts per second,
+    time out after `timeout` seconds and are retried up to max_retries times with jittered exponential backoff;
+    runs that still fail are returned as None. A run that times out is abandoned, not cancelled: it keeps
+    running on the platform and consuming credits.
+    """
+    def per_query(value):
+        return value if isinstance(value, (list, tuple)) else [value] * len(queries)
+
+    runner = ConcurrentRunner(max_workers=max_workers, rate=rate, timeout=timeout, max_retries=max_retries, backoff=backoff)
+    tasks = zip(queries, per_query(agents), per_query(team_agents), per_query(session_ids))
+    return runner.map(lambda task: execute_query(*task[:3], configuration, task[3], llm_id), tasks)